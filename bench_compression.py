@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import zlib
+from itertools import islice
+
+from record_codec import RecordCodec, dumps_compact
+
+
+def load_records(source, limit):
+    if os.path.isfile(source):
+        from jsonl_archive import iter_records
+        return list(islice(iter_records(source), limit))
+    from record_store import open_store
+    store = open_store(source)
+    try:
+        return list(islice(store.iter_latest(), limit))
+    finally:
+        store.close()
+
+
+def measure(name, records, encode, decode, repeat):
+    raw_size = sum(len(dumps_compact(record)) for record in records)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encoded = [encode(record) for record in records]
+    encode_time = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for data in encoded:
+            decode(data)
+    decode_time = (time.perf_counter() - start) / repeat
+    size = sum(len(data) for data in encoded)
+    return {
+        "format": name,
+        "bytes": size,
+        "ratio": raw_size / size,
+        "encode_mb_s": raw_size / encode_time / 1e6,
+        "decode_mb_s": raw_size / decode_time / 1e6,
+        "decode_us_per_record": decode_time / len(records) * 1e6,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare stored record formats by size and speed")
+    parser.add_argument("source", help="record store directory or .jsonl[.gz] archive")
+    parser.add_argument("--limit", type=int, default=2000, help="records to load")
+    parser.add_argument("--train", type=float, default=0.5, help="fraction of records used to train the dictionary")
+    parser.add_argument("--repeat", type=int, default=3, help="timing repetitions")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    records = load_records(args.source, args.limit)
+    split = int(len(records) * args.train)
+    if split == 0 or split == len(records):
+        print("Need records on both sides of the training split", file=sys.stderr)
+        return 1
+    training, records = records[:split], records[split:]
+
+    with tempfile.TemporaryDirectory() as directory:
+        codec = RecordCodec(directory)
+        plain = RecordCodec(os.path.join(directory, "plain"))
+        codec.train(training)
+        results = [
+            measure("json-indent", records, lambda r: json.dumps(r, indent=4).encode("utf-8"), json.loads, args.repeat),
+            measure("json", records, dumps_compact, json.loads, args.repeat),
+            measure("zlib", records, lambda r: zlib.compress(dumps_compact(r), 9),
+                    lambda data: json.loads(zlib.decompress(data)), args.repeat),
+            measure("zlib-raw", records, plain.encode, plain.decode, args.repeat),
+            measure("zlib-dict", records, codec.encode, codec.decode, args.repeat),
+        ]
+
+    if args.json:
+        print(json.dumps({"records": len(records), "trained_on": len(training), "results": results}, indent=2))
+        return 0
+    print(f"{len(records)} records, dictionary trained on {len(training)}")
+    print(f"{'format':<12} {'bytes':>12} {'ratio':>7} {'enc MB/s':>9} {'dec MB/s':>9} {'dec us/rec':>11}")
+    for result in results:
+        print(f"{result['format']:<12} {result['bytes']:>12} {result['ratio']:>7.2f} {result['encode_mb_s']:>9.1f} "
+              f"{result['decode_mb_s']:>9.1f} {result['decode_us_per_record']:>11.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
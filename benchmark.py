@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from generate_records import generate_record
+from prefix_index import PrefixIndex
+from record_schema import FORM_FIELDS, get_path, set_path
+from record_store import open_store
+from text_index import TextIndex
+
+PERCENTILES = (50, 90, 99)
+COMPARED = ("p50_ms", "p90_ms")
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import tkinter as tk
+from simple_medical_records import SimpleMedicalRecord
+root = tk.Tk()
+app = SimpleMedicalRecord(root)
+root.update()
+print(time.perf_counter() - start)
+app.on_close()
+"""
+
+
+def percentile(ordered, percent):
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    total = sum(ordered)
+    result = {"count": len(ordered), "mean_ms": total / len(ordered) * 1000}
+    for percent in PERCENTILES:
+        result[f"p{percent}_ms"] = percentile(ordered, percent) * 1000
+    result["max_ms"] = ordered[-1] * 1000
+    result["ops_per_s"] = len(ordered) / total if total else None
+    return result
+
+
+def timed(function, items):
+    samples = []
+    clock = time.perf_counter
+    for item in items:
+        start = clock()
+        function(item)
+        samples.append(clock() - start)
+    return samples
+
+
+def form_values(record):
+    return [(path, get_path(record, path, [] if kind == "list" else "")) for path, _, kind in FORM_FIELDS]
+
+
+def serialize(values):
+    record = {}
+    for path, value in values:
+        set_path(record, path, value)
+    record["date_created"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return json.dumps(record, indent=4)
+
+
+def bench_serialize(records):
+    return summarize(timed(serialize, [form_values(record) for record in records]))
+
+
+def bench_write(records, directory, backend):
+    store = open_store(directory, backend)
+    try:
+        return summarize(timed(store.save, records))
+    finally:
+        store.close()
+
+
+def bench_load(directory, backend, rng, count):
+    start = time.perf_counter()
+    store = open_store(directory, backend)
+    opened = time.perf_counter() - start
+    try:
+        patient_ids = store.patient_ids()
+        sample = [rng.choice(patient_ids) for _ in range(count)]
+        result = summarize(timed(store.get, sample))
+    finally:
+        store.close()
+    result["open_ms"] = opened * 1000
+    return result
+
+
+def bench_search(directory, backend, records, rng, count):
+    store = open_store(directory, backend)
+    try:
+        prefix_index = PrefixIndex()
+        prefix_index.load(store)
+        text_index = TextIndex(os.path.join(directory, "text_index"))
+        text_index.rebuild(store)
+    finally:
+        store.close()
+    names = [record["personal_info"]["name"] for record in records]
+    prefixes = []
+    for _ in range(count):
+        name = rng.choice(names)
+        prefixes.append(name[:rng.randint(1, len(name))])
+    words = [word for record in records[:200] for word in record["notes"].split() if len(word) > 4]
+    queries = []
+    for _ in range(count):
+        shape = rng.random()
+        if shape < 0.5:
+            queries.append(rng.choice(words))
+        elif shape < 0.8:
+            queries.append(f"{rng.choice(words)} AND {rng.choice(words)}")
+        else:
+            queries.append(f"{rng.choice(words)} OR {rng.choice(words)} NOT {rng.choice(words)}")
+    text_index.search(queries[0])
+    return {
+        "prefix": summarize(timed(prefix_index.search, prefixes)),
+        "text": summarize(timed(text_index.search, queries)),
+    }
+
+
+def bench_startup(directory, repeat):
+    environment = dict(os.environ)
+    server = None
+    if not environment.get("DISPLAY"):
+        xvfb = shutil.which("Xvfb")
+        if xvfb is None:
+            return {"skipped": "no DISPLAY and Xvfb is not installed"}
+        display = f":{random.randint(100, 999)}"
+        server = subprocess.Popen([xvfb, display, "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        environment["DISPLAY"] = display
+        time.sleep(1.0)
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    environment["PYTHONPATH"] = os.pathsep.join(filter(None, [package_dir, environment.get("PYTHONPATH")]))
+    workdir = os.path.dirname(os.path.abspath(directory))
+    samples = []
+    try:
+        for _ in range(repeat):
+            process = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=workdir, env=environment,
+                                     capture_output=True, text=True, timeout=120)
+            if process.returncode != 0:
+                return {"skipped": f"startup failed: {process.stderr.strip().splitlines()[-1:]}"}
+            samples.append(float(process.stdout.strip().splitlines()[-1]))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    return summarize(samples)
+
+
+def flatten_results(results, prefix=""):
+    flat = {}
+    for name, value in results.items():
+        if isinstance(value, dict) and "count" not in value and "skipped" not in value:
+            flat.update(flatten_results(value, f"{prefix}{name}."))
+        else:
+            flat[prefix + name] = value
+    return flat
+
+
+def compare(results, baseline, tolerance):
+    current = flatten_results(results)
+    regressions = []
+    for name, expected in flatten_results(baseline["results"]).items():
+        actual = current.get(name)
+        if not actual or "skipped" in actual or "skipped" in expected:
+            continue
+        for metric in COMPARED:
+            if expected.get(metric) and actual[metric] > expected[metric] * (1 + tolerance):
+                regressions.append((name, metric, expected[metric], actual[metric]))
+    return regressions
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    records = [generate_record(args.seed, index) for index in range(args.records)]
+    workdir = tempfile.mkdtemp(prefix="medical-bench-")
+    directory = os.path.join(workdir, "medical_records")
+    try:
+        results = {
+            "serialize": bench_serialize(records),
+            "write": bench_write(records, directory, args.backend),
+            "load": bench_load(directory, args.backend, rng, args.samples),
+            "search": bench_search(directory, args.backend, records, rng, args.samples),
+        }
+        if args.startup:
+            results["startup"] = bench_startup(directory, args.startup)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": {
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "records": args.records,
+            "samples": args.samples,
+            "backend": args.backend,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark record serialization, storage, search and startup")
+    parser.add_argument("--records", type=int, default=5000, help="synthetic records to write")
+    parser.add_argument("--samples", type=int, default=2000, help="loads and searches to time")
+    parser.add_argument("--backend", choices=["files", "sqlite"], default="files", help="storage backend")
+    parser.add_argument("--seed", type=int, default=0, help="corpus and query seed")
+    parser.add_argument("--startup", type=int, default=0, metavar="N",
+                        help="also time N cold starts of the GUI (uses Xvfb when DISPLAY is unset)")
+    parser.add_argument("--output", help="write results JSON to this file")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before failing (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report["results"], baseline, args.tolerance)
+        for name, metric, expected, actual in regressions:
+            print(f"REGRESSION {name} {metric}: {expected:.3f} -> {actual:.3f} ms "
+                  f"({actual / expected - 1:+.0%})", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+
+from jsonl_archive import iter_records
+from record_delta import diff_records
+from record_schema import validate_record
+
+FILENAME_RE = re.compile(r"^(?P<name>.+)_(?P<stamp>\d{8}_\d{6})\.json$")
+CHECKPOINT_FILE = "import.checkpoint"
+ERRORS_FILE = "import_errors.jsonl"
+PENDING_MARK = "?"
+
+
+def sort_key(path):
+    match = FILENAME_RE.match(os.path.basename(path))
+    return (match.group("stamp") if match else "", path)
+
+
+def discover(root, exclude=()):
+    exclude = [os.path.abspath(path) for path in exclude]
+    paths = []
+    for directory, subdirs, files in os.walk(root):
+        subdirs[:] = [name for name in subdirs if os.path.abspath(os.path.join(directory, name)) not in exclude]
+        for name in files:
+            if name.endswith(".json"):
+                paths.append(os.path.abspath(os.path.join(directory, name)))
+    paths.sort(key=sort_key)
+    return paths
+
+
+def parse_file(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        return path, None, [f"{type(e).__name__}: {e}"]
+    errors = validate_record(record)
+    return path, (None if errors else record), errors
+
+
+def read_checkpoint(path):
+    done = set()
+    pending = set()
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if line.startswith(PENDING_MARK):
+                    pending.add(line[len(PENDING_MARK):])
+                elif line:
+                    done.add(line)
+    return done, pending - done
+
+
+def append_checkpoint(path, lines):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(line + "\n" for line in lines))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def already_stored(store, record):
+    # A batch interrupted between the store commit and the checkpoint may be
+    # partly saved; a record counts as saved if some version of its patient
+    # holds every field it has.
+    patient_id = record.get("patient_id") or store.resolve_patient(record)
+    if not patient_id or patient_id not in store:
+        return False
+    for version in reversed(store.versions(patient_id)):
+        if not diff_records(store.get(patient_id, version), record)["set"]:
+            return True
+    return False
+
+
+class ImportProgress:
+    def __init__(self, total, stream=sys.stderr, interval=1.0):
+        self.total = total
+        self.stream = stream
+        self.interval = interval
+        self.started = time.monotonic()
+        self.last_report = 0.0
+        self.imported = 0
+        self.failed = 0
+
+    def update(self, imported=0, failed=0, force=False):
+        self.imported += imported
+        self.failed += failed
+        now = time.monotonic()
+        if force or now - self.last_report >= self.interval:
+            self.last_report = now
+            done = self.imported + self.failed
+            rate = done / max(now - self.started, 1e-9)
+            total = f"/{self.total}" if self.total is not None else ""
+            self.stream.write(f"\r{done}{total} records, {self.failed} errors, {rate:.0f} records/s")
+            self.stream.flush()
+
+    def finish(self):
+        self.update(force=True)
+        self.stream.write("\n")
+
+
+def run_import(store, root, checkpoint_path=None, errors_path=None, workers=None,
+               batch_size=2000, chunksize=64, progress=True):
+    checkpoint_path = checkpoint_path or os.path.join(store.records_dir, CHECKPOINT_FILE)
+    errors_path = errors_path or os.path.join(store.records_dir, ERRORS_FILE)
+    done, pending = read_checkpoint(checkpoint_path)
+    paths = [path for path in discover(root, exclude=[store.records_dir]) if path not in done]
+    tracker = ImportProgress(len(paths)) if progress else None
+
+    batch = []
+    batch_paths = []
+    imported = 0
+    failed = 0
+    recovered = 0
+
+    def commit():
+        append_checkpoint(checkpoint_path, [PENDING_MARK + path for path in batch_paths])
+        store.save_many(batch)
+        append_checkpoint(checkpoint_path, batch_paths)
+        if tracker:
+            tracker.update(imported=len(batch))
+        batch.clear()
+        batch_paths.clear()
+
+    with open(errors_path, "a", encoding="utf-8") as error_report, \
+            multiprocessing.Pool(workers) as pool:
+        for path, record, errors in pool.imap(parse_file, paths, chunksize):
+            if errors:
+                failed += 1
+                error_report.write(json.dumps({"path": path, "errors": errors}) + "\n")
+                if tracker:
+                    tracker.update(failed=1)
+                continue
+            if path in pending and already_stored(store, record):
+                append_checkpoint(checkpoint_path, [path])
+                recovered += 1
+                continue
+            batch.append(record)
+            batch_paths.append(path)
+            imported += 1
+            if len(batch) >= batch_size:
+                commit()
+        if batch:
+            commit()
+    if tracker:
+        tracker.finish()
+    return {"imported": imported, "failed": failed, "skipped": len(done) + recovered, "errors_path": errors_path}
+
+
+def run_archive_import(store, path, errors_path=None, batch_size=2000, progress=True):
+    errors_path = errors_path or os.path.join(store.records_dir, ERRORS_FILE)
+    tracker = ImportProgress(None) if progress else None
+    batch = []
+    imported = 0
+    failed = 0
+    with open(errors_path, "a", encoding="utf-8") as error_report:
+        for position, record in enumerate(iter_records(path), 1):
+            errors = validate_record(record)
+            if errors:
+                failed += 1
+                error_report.write(json.dumps({"path": path, "record": position, "errors": errors}) + "\n")
+                if tracker:
+                    tracker.update(failed=1)
+                continue
+            batch.append(record)
+            imported += 1
+            if len(batch) >= batch_size:
+                store.save_many(batch)
+                if tracker:
+                    tracker.update(imported=len(batch))
+                batch = []
+        if batch:
+            store.save_many(batch)
+            if tracker:
+                tracker.update(imported=len(batch))
+    if tracker:
+        tracker.finish()
+    return {"imported": imported, "failed": failed, "skipped": 0, "errors_path": errors_path}
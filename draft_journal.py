@@ -0,0 +1,71 @@
+import json
+import os
+
+
+class DraftJournal:
+    def __init__(self, path, compact_every=100):
+        self.path = path
+        self.compact_every = compact_every
+        self.state = {}
+        self._pending = {}
+        self._entries = 0
+
+    def load(self):
+        self.state = {}
+        self._pending = {}
+        self._entries = 0
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    changes = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-append.
+                    continue
+                self.state.update(changes)
+                self._entries += 1
+        return dict(self.state)
+
+    def record(self, field, value):
+        if self.state.get(field, "") == value:
+            self._pending.pop(field, None)
+        else:
+            self._pending[field] = value
+
+    def flush(self):
+        if not self._pending:
+            return False
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self._pending, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.state.update(self._pending)
+        self._pending = {}
+        self._entries += 1
+        if self._entries >= self.compact_every:
+            self.compact()
+        return True
+
+    def compact(self):
+        state = {field: value for field, value in self.state.items() if value != ""}
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            if state:
+                f.write(json.dumps(state, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self.state = state
+        self._entries = 1 if state else 0
+
+    def clear(self):
+        self.state = {}
+        self._pending = {}
+        self._entries = 0
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,142 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class ValidationScheduler:
+    def __init__(self, root, delay=150):
+        self.root = root
+        self.delay = delay
+        self._pending = {}
+
+    def schedule(self, key, callback, *args):
+        pending = self._pending.pop(key, None)
+        if pending is not None:
+            self.root.after_cancel(pending[0])
+        after_id = self.root.after(self.delay, self._run, key)
+        self._pending[key] = (after_id, callback, args)
+
+    def _run(self, key):
+        pending = self._pending.pop(key, None)
+        if pending is not None:
+            _, callback, args = pending
+            callback(*args)
+
+    def flush(self):
+        for key in list(self._pending):
+            after_id, _, _ = self._pending[key]
+            self.root.after_cancel(after_id)
+            self._run(key)
+
+    def cancel(self):
+        for after_id, _, _ in self._pending.values():
+            self.root.after_cancel(after_id)
+        self._pending.clear()
+
+
+class TooltipManager:
+    def __init__(self, root, delay=500):
+        self.root = root
+        self.delay = delay
+        self.texts = {}
+        self._window = None
+        self._label = None
+        self._after_id = None
+        self._active = None
+
+    def register(self, widget, text):
+        key = str(widget)
+        if key not in self.texts:
+            widget.bind('<Enter>', self._on_enter, add='+')
+            widget.bind('<Leave>', self._on_leave, add='+')
+            widget.bind('<ButtonPress>', self._on_leave, add='+')
+            widget.bind('<Destroy>', lambda e: self._forget(key), add='+')
+        self.texts[key] = text
+        if self._active == key and self._window is not None and self._window.winfo_viewable():
+            self._label.configure(text=text)
+
+    def _forget(self, key):
+        self.texts.pop(key, None)
+        if self._active == key:
+            self.hide()
+
+    def _ensure_window(self):
+        if self._window is None:
+            self._window = tk.Toplevel(self.root)
+            self._window.withdraw()
+            self._window.wm_overrideredirect(True)
+            self._label = ttk.Label(self._window, background="#ffffe0", relief='solid', borderwidth=1)
+            self._label.pack()
+
+    def _on_enter(self, event):
+        self._cancel()
+        self._active = str(event.widget)
+        self._after_id = self.root.after(self.delay, self._show)
+
+    def _on_leave(self, event=None):
+        self.hide()
+
+    def _show(self):
+        self._after_id = None
+        text = self.texts.get(self._active)
+        if not text:
+            return
+        self._ensure_window()
+        x, y = self.root.winfo_pointerxy()
+        self._label.configure(text=text)
+        self._window.wm_geometry(f"+{x+10}+{y+10}")
+        self._window.deiconify()
+        self._window.lift()
+
+    def _cancel(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def hide(self):
+        self._cancel()
+        self._active = None
+        if self._window is not None:
+            self._window.withdraw()
+
+
+class RangeGauge:
+    def __init__(self, canvas, minimum, maximum, bands, indicator_color='red'):
+        self.canvas = canvas
+        self.minimum = minimum
+        self.maximum = maximum
+        self.bands = bands
+        self.value = None
+        self.width = 1
+        self.height = 1
+        self._band_items = [canvas.create_rectangle(0, 0, 0, 0, fill=color) for _, _, color in bands]
+        self._axis = canvas.create_line(0, 0, 0, 0, fill='black')
+        self._indicator = canvas.create_line(0, 0, 0, 0, fill=indicator_color, width=2, state='hidden')
+        canvas.bind('<Configure>', self._layout, add='+')
+        self._layout()
+
+    def _position(self, value):
+        value = min(max(value, self.minimum), self.maximum)
+        return (value - self.minimum) / (self.maximum - self.minimum) * self.width
+
+    def _layout(self, event=None):
+        self.width = event.width if event is not None else self.canvas.winfo_width()
+        self.height = event.height if event is not None else self.canvas.winfo_height()
+        for item, (start, end, _) in zip(self._band_items, self.bands):
+            self.canvas.coords(item, self._position(start), 0, self._position(end), self.height)
+        self.canvas.coords(self._axis, 0, self.height / 2, self.width, self.height / 2)
+        self._place_indicator()
+
+    def _place_indicator(self):
+        if self.value is None:
+            self.canvas.itemconfigure(self._indicator, state='hidden')
+            return
+        position = self._position(self.value)
+        self.canvas.coords(self._indicator, position, 0, position, self.height)
+        self.canvas.itemconfigure(self._indicator, state='normal')
+
+    def set_value(self, value):
+        self.value = value
+        self._place_indicator()
+
+    def clear(self):
+        self.set_value(None)
@@ -0,0 +1,264 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+from bulk_import import ImportProgress
+from jsonl_archive import COMPACT_SEPARATORS, open_archive
+from record_schema import ALCOHOL_STATUSES, DRUG_STATUSES, FORM_FIELDS, SMOKING_STATUSES, TEST_LISTS, set_path
+from vital_rules import bmi, classify
+
+FIRST_NAMES = {
+    "Male": ["James", "John", "Robert", "Michael", "William", "David", "Ahmed", "Omar", "Carlos", "Wei",
+             "Daniel", "Joseph", "Thomas", "Charles", "Yusuf", "Luis", "Kenji", "Ivan", "Samuel", "Noah"],
+    "Female": ["Mary", "Patricia", "Jennifer", "Linda", "Elizabeth", "Fatima", "Aisha", "Maria", "Mei", "Sarah",
+               "Susan", "Jessica", "Karen", "Nancy", "Layla", "Sofia", "Yuki", "Olga", "Grace", "Emma"],
+}
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Hernandez", "Lopez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin", "Lee",
+              "Al-Sayed", "Haddad", "Khan", "Chen", "Wang", "Nguyen", "Kim", "Ivanov", "Tanaka", "Okafor"]
+RELATIONSHIPS = ["Spouse", "Parent", "Sibling", "Child", "Friend"]
+PROVIDERS = ["BlueCross", "Aetna", "Cigna", "UnitedHealth", "Humana", "Kaiser", "Medicare", "Medicaid"]
+OCCUPATIONS = ["Teacher", "Engineer", "Nurse", "Driver", "Retired", "Student", "Accountant", "Cashier",
+               "Electrician", "Farmer", "Lawyer", "Chef", "Unemployed", "Manager", "Clerk"]
+SMOKING = (SMOKING_STATUSES, [60, 25, 15])
+ALCOHOL = (ALCOHOL_STATUSES, [35, 50, 15])
+DRUGS = (DRUG_STATUSES, [85, 10, 5])
+
+CONDITIONS = ["hypertension", "type 2 diabetes", "asthma", "COPD", "hyperlipidemia", "hypothyroidism",
+              "osteoarthritis", "GERD", "depression", "anxiety", "chronic kidney disease", "atrial fibrillation",
+              "migraine", "obesity", "coronary artery disease"]
+SURGERIES = ["appendectomy", "cholecystectomy", "tonsillectomy", "knee arthroscopy", "cesarean section",
+             "hernia repair", "cataract surgery", "CABG", "hip replacement"]
+MEDICATIONS = ["lisinopril 10 mg daily", "metformin 500 mg twice daily", "atorvastatin 20 mg nightly",
+               "levothyroxine 50 mcg daily", "albuterol inhaler as needed", "omeprazole 20 mg daily",
+               "amlodipine 5 mg daily", "sertraline 50 mg daily", "aspirin 81 mg daily", "metoprolol 25 mg twice daily"]
+ALLERGIES = ["penicillin", "sulfa drugs", "peanuts", "latex", "shellfish", "codeine", "iodine contrast"]
+IMMUNIZATIONS = ["Up to date", "Influenza this season", "COVID-19 booster", "Tdap 2019", "Hepatitis B series",
+                 "Pneumococcal", "Incomplete records"]
+FAMILY = ["Father with {}", "Mother with {}", "Sibling with {}", "No significant family history"]
+NORMAL_FINDINGS = {
+    "general_appearance": ["Well-appearing, in no acute distress", "Alert and oriented x3", "Appears fatigued"],
+    "head": ["Normocephalic, atraumatic"],
+    "eyes": ["PERRLA, EOMI", "Conjunctivae clear", "Mild scleral icterus"],
+    "ears": ["TMs clear bilaterally", "Cerumen impaction left ear"],
+    "nose": ["Nares patent", "Mild congestion"],
+    "throat": ["Oropharynx clear", "Mild erythema, no exudate"],
+    "cardiovascular": ["Regular rate and rhythm, no murmurs", "Irregularly irregular rhythm",
+                       "Grade 2/6 systolic murmur at the apex"],
+    "respiratory": ["Clear to auscultation bilaterally", "Scattered expiratory wheezes", "Crackles at the bases"],
+    "abdomen": ["Soft, non-tender, non-distended", "Mild epigastric tenderness", "Hepatomegaly"],
+    "musculoskeletal": ["Full range of motion", "Crepitus in both knees", "Lumbar paraspinal tenderness"],
+    "neurological": ["Cranial nerves II-XII intact", "Decreased sensation in both feet", "Normal gait"],
+}
+EXAM_FIELDS = {
+    "general_appearance_text": "general_appearance", "head_text": "head", "eyes_text": "eyes", "ears_text": "ears",
+    "nose_text": "nose", "throat_text": "throat", "cv_text": "cardiovascular", "resp_text": "respiratory",
+    "abdomen_text": "abdomen", "msk_text": "musculoskeletal", "neuro_text": "neurological",
+}
+NOTE_PHRASES = ["Patient presents for routine follow-up.", "Reports intermittent chest discomfort.",
+                "Blood pressure reviewed and medication adjusted.", "Counseled on diet and exercise.",
+                "Denies fever, chills or weight loss.", "Will order labs and reassess in three months.",
+                "Symptoms improved since last visit.", "Referred to cardiology for further evaluation.",
+                "Discussed smoking cessation.", "Patient education provided regarding medication adherence."]
+TESTS = {
+    "lab_tests": [("Complete Blood Count", None), ("Basic Metabolic Panel", None), ("Lipid Panel", None),
+                  ("HbA1c", None), ("TSH", None), ("Urinalysis", None), ("Liver Function Tests", None)],
+    "imaging_studies": [("X-Ray", "Chest"), ("CT Scan", "Abdomen"), ("MRI", "Lumbar Spine"),
+                        ("Ultrasound", "Right Upper Quadrant"), ("X-Ray", "Left Knee"), ("CT Scan", "Head")],
+    "biopsies": [("Skin Biopsy", "Left forearm"), ("Fine Needle Aspiration", "Thyroid"),
+                 ("Core Needle Biopsy", "Right breast"), ("Endoscopic Biopsy", "Gastric antrum")],
+    "ecg_results": [("Resting 12-lead ECG", None), ("Holter Monitor", None), ("Stress ECG", None)],
+    "other_tests": [("Spirometry", None), ("Echocardiogram", None), ("Sleep Study", None),
+                    ("Bone Density Scan", None)],
+}
+RESULTS = ["Within normal limits", "Mildly elevated", "Borderline", "Abnormal, follow-up recommended",
+           "No acute findings", "Consistent with prior study", "Pending review"]
+TEST_COUNTS = {
+    "lab_tests": ([0, 1, 2, 3, 4, 6], [30, 25, 20, 12, 8, 5]),
+    "imaging_studies": ([0, 1, 2, 3], [70, 20, 7, 3]),
+    "biopsies": ([0, 1, 2], [95, 4, 1]),
+    "ecg_results": ([0, 1, 2], [75, 20, 5]),
+    "other_tests": ([0, 1, 2], [85, 12, 3]),
+}
+EPOCH = datetime(2015, 1, 1)
+SPAN_SECONDS = 10 * 365 * 24 * 3600
+
+
+def pick(rng, choices):
+    return rng.choices(choices[0], choices[1])[0]
+
+
+def sentence_list(rng, words, low, high):
+    return ", ".join(rng.sample(words, rng.randint(low, min(high, len(words)))))
+
+
+def patient_fields(seed, patient):
+    rng = random.Random(f"{seed}:patient:{patient}")
+    gender = rng.choice(["Male", "Female"])
+    first = rng.choice(FIRST_NAMES[gender])
+    last = rng.choice(LAST_NAMES)
+    birth = datetime(1930, 1, 1) + timedelta(days=rng.randrange(93 * 365))
+    return {
+        "gender": gender,
+        "name": f"{first} {last}",
+        "dob": birth.strftime("%Y-%m-%d"),
+        "phone": f"{rng.randint(200, 999)}{rng.randint(200, 999)}{rng.randint(0, 9999):04d}",
+        "email": f"{first.lower()}.{last.lower()}{patient}@example.com",
+        "emergency_name": f"{rng.choice(FIRST_NAMES[rng.choice(['Male', 'Female'])])} {last}",
+        "emergency_phone": f"{rng.randint(200, 999)}{rng.randint(200, 999)}{rng.randint(0, 9999):04d}",
+        "emergency_relation": rng.choice(RELATIONSHIPS),
+        "insurance_provider": rng.choice(PROVIDERS),
+        "policy_number": f"{rng.choice('ABCDEFGHJK')}{patient:09d}",
+        "coverage": f"GRP-{rng.randint(1000, 9999)}",
+        "occupation": rng.choice(OCCUPATIONS),
+        "smoking": pick(rng, SMOKING),
+        "alcohol": pick(rng, ALCOHOL),
+        "drug": pick(rng, DRUGS),
+        "height": rng.gauss(176, 7) if gender == "Male" else rng.gauss(163, 6),
+        "bmi": math.exp(rng.gauss(math.log(26.5), 0.17)),
+        "conditions": sentence_list(rng, CONDITIONS, 0, 4),
+        "surgeries": sentence_list(rng, SURGERIES, 0, 2),
+        "allergies": sentence_list(rng, ALLERGIES, 0, 2) or "No known drug allergies",
+        "family": "; ".join(rng.choice(FAMILY).format(rng.choice(CONDITIONS)) for _ in range(rng.randint(1, 3))),
+    }
+
+
+def vital(rng, mean, deviation, low, high, digits=0, missing=0.03):
+    if rng.random() < missing:
+        return ""
+    value = min(max(rng.gauss(mean, deviation), low), high)
+    return str(round(value)) if digits == 0 else f"{value:.{digits}f}"
+
+
+def test_entries(rng, name):
+    entries = []
+    for _ in range(pick(rng, TEST_COUNTS[name])):
+        test_type, site = rng.choice(TESTS[name])
+        date = (EPOCH + timedelta(days=rng.randrange(3650))).strftime("%Y-%m-%d")
+        values = {"type": test_type, "date": date, "body_part": site, "site": site,
+                  "results": rng.choice(RESULTS), "findings": rng.choice(RESULTS)}
+        entries.append({column: values[column] for column in TEST_LISTS[name]})
+    return entries
+
+
+def generate_record(seed, index, repeat_rate=0.3):
+    rng = random.Random(f"{seed}:record:{index}")
+    patient = rng.randrange(index) if index and rng.random() < repeat_rate else index
+    person = patient_fields(seed, patient)
+    weight = person["bmi"] * (person["height"] / 100) ** 2 * rng.uniform(0.97, 1.03)
+    systolic = min(max(rng.gauss(124, 16), 85), 200)
+    values = {
+        "name_var": person["name"],
+        "dob_calendar": person["dob"],
+        "gender_var": person["gender"],
+        "phone_var": person["phone"],
+        "email_var": person["email"],
+        "emergency_name_var": person["emergency_name"],
+        "emergency_phone_var": person["emergency_phone"],
+        "emergency_relation_var": person["emergency_relation"],
+        "insurance_provider_var": person["insurance_provider"],
+        "policy_number_var": person["policy_number"],
+        "coverage_text": person["coverage"],
+        "chronic_conditions_text": person["conditions"],
+        "surgeries_text": person["surgeries"],
+        "hospitalizations_text": "" if rng.random() < 0.8 else f"Admitted for {rng.choice(CONDITIONS)}",
+        "family_history_text": person["family"],
+        "smoking_var": person["smoking"],
+        "alcohol_var": person["alcohol"],
+        "drug_var": person["drug"],
+        "occupation_var": person["occupation"],
+        "lifestyle_text": rng.choice(["Sedentary", "Walks daily", "Exercises 3 times a week", ""]),
+        "allergies_text": person["allergies"],
+        "immunization_text": rng.choice(IMMUNIZATIONS),
+        "medications_text": "\n".join(rng.sample(MEDICATIONS, rng.randint(0, 5))),
+        "bp_systolic_var": str(round(systolic)),
+        "bp_diastolic_var": str(round(min(max(systolic * 0.64 + rng.gauss(0, 6), 45), 130))),
+        "heart_rate_var": vital(rng, 76, 12, 40, 180),
+        "respiratory_rate_var": vital(rng, 16, 2.5, 8, 40),
+        "temperature_var": vital(rng, 36.8, 0.4, 35, 41.5, digits=1),
+        "height_var": f"{person['height']:.0f}",
+        "weight_var": f"{weight:.1f}",
+        "bmi_var": "",
+        "bmi_category_var": "",
+        "notes_text": " ".join(rng.choice(NOTE_PHRASES) for _ in range(rng.randint(1, 8))),
+    }
+    value = bmi(float(values["height_var"]), float(values["weight_var"]))
+    values["bmi_var"] = f"{value:.1f}"
+    values["bmi_category_var"] = classify("bmi", value).label.strip("()")
+    for name, area in EXAM_FIELDS.items():
+        values[name] = rng.choice(NORMAL_FINDINGS[area])
+    for name in TEST_LISTS:
+        values[name] = test_entries(rng, name)
+
+    record = {}
+    for path, name, _ in FORM_FIELDS:
+        set_path(record, path, values[name])
+    created = EPOCH + timedelta(seconds=rng.randrange(SPAN_SECONDS))
+    record["date_created"] = created.strftime("%Y-%m-%d %H:%M:%S")
+    return record
+
+
+def record_filename(record, index):
+    name = "_".join(record["personal_info"]["name"].split())
+    stamp = datetime.strptime(record["date_created"], "%Y-%m-%d %H:%M:%S").strftime("%Y%m%d_%H%M%S")
+    return f"{name}_{index}_{stamp}.json"
+
+
+def generate_chunk(task):
+    seed, start, end, repeat_rate, output, fmt = task
+    if fmt == "jsonl":
+        lines = [json.dumps(generate_record(seed, index, repeat_rate), separators=COMPACT_SEPARATORS,
+                            ensure_ascii=False) for index in range(start, end)]
+        return end - start, "\n".join(lines) + "\n"
+    directory = os.path.join(output, f"part-{start // 10000:05d}")
+    os.makedirs(directory, exist_ok=True)
+    for index in range(start, end):
+        record = generate_record(seed, index, repeat_rate)
+        with open(os.path.join(directory, record_filename(record, index)), "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=4)
+    return end - start, None
+
+
+def generate(output, count, seed=0, fmt="jsonl", workers=None, chunk_size=1000, repeat_rate=0.3, progress=True):
+    tasks = [(seed, start, min(start + chunk_size, count), repeat_rate, output, fmt)
+             for start in range(0, count, chunk_size)]
+    tracker = ImportProgress(count) if progress else None
+    archive = open_archive(output, "w") if fmt == "jsonl" else None
+    try:
+        with multiprocessing.Pool(workers) as pool:
+            for generated, text in pool.imap(generate_chunk, tasks):
+                if archive is not None:
+                    archive.write(text)
+                if tracker:
+                    tracker.update(imported=generated)
+    finally:
+        if archive is not None:
+            archive.close()
+    if tracker:
+        tracker.finish()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic medical records for load testing")
+    parser.add_argument("output", help="JSON Lines archive (.jsonl or .jsonl.gz) or a directory for --format json")
+    parser.add_argument("--count", type=int, default=10000, help="number of records")
+    parser.add_argument("--seed", type=int, default=0, help="random seed; the same seed gives the same records")
+    parser.add_argument("--format", choices=["jsonl", "json"], default="jsonl", help="one archive or one file per record")
+    parser.add_argument("--workers", type=int, default=None, help="generator processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="records per worker task")
+    parser.add_argument("--repeat-rate", type=float, default=0.3, help="fraction of records that are follow-up visits")
+    parser.add_argument("--quiet", action="store_true", help="do not print progress")
+    args = parser.parse_args(argv)
+    generate(args.output, args.count, args.seed, args.format, args.workers, args.chunk_size,
+             args.repeat_rate, not args.quiet)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import gzip
+import json
+
+COMPACT_SEPARATORS = (",", ":")
+
+
+def open_archive(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+    return open(path, mode, encoding="utf-8")
+
+
+def dumps_record(record, pretty=False):
+    if pretty:
+        return json.dumps(record, indent=2, ensure_ascii=False)
+    return json.dumps(record, separators=COMPACT_SEPARATORS, ensure_ascii=False)
+
+
+class ArchiveWriter:
+    def __init__(self, path, pretty=False):
+        self.path = path
+        self.pretty = pretty
+        self.count = 0
+        self._file = open_archive(path, "w")
+
+    def write(self, record):
+        self._file.write(dumps_record(record, self.pretty))
+        self._file.write("\n")
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def write_records(path, records, pretty=False):
+    with ArchiveWriter(path, pretty) as writer:
+        for record in records:
+            writer.write(record)
+    return writer.count
+
+
+def iter_records(path):
+    # Compact archives hold one record per line. Pretty archives span several
+    # lines per record, starting with a lone "{" and ending with a "}" in the
+    # first column, which is the only place json.dumps(indent=...) puts one.
+    pending = []
+    start_line = 0
+    with open_archive(path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            if not pending:
+                stripped = line.strip()
+                if not stripped:
+                    continue
+                if stripped != "{":
+                    yield _loads(line, path, line_number)
+                    continue
+                start_line = line_number
+            pending.append(line)
+            if line.rstrip() == "}":
+                yield _loads("".join(pending), path, start_line)
+                pending = []
+    if pending:
+        raise ValueError(f"{path}:{start_line}: truncated record at end of archive")
+
+
+def _loads(text, path, line_number):
+    try:
+        return json.loads(text)
+    except ValueError as e:
+        raise ValueError(f"{path}:{line_number}: {e}") from None
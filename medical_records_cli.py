@@ -0,0 +1,355 @@
+import argparse
+import json
+import os
+import re
+import sys
+
+from record_schema import validate_record
+from record_store import open_store
+from text_index import QueryError, TextIndex
+
+CONDITION_RE = re.compile(r"^\s*(\w+)\s*(>=|<=|==|!=|>|<)\s*(-?[\d.]+)\s*$")
+
+
+def open_indexed_store(args):
+    store = open_store(args.records_dir, args.backend, args.compress)
+    text_index = TextIndex(os.path.join(args.records_dir, "text_index"))
+    store.add_listener(text_index.update_record)
+    vitals = load_vitals(store, args)
+    store.add_listener(vitals.update_record)
+    return store, text_index, vitals
+
+
+def vitals_dir(args):
+    return os.path.join(args.records_dir, "vitals")
+
+
+def load_vitals(store, args):
+    from vitals_store import VitalsStore
+    try:
+        vitals = VitalsStore(vitals_dir(args))
+    except (OSError, ValueError):
+        vitals = VitalsStore()
+    record_count = store.record_count()
+    if len(vitals) == record_count:
+        return vitals
+    if len(vitals) < record_count:
+        vitals.sync(store)
+    if len(vitals) != record_count:
+        # The store dropped rows this copy still has, e.g. merged patients.
+        vitals = VitalsStore().build(store)
+    vitals.save(vitals_dir(args))
+    return vitals
+
+
+def iter_sources(paths):
+    from bulk_import import discover
+    from jsonl_archive import iter_records
+    for path in paths:
+        if path.endswith((".jsonl", ".jsonl.gz")):
+            try:
+                for position, record in enumerate(iter_records(path), 1):
+                    yield f"{path}:{position}", record
+            except (OSError, UnicodeDecodeError, ValueError) as e:
+                yield path, e
+            continue
+        for file_path in discover(path) if os.path.isdir(path) else [path]:
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    yield file_path, json.load(f)
+            except (OSError, UnicodeDecodeError, ValueError) as e:
+                yield file_path, e
+
+
+def cmd_import(args):
+    from bulk_import import run_archive_import, run_import
+    store, text_index, vitals = open_indexed_store(args)
+    try:
+        if os.path.isfile(args.source):
+            summary = run_archive_import(store, args.source, errors_path=args.errors,
+                                         batch_size=args.batch_size, progress=not args.quiet)
+        else:
+            summary = run_import(store, args.source, checkpoint_path=args.checkpoint, errors_path=args.errors,
+                                 workers=args.workers, batch_size=args.batch_size, progress=not args.quiet)
+    finally:
+        store.close()
+        vitals.save(vitals_dir(args))
+    text_index.compact_if_needed()
+    print(f"Imported {summary['imported']} records, {summary['failed']} failed, "
+          f"{summary['skipped']} already imported")
+    if summary["failed"]:
+        print(f"Error report: {summary['errors_path']}")
+        return 1
+    return 0
+
+
+def cmd_validate(args):
+    if args.paths:
+        store = None
+        sources = iter_sources(args.paths)
+    else:
+        store = open_store(args.records_dir, args.backend)
+        sources = ((patient_id, store.get(patient_id)) for patient_id in store.patient_ids())
+    checked = 0
+    invalid = 0
+    try:
+        for source, record in sources:
+            checked += 1
+            if isinstance(record, Exception):
+                errors = [f"{type(record).__name__}: {record}"]
+            else:
+                errors = validate_record(record)
+            if errors:
+                invalid += 1
+                if not args.quiet:
+                    print(f"{source}: {'; '.join(errors)}")
+    finally:
+        if store is not None:
+            store.close()
+    print(f"Checked {checked} records, {invalid} invalid")
+    return 1 if invalid else 0
+
+
+def parse_condition(text):
+    match = CONDITION_RE.match(text)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"expected NAME OP VALUE, e.g. heart_rate>100: {text!r}")
+    return match.group(1), match.group(2), float(match.group(3))
+
+
+def cmd_query(args):
+    from prefix_index import PrefixIndex, patient_label
+    store = open_store(args.records_dir, args.backend)
+    try:
+        selections = []
+        if args.text and args.prefix:
+            prefix_index = PrefixIndex()
+            prefix_index.load(store)
+            selections.append(patient_id for patient_id, _ in prefix_index.search(args.text, limit=args.limit))
+        elif args.text:
+            try:
+                selections.append(TextIndex(os.path.join(args.records_dir, "text_index")).search(args.text))
+            except QueryError as e:
+                print(f"Invalid query: {e}", file=sys.stderr)
+                return 2
+        if args.name:
+            selections.append(store.find_by_name(args.name))
+        if args.dob:
+            selections.append(store.find_by_dob(args.dob))
+        if args.policy:
+            selections.append(store.find_by_policy(args.policy))
+        if args.where or args.since or args.until:
+            from vitals_store import VITAL_COLUMNS
+            names = {name for name, _, _ in VITAL_COLUMNS}
+            unknown = [name for name, _, _ in args.where if name not in names]
+            if unknown:
+                print(f"Unknown vital: {', '.join(unknown)} (choose from {', '.join(sorted(names))})",
+                      file=sys.stderr)
+                return 2
+            vitals = load_vitals(store, args)
+            rows = vitals.where(args.where, since=args.since, until=args.until)
+            selections.append(vitals.patient_ids[code] for code in set(vitals.column("patient")[rows].tolist()))
+        if not selections:
+            print("Nothing to query: give TEXT or a filter", file=sys.stderr)
+            return 2
+
+        matches = set(selections[0])
+        for selection in selections[1:]:
+            matches &= set(selection)
+        for patient_id in sorted(matches)[:args.limit]:
+            if args.json:
+                print(json.dumps(store.get(patient_id), ensure_ascii=False))
+            else:
+                print(f"{patient_id}  {patient_label(store.keys(patient_id))}")
+    finally:
+        store.close()
+    print(f"{len(matches)} patients matched", file=sys.stderr)
+    return 0
+
+
+def cmd_stats(args):
+    from vital_rules import VITAL_RULES
+    from vitals_store import VITAL_COLUMNS
+    if args.by_age and args.by_age not in {name for name, _, _ in VITAL_COLUMNS}:
+        print(f"Unknown vital: {args.by_age}", file=sys.stderr)
+        return 2
+    store = open_store(args.records_dir, args.backend)
+    try:
+        patients = len(store)
+        vitals = load_vitals(store, args)
+    finally:
+        store.close()
+    stats = {"patients": patients, "records": len(vitals), "vitals": {}}
+    flags = vitals.flag_abnormal()
+    for name in VITAL_RULES:
+        summary = vitals.summary(name)
+        summary["abnormal"] = int(flags[name].sum())
+        stats["vitals"][name] = summary
+    if args.by_age:
+        stats["by_age"] = {args.by_age: vitals.mean_by_age_band(args.by_age)}
+
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return 0
+    print(f"{stats['patients']} patients, {stats['records']} records")
+    print(f"{'vital':<18} {'count':>8} {'mean':>8} {'min':>8} {'max':>8} {'abnormal':>9}")
+    for name, summary in stats["vitals"].items():
+        cells = " ".join(f"{summary[key]:>8.1f}" if summary[key] is not None else f"{'-':>8}"
+                         for key in ("mean", "min", "max"))
+        print(f"{name:<18} {summary['count']:>8} {cells} {summary['abnormal']:>9}")
+    for name, bands in stats.get("by_age", {}).items():
+        print(f"{name} by age band:")
+        for band, summary in bands.items():
+            mean = f"{summary['mean']:.1f}" if summary["mean"] is not None else "-"
+            print(f"  {band:<8} {summary['count']:>8} {mean:>8}")
+    return 0
+
+
+def cmd_reindex(args):
+    store = open_store(args.records_dir, args.backend)
+    try:
+        if args.compact_text:
+            TextIndex(os.path.join(args.records_dir, "text_index")).compact()
+            print("Compacted text index journal")
+            return 0
+        if not args.vitals_only:
+            text_index = TextIndex(os.path.join(args.records_dir, "text_index"))
+            text_index.rebuild(store)
+            print(f"Rebuilt text index for {len(text_index)} patients")
+        if not args.text_only:
+            from vitals_store import VitalsStore
+            vitals = VitalsStore().build(store)
+            vitals.save(vitals_dir(args))
+            print(f"Rebuilt vitals store with {len(vitals)} records")
+    finally:
+        store.close()
+    return 0
+
+
+def cmd_export(args):
+    from jsonl_archive import ArchiveWriter
+    store = open_store(args.records_dir, args.backend, args.compress)
+    try:
+        with ArchiveWriter(args.output, pretty=args.pretty) as writer:
+            for patient_id in store.patient_ids():
+                versions = store.versions(patient_id) if args.all_versions else [None]
+                for version in versions:
+                    writer.write(store.get(patient_id, version))
+    finally:
+        store.close()
+    print(f"Exported {writer.count} records to {args.output}")
+    return 0
+
+
+def cmd_archive(args):
+    from record_archive import write_segment
+    store = open_store(args.records_dir, args.backend, args.compress)
+    try:
+        if args.output:
+            count = write_segment(store, args.output, all_versions=not args.latest_only)
+        elif hasattr(store, "archive"):
+            count = store.archive(keep=args.keep)
+        else:
+            print("The sqlite backend keeps no per-version files to archive", file=sys.stderr)
+            return 1
+    finally:
+        store.close()
+    print(f"Archived {count} records to {args.output or 'the record store'}")
+    return 0
+
+
+def cmd_train_dictionary(args):
+    from itertools import islice
+    from record_codec import RecordCodec
+    store = open_store(args.records_dir, args.backend)
+    try:
+        samples = list(islice(store.iter_latest(), args.samples))
+    finally:
+        store.close()
+    if not samples:
+        print("No records to train on", file=sys.stderr)
+        return 1
+    dict_id = RecordCodec(os.path.join(args.records_dir, "dictionaries")).train(samples, args.size)
+    print(f"Trained dictionary {dict_id.decode('ascii')} from {len(samples)} records")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="medical_records_cli", description="Headless medical records tools")
+    parser.add_argument("--records-dir", default="medical_records", help="record store directory")
+    parser.add_argument("--backend", choices=["files", "sqlite"], default="files", help="storage backend")
+    parser.add_argument("--compress", action="store_true",
+                        help="write new record versions with the trained zlib dictionary (files backend)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="bulk-import saved JSON records or a JSON Lines archive")
+    import_parser.add_argument("source", help="directory to scan for *.json records, or a .jsonl[.gz] archive")
+    import_parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    import_parser.add_argument("--batch-size", type=int, default=2000, help="records per store commit")
+    import_parser.add_argument("--checkpoint", help="file listing already imported paths")
+    import_parser.add_argument("--errors", help="JSON Lines report of files that failed to import")
+    import_parser.add_argument("--quiet", action="store_true", help="do not print progress")
+    import_parser.set_defaults(func=cmd_import)
+
+    export_parser = subparsers.add_parser("export", help="stream records to a JSON Lines archive")
+    export_parser.add_argument("output", help="archive path; a .gz suffix enables gzip compression")
+    export_parser.add_argument("--pretty", action="store_true", help="indent records instead of one per line")
+    export_parser.add_argument("--all-versions", action="store_true", help="export every version, not only the latest")
+    export_parser.set_defaults(func=cmd_export)
+
+    validate_parser = subparsers.add_parser("validate", help="check records against the record schema")
+    validate_parser.add_argument("paths", nargs="*",
+                                 help="JSON files, directories or .jsonl[.gz] archives (default: the latest stored records)")
+    validate_parser.add_argument("--quiet", action="store_true", help="print only the summary")
+    validate_parser.set_defaults(func=cmd_validate)
+
+    query_parser = subparsers.add_parser("query", help="find patients by text, keys or vital sign ranges")
+    query_parser.add_argument("text", nargs="?", help="full-text query, e.g. 'asthma AND NOT \"chest pain\"'")
+    query_parser.add_argument("--prefix", action="store_true", help="match TEXT as a name, phone or policy prefix")
+    query_parser.add_argument("--name", help="exact patient name")
+    query_parser.add_argument("--dob", help="exact date of birth (YYYY-MM-DD)")
+    query_parser.add_argument("--policy", help="exact insurance policy number")
+    query_parser.add_argument("--where", type=parse_condition, action="append", default=[],
+                              help="vital sign condition such as heart_rate>100; repeatable")
+    query_parser.add_argument("--since", help="only encounters on or after this date")
+    query_parser.add_argument("--until", help="only encounters before this date")
+    query_parser.add_argument("--limit", type=int, default=50, help="maximum patients to print")
+    query_parser.add_argument("--json", action="store_true", help="print the latest record of each match as JSON")
+    query_parser.set_defaults(func=cmd_query)
+
+    stats_parser = subparsers.add_parser("stats", help="summarize patients and vital signs")
+    stats_parser.add_argument("--by-age", metavar="VITAL", help="also report the mean of this vital by age band")
+    stats_parser.add_argument("--json", action="store_true", help="print statistics as JSON")
+    stats_parser.set_defaults(func=cmd_stats)
+
+    reindex_parser = subparsers.add_parser("reindex", help="rebuild the full-text index and the vitals store")
+    reindex_group = reindex_parser.add_mutually_exclusive_group()
+    reindex_group.add_argument("--text-only", action="store_true", help="rebuild only the full-text index")
+    reindex_group.add_argument("--vitals-only", action="store_true", help="rebuild only the vitals store")
+    reindex_group.add_argument("--compact-text", action="store_true",
+                               help="fold the full-text journal into its snapshot without rereading the records")
+    reindex_parser.set_defaults(func=cmd_reindex)
+
+    archive_parser = subparsers.add_parser("archive", help="pack records into a read-only, offset-indexed segment file")
+    archive_parser.add_argument("output", nargs="?",
+                                help="write a standalone segment file here instead of archiving old versions in place")
+    archive_parser.add_argument("--latest-only", action="store_true",
+                                help="with output, archive only the latest version of each patient")
+    archive_parser.add_argument("--keep", type=int, default=1,
+                                help="newest versions of each patient to leave as individual files (default: 1)")
+    archive_parser.set_defaults(func=cmd_archive)
+
+    train_parser = subparsers.add_parser("train-dictionary", help="build the compression dictionary from stored records")
+    train_parser.add_argument("--samples", type=int, default=1000, help="number of records to sample")
+    train_parser.add_argument("--size", type=int, default=32 * 1024, help="dictionary size in bytes")
+    train_parser.set_defaults(func=cmd_train_dictionary)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
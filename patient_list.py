@@ -0,0 +1,134 @@
+import tkinter as tk
+from tkinter import ttk
+
+COLUMNS = [
+    ("name", "Name", 220),
+    ("dob", "Date of Birth", 110),
+    ("phone", "Phone", 120),
+    ("policy", "Policy", 120),
+]
+
+
+class PatientListWindow:
+    ROW_HEIGHT = 22
+
+    def __init__(self, root, store, on_open=None, buffer=50):
+        self.store = store
+        self.on_open = on_open
+        self.buffer = buffer
+        self.order_by = "name"
+        self.descending = False
+        self.offset = 0
+        self.visible = 20
+        self.total = 0
+        self._cache_start = 0
+        self._cache = []
+
+        self.window = tk.Toplevel(root)
+        self.window.title("Patients")
+        self.window.geometry("620x520")
+        style = ttk.Style(self.window)
+        style.configure('PatientList.Treeview', rowheight=self.ROW_HEIGHT)
+
+        frame = ttk.Frame(self.window, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.count_var = tk.StringVar()
+        ttk.Label(frame, textvariable=self.count_var).pack(anchor='w', pady=(0, 5))
+
+        table = ttk.Frame(frame)
+        table.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(table, columns=[name for name, _, _ in COLUMNS], show='headings',
+                                 selectmode='browse', style='PatientList.Treeview', height=self.visible)
+        for name, heading, width in COLUMNS:
+            self.tree.heading(name, text=heading, command=lambda name=name: self.sort_by(name))
+            self.tree.column(name, width=width, anchor='w')
+        self.scrollbar = ttk.Scrollbar(table, orient='vertical', command=self.on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+        self.tree.pack(side='left', fill=tk.BOTH, expand=True)
+
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<Double-1>', self.open_selected)
+        self.tree.bind('<Return>', self.open_selected)
+        self.tree.bind('<MouseWheel>', lambda e: self.scroll_to(self.offset - e.delta // 120 * 3))
+        self.tree.bind('<Button-4>', lambda e: self.scroll_to(self.offset - 3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll_to(self.offset + 3))
+        self.tree.bind('<Prior>', lambda e: self.scroll_to(self.offset - self.visible))
+        self.tree.bind('<Next>', lambda e: self.scroll_to(self.offset + self.visible))
+        self.tree.bind('<Home>', lambda e: self.scroll_to(0))
+        self.tree.bind('<End>', lambda e: self.scroll_to(self.total))
+
+        button_frame = ttk.Frame(frame)
+        button_frame.pack(fill='x', pady=(5, 0))
+        ttk.Button(button_frame, text="Open", command=self.open_selected).pack(side='left')
+        ttk.Button(button_frame, text="Refresh", command=self.refresh).pack(side='left', padx=5)
+
+        self.refresh()
+
+    def exists(self):
+        return bool(self.window.winfo_exists())
+
+    def lift(self):
+        self.window.deiconify()
+        self.window.lift()
+
+    def refresh(self):
+        self.total = len(self.store)
+        self._cache = []
+        self.count_var.set(f"{self.total} patients")
+        self.scroll_to(self.offset)
+
+    def sort_by(self, name):
+        if self.order_by == name:
+            self.descending = not self.descending
+        else:
+            self.order_by = name
+            self.descending = False
+        for column, heading, _ in COLUMNS:
+            marker = (" ▼" if self.descending else " ▲") if column == name else ""
+            self.tree.heading(column, text=heading + marker)
+        self._cache = []
+        self.scroll_to(0)
+
+    def on_resize(self, event):
+        visible = max(1, event.height // self.ROW_HEIGHT - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.scroll_to(self.offset)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.scroll_to(round(float(amount) * self.total))
+        elif unit == 'pages':
+            self.scroll_to(self.offset + int(amount) * self.visible)
+        else:
+            self.scroll_to(self.offset + int(amount))
+        return 'break'
+
+    def _rows(self, offset, count):
+        start = offset - self._cache_start
+        if not self._cache or start < 0 or start + count > len(self._cache):
+            self._cache_start = max(0, offset - self.buffer)
+            self._cache = self.store.page(self.order_by, self._cache_start, count + 2 * self.buffer, self.descending)
+            start = offset - self._cache_start
+        return self._cache[start:start + count]
+
+    def scroll_to(self, offset):
+        self.offset = max(0, min(offset, self.total - self.visible))
+        rows = self._rows(self.offset, min(self.visible, self.total - self.offset)) if self.total else []
+        selected = self.tree.selection()
+        self.tree.delete(*self.tree.get_children())
+        for patient_id, keys in rows:
+            self.tree.insert('', 'end', iid=patient_id,
+                             values=(keys["display"], keys["dob"], keys["phone"], keys["policy"].upper()))
+        if selected and self.tree.exists(selected[0]):
+            self.tree.selection_set(selected[0])
+        if self.total:
+            self.scrollbar.set(self.offset / self.total, min(1.0, (self.offset + self.visible) / self.total))
+        else:
+            self.scrollbar.set(0, 1)
+        return 'break'
+
+    def open_selected(self, event=None):
+        selected = self.tree.selection()
+        if selected and self.on_open is not None:
+            self.on_open(selected[0])
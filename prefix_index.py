@@ -0,0 +1,90 @@
+import bisect
+import re
+import threading
+
+from record_schema import NON_DIGIT_RE
+from record_store import normalize_name, record_keys
+
+SEPARATOR_RE = re.compile(r"[\s().+-]")
+
+
+def patient_label(keys):
+    parts = [keys.get("display") or keys.get("name", ""), f"DOB {keys['dob']}" if keys.get("dob") else ""]
+    parts.append(keys.get("phone") or keys.get("policy", "").upper())
+    return " — ".join(part for part in parts if part)
+
+
+def search_keys(keys):
+    result = set()
+    name = keys.get("name", "")
+    if name:
+        result.add(name)
+        result.update(name.split())
+    for key in ("phone", "policy"):
+        if keys.get(key):
+            result.add(keys[key])
+    return result
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = []
+        self._keys = {}
+        self._labels = {}
+
+    def load(self, store):
+        entries = []
+        keys_by_patient = {}
+        labels = {}
+        for patient_id, keys in store.iter_keys():
+            patient_keys = search_keys(keys)
+            keys_by_patient[patient_id] = patient_keys
+            labels[patient_id] = patient_label(keys)
+            entries.extend((key, patient_id) for key in patient_keys)
+        entries.sort()
+        with self._lock:
+            self._entries = entries
+            self._keys = keys_by_patient
+            self._labels = labels
+
+    def add(self, patient_id, keys):
+        new_keys = search_keys(keys)
+        with self._lock:
+            old_keys = self._keys.get(patient_id, set())
+            for key in old_keys - new_keys:
+                position = bisect.bisect_left(self._entries, (key, patient_id))
+                if position < len(self._entries) and self._entries[position] == (key, patient_id):
+                    del self._entries[position]
+            for key in new_keys - old_keys:
+                bisect.insort(self._entries, (key, patient_id))
+            self._keys[patient_id] = new_keys
+            self._labels[patient_id] = patient_label(keys)
+
+    def update_record(self, patient_id, version, record):
+        self.add(patient_id, record_keys(record))
+
+    def search(self, text, limit=10):
+        queries = [normalize_name(text)]
+        compact = SEPARATOR_RE.sub("", text)
+        if compact.isdigit():
+            queries.append(NON_DIGIT_RE.sub("", compact))
+        results = []
+        seen = set()
+        with self._lock:
+            for query in queries:
+                if not query:
+                    continue
+                position = bisect.bisect_left(self._entries, (query,))
+                while position < len(self._entries) and len(results) < limit:
+                    key, patient_id = self._entries[position]
+                    if not key.startswith(query):
+                        break
+                    if patient_id not in seen:
+                        seen.add(patient_id)
+                        results.append((patient_id, self._labels[patient_id]))
+                    position += 1
+        return results
+
+    def __len__(self):
+        return len(self._keys)
@@ -0,0 +1,149 @@
+import json
+import mmap
+import os
+import struct
+
+MAGIC = b"MRSEG001"
+HEADER = struct.Struct("<8sQQ")
+ENTRY = struct.Struct("<32sIQI")
+COMPACT_SEPARATORS = (",", ":")
+
+
+def entry_key(patient_id):
+    key = patient_id.encode("ascii")
+    if len(key) > 32:
+        raise ValueError(f"Patient id too long for a segment index: {patient_id!r}")
+    return key.ljust(32, b"\0")
+
+
+class SegmentWriter:
+    def __init__(self, path):
+        self.path = path
+        self._temp_path = path + ".tmp"
+        self._file = open(self._temp_path, "wb")
+        self._file.write(HEADER.pack(MAGIC, 0, 0))
+        self._offset = HEADER.size
+        self._entries = []
+        self.count = 0
+
+    def add(self, patient_id, version, record):
+        data = json.dumps(record, separators=COMPACT_SEPARATORS, ensure_ascii=False).encode("utf-8")
+        self._entries.append((entry_key(patient_id), version, self._offset, len(data)))
+        self._file.write(data)
+        self._offset += len(data)
+        self.count += 1
+
+    def close(self):
+        self._entries.sort()
+        index = bytearray(ENTRY.size * len(self._entries))
+        for position, entry in enumerate(self._entries):
+            ENTRY.pack_into(index, position * ENTRY.size, *entry)
+        self._file.write(index)
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, len(self._entries), self._offset))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._temp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        os.remove(self._temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class Segment:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, self._index_offset = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"Not a record segment: {path}")
+        self._view = memoryview(self._map)
+
+    def close(self):
+        self._view.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self._count
+
+    def _entry(self, position):
+        return ENTRY.unpack_from(self._map, self._index_offset + position * ENTRY.size)
+
+    def _bisect(self, key, version):
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[:2] < (key, version):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _range(self, patient_id):
+        key = entry_key(patient_id)
+        return self._bisect(key, 0), self._bisect(key, 0xFFFFFFFF)
+
+    def versions(self, patient_id):
+        start, end = self._range(patient_id)
+        return [self._entry(position)[1] for position in range(start, end)]
+
+    def lookup(self, patient_id, version=None):
+        start, end = self._range(patient_id)
+        if start == end:
+            raise KeyError(patient_id)
+        if version is None:
+            position = end - 1
+        else:
+            position = self._bisect(entry_key(patient_id), version)
+            if position == end or self._entry(position)[1] != version:
+                raise KeyError((patient_id, version))
+        _, _, offset, length = self._entry(position)
+        return self._view[offset:offset + length]
+
+    def get(self, patient_id, version=None):
+        view = self.lookup(patient_id, version)
+        try:
+            return json.loads(bytes(view))
+        finally:
+            view.release()
+
+    def __contains__(self, patient_id):
+        start, end = self._range(patient_id)
+        return start < end
+
+    def patient_ids(self):
+        previous = None
+        for position in range(self._count):
+            key = self._entry(position)[0]
+            if key != previous:
+                previous = key
+                yield key.rstrip(b"\0").decode("ascii")
+
+
+def write_segment(store, path, patient_ids=None, all_versions=True):
+    with SegmentWriter(path) as writer:
+        for patient_id in patient_ids or store.patient_ids():
+            versions = store.versions(patient_id) if all_versions else [store.latest_version(patient_id)]
+            for version in versions:
+                writer.add(patient_id, version, store.get(patient_id, version))
+    return writer.count
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import zlib
+from collections import Counter
+
+MAGIC = b"MRZ1"
+ID_SIZE = 8
+NO_DICTIONARY = b"0" * ID_SIZE
+DICTIONARY_SIZE = 32 * 1024
+COMPACT_SEPARATORS = (",", ":")
+
+
+def dumps_compact(record):
+    return json.dumps(record, separators=COMPACT_SEPARATORS, ensure_ascii=False).encode("utf-8")
+
+
+def skeleton(record):
+    if isinstance(record, dict):
+        return {key: skeleton(value) for key, value in record.items()}
+    if isinstance(record, list):
+        return [skeleton(value) for value in record[:1]]
+    return ""
+
+
+def fragments(record, counts, max_length=64):
+    for key, value in record.items():
+        counts[json.dumps(key, ensure_ascii=False) + ":"] += 1
+        if isinstance(value, dict):
+            fragments(value, counts, max_length)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    fragments(item, counts, max_length)
+        elif isinstance(value, str) and 1 < len(value) <= max_length:
+            counts[json.dumps(value, ensure_ascii=False)] += 1
+
+
+def build_dictionary(records, size=DICTIONARY_SIZE):
+    counts = Counter()
+    skeletons = Counter()
+    for record in records:
+        fragments(record, counts)
+        skeletons[dumps_compact(skeleton(record))] += 1
+    # zlib reaches back at most 32 KiB and prefers short distances, so the
+    # most valuable content goes at the end of the dictionary.
+    ranked = sorted((item for item in counts.items() if item[1] > 1),
+                    key=lambda item: (item[1] * len(item[0]), item[0]))
+    parts = [fragment.encode("utf-8") for fragment, _ in ranked]
+    parts.extend(template for template, _ in sorted(skeletons.items(), key=lambda item: item[1])[-4:])
+    return b"".join(parts)[-size:]
+
+
+def dictionary_id(dictionary):
+    return hashlib.sha1(dictionary).hexdigest()[:ID_SIZE].encode("ascii")
+
+
+class RecordCodec:
+    CURRENT_FILE = "current"
+
+    def __init__(self, directory, level=9):
+        self.directory = directory
+        self.level = level
+        self._dictionaries = {NO_DICTIONARY: b""}
+        self.current_id = NO_DICTIONARY
+        current_path = os.path.join(directory, self.CURRENT_FILE)
+        if os.path.exists(current_path):
+            with open(current_path, "rb") as f:
+                self.current_id = f.read().strip()
+
+    def _path(self, dict_id):
+        return os.path.join(self.directory, dict_id.decode("ascii") + ".zdict")
+
+    def dictionary(self, dict_id):
+        dictionary = self._dictionaries.get(dict_id)
+        if dictionary is None:
+            with open(self._path(dict_id), "rb") as f:
+                dictionary = f.read()
+            self._dictionaries[dict_id] = dictionary
+        return dictionary
+
+    def train(self, records, size=DICTIONARY_SIZE):
+        dictionary = build_dictionary(records, size)
+        dict_id = dictionary_id(dictionary)
+        os.makedirs(self.directory, exist_ok=True)
+        for path, data in ((self._path(dict_id), dictionary), (os.path.join(self.directory, self.CURRENT_FILE), dict_id)):
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        self._dictionaries[dict_id] = dictionary
+        self.current_id = dict_id
+        return dict_id
+
+    def encode(self, record):
+        dictionary = self.dictionary(self.current_id)
+        if dictionary:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, zdict=dictionary)
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        return MAGIC + self.current_id + compressor.compress(dumps_compact(record)) + compressor.flush()
+
+    def decode(self, data):
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a compressed record")
+        start = len(MAGIC) + ID_SIZE
+        dictionary = self.dictionary(bytes(data[len(MAGIC):start]))
+        if dictionary:
+            decompressor = zlib.decompressobj(-15, zdict=dictionary)
+        else:
+            decompressor = zlib.decompressobj(-15)
+        return json.loads(decompressor.decompress(data[start:]) + decompressor.flush())
@@ -0,0 +1,61 @@
+import copy
+
+
+def flatten(record, prefix=()):
+    items = {}
+    for key, value in record.items():
+        path = prefix + (key,)
+        if isinstance(value, dict) and value:
+            items.update(flatten(value, path))
+        else:
+            items[path] = value
+    return items
+
+
+def diff_records(old, new, prefix=()):
+    delta = {"set": [], "unset": []}
+    for key in old:
+        if key not in new:
+            delta["unset"].append(list(prefix + (key,)))
+    for key, value in new.items():
+        path = prefix + (key,)
+        if key in old and isinstance(old[key], dict) and isinstance(value, dict):
+            child = diff_records(old[key], value, path)
+            delta["set"].extend(child["set"])
+            delta["unset"].extend(child["unset"])
+        elif key not in old or old[key] != value:
+            delta["set"].append([list(path), value])
+    return delta
+
+
+def apply_delta(record, delta):
+    record = copy.deepcopy(record)
+    for path in delta.get("unset", ()):
+        parent = record
+        for key in path[:-1]:
+            parent = parent.get(key)
+            if not isinstance(parent, dict):
+                break
+        else:
+            parent.pop(path[-1], None)
+    for path, value in delta.get("set", ()):
+        parent = record
+        for key in path[:-1]:
+            child = parent.get(key)
+            if not isinstance(child, dict):
+                child = parent[key] = {}
+            parent = child
+        parent[path[-1]] = value
+    return record
+
+
+def record_changes(old, new):
+    old_items = flatten(old)
+    new_items = flatten(new)
+    changes = []
+    for path in sorted(old_items.keys() | new_items.keys()):
+        old_value = old_items.get(path)
+        new_value = new_items.get(path)
+        if old_value != new_value:
+            changes.append((".".join(path), old_value, new_value))
+    return changes
@@ -0,0 +1,337 @@
+import re
+import sys
+
+from vital_rules import parse_reading
+
+INTEGER_RE = re.compile(r"[-+]?\d+")
+DECIMAL_RE = re.compile(r"[-+]?(\d+\.\d*|\.\d+|\d+)([eE][-+]?\d+)?")
+MISSING = object()
+
+
+def load_text(value):
+    return value if isinstance(value, str) else ""
+
+
+def load_label(value):
+    return sys.intern(value) if isinstance(value, str) else ""
+
+
+def load_number(value):
+    # Text that is not a plain decimal number is kept as-is so records that
+    # bypassed the form validators survive a round trip unchanged.
+    if not isinstance(value, str):
+        return None if value is None or isinstance(value, bool) else value
+    text = value.strip()
+    if INTEGER_RE.fullmatch(text):
+        return int(text)
+    if DECIMAL_RE.fullmatch(text):
+        return parse_reading(text)
+    return value or None
+
+
+def dump_number(value):
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+TEXT = (load_text, None)
+LABEL = (load_label, None)
+NUMBER = (load_number, dump_number)
+
+
+def nested(model):
+    return (model.from_dict, model.to_dict)
+
+
+def nested_list(model):
+    def load(value):
+        return [model.from_dict(entry) for entry in value] if isinstance(value, list) else []
+
+    def dump(value):
+        return [entry.to_dict() for entry in value]
+
+    return (load, dump)
+
+
+def slot_names(fields):
+    return tuple(name for name, _, _ in fields)
+
+
+def lookup(data, key):
+    if not isinstance(key, tuple):
+        return data.get(key, MISSING)
+    for part in key:
+        if not isinstance(data, dict):
+            return MISSING
+        data = data.get(part, MISSING)
+    return data
+
+
+class Model:
+    # _absent holds the fields missing from the source dict (None if all
+    # were present) so to_dict does not add empty keys to partial records.
+    __slots__ = ("_absent",)
+    FIELDS = ()
+
+    def __init__(self, **values):
+        self._absent = None
+        for name, _, (load, _) in self.FIELDS:
+            setattr(self, name, values.pop(name) if name in values else load(None))
+        if values:
+            raise TypeError(f"{type(self).__name__} has no field {next(iter(values))!r}")
+
+    @classmethod
+    def from_dict(cls, data):
+        model = cls.__new__(cls)
+        if not isinstance(data, dict):
+            data = {}
+        absent = []
+        for name, key, (load, _) in cls.FIELDS:
+            value = lookup(data, key)
+            if value is MISSING:
+                absent.append(name)
+                value = None
+            setattr(model, name, load(value))
+        model._absent = frozenset(absent) if absent else None
+        return model
+
+    def dump_field(self, name, dump):
+        value = getattr(self, name)
+        return value if dump is None else dump(value)
+
+    def to_dict(self):
+        data = {}
+        absent = self._absent or ()
+        for name, key, (_, dump) in self.FIELDS:
+            value = self.dump_field(name, dump)
+            if name in absent and value in ("", [], {}):
+                continue
+            if isinstance(key, tuple):
+                data.setdefault(key[0], {})[key[1]] = value
+            else:
+                data[key] = value
+        return data
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__ if not name.startswith("_"))
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name, _, _ in self.FIELDS)
+        return f"{type(self).__name__}({values})"
+
+
+class EmergencyContact(Model):
+    FIELDS = (
+        ("name", "name", TEXT),
+        ("phone", "phone", TEXT),
+        ("relationship", "relationship", LABEL),
+    )
+    __slots__ = slot_names(FIELDS)
+
+
+class Insurance(Model):
+    FIELDS = (
+        ("provider", "provider", LABEL),
+        ("id", "id", TEXT),
+        ("group_number", "group_number", TEXT),
+    )
+    __slots__ = slot_names(FIELDS)
+
+
+class PersonalInfo(Model):
+    FIELDS = (
+        ("name", "name", TEXT),
+        ("dob", "dob", LABEL),
+        ("gender", "gender", LABEL),
+        ("phone", "phone", TEXT),
+        ("email", "email", TEXT),
+        ("emergency_contact", "emergency_contact", nested(EmergencyContact)),
+        ("insurance", "insurance", nested(Insurance)),
+    )
+    __slots__ = slot_names(FIELDS)
+
+
+class PastMedical(Model):
+    FIELDS = (
+        ("chronic_conditions", "chronic_conditions", TEXT),
+        ("surgeries", "surgeries", TEXT),
+        ("hospitalizations", "hospitalizations", TEXT),
+    )
+    __slots__ = slot_names(FIELDS)
+
+
+class SocialHistory(Model):
+    FIELDS = (
+        ("smoking", "smoking", LABEL),
+        ("alcohol", "alcohol", LABEL),
+        ("drug_use", "drug_use", LABEL),
+        ("occupation", "occupation", LABEL),
+        ("lifestyle", "lifestyle", TEXT),
+    )
+    __slots__ = slot_names(FIELDS)
+
+
+class MedicalInfo(Model):
+    FIELDS = (
+        ("past_medical", "past_medical", nested(PastMedical)),
+        ("family_history", "family_history", TEXT),
+        ("social_history", "social_history", nested(SocialHistory)),
+        ("allergies", "allergies", TEXT),
+        ("immunizations", "immunizations", TEXT),
+        ("medications", "medications", TEXT),
+    )
+    __slots__ = slot_names(FIELDS)
+
+
+class VitalSigns(Model):
+    FIELDS = (
+        ("systolic", ("blood_pressure", "systolic"), NUMBER),
+        ("diastolic", ("blood_pressure", "diastolic"), NUMBER),
+        ("heart_rate", "heart_rate", NUMBER),
+        ("respiratory_rate", "respiratory_rate", NUMBER),
+        ("temperature", "temperature", NUMBER),
+        ("height", "height", NUMBER),
+        ("weight", "weight", NUMBER),
+        ("bmi", "bmi", NUMBER),
+        ("bmi_category", "bmi_category", LABEL),
+    )
+    # _source maps fields whose stored value would not come back unchanged
+    # from dump (e.g. "37.50", "0120", 120) to that stored value.
+    __slots__ = slot_names(FIELDS) + ("_source",)
+
+    def __init__(self, **values):
+        super().__init__(**values)
+        self._source = None
+
+    @classmethod
+    def from_dict(cls, data):
+        model = super().from_dict(data)
+        source = {}
+        if isinstance(data, dict):
+            for name, key, (load, dump) in cls.FIELDS:
+                value = lookup(data, key)
+                if value is not MISSING and dump is not None and dump(getattr(model, name)) != value:
+                    source[name] = value
+        model._source = source or None
+        return model
+
+    def dump_field(self, name, dump):
+        value = getattr(self, name)
+        if self._source and name in self._source and load_number(self._source[name]) == value:
+            return self._source[name]
+        return value if dump is None else dump(value)
+
+
+class Heent(Model):
+    FIELDS = (
+        ("head", "head", TEXT),
+        ("eyes", "eyes", TEXT),
+        ("ears", "ears", TEXT),
+        ("nose", "nose", TEXT),
+        ("throat", "throat", TEXT),
+    )
+    __slots__ = slot_names(FIELDS)
+
+
+class PhysicalExamination(Model):
+    FIELDS = (
+        ("general_appearance", "general_appearance", TEXT),
+        ("heent", "heent", nested(Heent)),
+        ("cardiovascular", "cardiovascular", TEXT),
+        ("respiratory", "respiratory", TEXT),
+        ("abdomen", "abdomen", TEXT),
+        ("musculoskeletal", "musculoskeletal", TEXT),
+        ("neurological", "neurological", TEXT),
+    )
+    __slots__ = slot_names(FIELDS)
+
+
+class LabTest(Model):
+    FIELDS = (
+        ("type", "type", LABEL),
+        ("date", "date", LABEL),
+        ("results", "results", TEXT),
+    )
+    __slots__ = slot_names(FIELDS)
+
+
+class ImagingStudy(Model):
+    FIELDS = (
+        ("type", "type", LABEL),
+        ("body_part", "body_part", LABEL),
+        ("date", "date", LABEL),
+        ("findings", "findings", TEXT),
+    )
+    __slots__ = slot_names(FIELDS)
+
+
+class Biopsy(Model):
+    FIELDS = (
+        ("type", "type", LABEL),
+        ("site", "site", LABEL),
+        ("date", "date", LABEL),
+        ("results", "results", TEXT),
+    )
+    __slots__ = slot_names(FIELDS)
+
+
+class EcgResult(Model):
+    FIELDS = LabTest.FIELDS
+    __slots__ = slot_names(FIELDS)
+
+
+class OtherTest(Model):
+    FIELDS = LabTest.FIELDS
+    __slots__ = slot_names(FIELDS)
+
+
+TEST_MODELS = {
+    "lab_tests": LabTest,
+    "imaging_studies": ImagingStudy,
+    "biopsies": Biopsy,
+    "ecg_results": EcgResult,
+    "other_tests": OtherTest,
+}
+
+
+class DiagnosticTests(Model):
+    FIELDS = tuple((name, name, nested_list(model)) for name, model in TEST_MODELS.items())
+    __slots__ = slot_names(FIELDS)
+
+
+class MedicalRecord(Model):
+    FIELDS = (
+        ("personal_info", "personal_info", nested(PersonalInfo)),
+        ("medical_info", "medical_info", nested(MedicalInfo)),
+        ("vital_signs", "vital_signs", nested(VitalSigns)),
+        ("physical_examination", "physical_examination", nested(PhysicalExamination)),
+        ("diagnostic_tests", "diagnostic_tests", nested(DiagnosticTests)),
+        ("notes", "notes", TEXT),
+        ("date_created", "date_created", LABEL),
+    )
+    __slots__ = slot_names(FIELDS) + ("extra",)
+    KEYS = frozenset(key for _, key, _ in FIELDS)
+
+    def __init__(self, extra=None, **values):
+        super().__init__(**values)
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data):
+        model = super().from_dict(data)
+        extra = {key: value for key, value in data.items() if key not in cls.KEYS} if isinstance(data, dict) else None
+        model.extra = extra or None
+        return model
+
+    def to_dict(self):
+        data = super().to_dict()
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+def load_latest(store):
+    return {patient_id: MedicalRecord.from_dict(store.get(patient_id)) for patient_id in store.patient_ids()}
@@ -0,0 +1,131 @@
+import re
+
+NON_DIGIT_RE = re.compile(r"\D")
+EMAIL_RE = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+PHONE_DIGITS = 10
+
+SECTIONS = ["personal_info", "medical_info", "vital_signs", "physical_examination", "diagnostic_tests"]
+
+REQUIRED_FIELDS = [
+    ("Full Name", ("personal_info", "name")),
+    ("Date of Birth", ("personal_info", "dob")),
+    ("Gender", ("personal_info", "gender")),
+    ("Phone", ("personal_info", "phone")),
+    ("Email", ("personal_info", "email")),
+    ("Emergency Contact Name", ("personal_info", "emergency_contact", "name")),
+    ("Emergency Contact Phone", ("personal_info", "emergency_contact", "phone")),
+    ("Emergency Contact Relationship", ("personal_info", "emergency_contact", "relationship")),
+    ("Insurance Provider", ("personal_info", "insurance", "provider")),
+    ("Insurance ID", ("personal_info", "insurance", "id")),
+]
+
+TEST_LISTS = {
+    "lab_tests": ("type", "date", "results"),
+    "imaging_studies": ("type", "body_part", "date", "findings"),
+    "biopsies": ("type", "site", "date", "results"),
+    "ecg_results": ("type", "date", "results"),
+    "other_tests": ("type", "date", "results"),
+}
+
+SMOKING_STATUSES = ["Never", "Former", "Current"]
+ALCOHOL_STATUSES = ["None", "Occasional", "Regular"]
+DRUG_STATUSES = ["None", "Past", "Current"]
+
+FORM_FIELDS = [
+    (("personal_info", "name"), "name_var", "var"),
+    (("personal_info", "dob"), "dob_calendar", "date"),
+    (("personal_info", "gender"), "gender_var", "var"),
+    (("personal_info", "phone"), "phone_var", "var"),
+    (("personal_info", "email"), "email_var", "var"),
+    (("personal_info", "emergency_contact", "name"), "emergency_name_var", "var"),
+    (("personal_info", "emergency_contact", "phone"), "emergency_phone_var", "var"),
+    (("personal_info", "emergency_contact", "relationship"), "emergency_relation_var", "var"),
+    (("personal_info", "insurance", "provider"), "insurance_provider_var", "var"),
+    (("personal_info", "insurance", "id"), "policy_number_var", "var"),
+    (("personal_info", "insurance", "group_number"), "coverage_text", "text"),
+    (("medical_info", "past_medical", "chronic_conditions"), "chronic_conditions_text", "text"),
+    (("medical_info", "past_medical", "surgeries"), "surgeries_text", "text"),
+    (("medical_info", "past_medical", "hospitalizations"), "hospitalizations_text", "text"),
+    (("medical_info", "family_history"), "family_history_text", "text"),
+    (("medical_info", "social_history", "smoking"), "smoking_var", "var"),
+    (("medical_info", "social_history", "alcohol"), "alcohol_var", "var"),
+    (("medical_info", "social_history", "drug_use"), "drug_var", "var"),
+    (("medical_info", "social_history", "occupation"), "occupation_var", "var"),
+    (("medical_info", "social_history", "lifestyle"), "lifestyle_text", "text"),
+    (("medical_info", "allergies"), "allergies_text", "text"),
+    (("medical_info", "immunizations"), "immunization_text", "text"),
+    (("medical_info", "medications"), "medications_text", "text"),
+    (("vital_signs", "blood_pressure", "systolic"), "bp_systolic_var", "var"),
+    (("vital_signs", "blood_pressure", "diastolic"), "bp_diastolic_var", "var"),
+    (("vital_signs", "heart_rate"), "heart_rate_var", "var"),
+    (("vital_signs", "respiratory_rate"), "respiratory_rate_var", "var"),
+    (("vital_signs", "temperature"), "temperature_var", "var"),
+    (("vital_signs", "height"), "height_var", "var"),
+    (("vital_signs", "weight"), "weight_var", "var"),
+    (("vital_signs", "bmi"), "bmi_var", "var"),
+    (("vital_signs", "bmi_category"), "bmi_category_var", "band"),
+    (("physical_examination", "general_appearance"), "general_appearance_text", "text"),
+    (("physical_examination", "heent", "head"), "head_text", "text"),
+    (("physical_examination", "heent", "eyes"), "eyes_text", "text"),
+    (("physical_examination", "heent", "ears"), "ears_text", "text"),
+    (("physical_examination", "heent", "nose"), "nose_text", "text"),
+    (("physical_examination", "heent", "throat"), "throat_text", "text"),
+    (("physical_examination", "cardiovascular"), "cv_text", "text"),
+    (("physical_examination", "respiratory"), "resp_text", "text"),
+    (("physical_examination", "abdomen"), "abdomen_text", "text"),
+    (("physical_examination", "musculoskeletal"), "msk_text", "text"),
+    (("physical_examination", "neurological"), "neuro_text", "text"),
+] + [(("diagnostic_tests", name), name, "list") for name in TEST_LISTS] + [
+    (("notes",), "notes_text", "text"),
+]
+
+
+def get_path(record, path, default=""):
+    value = record
+    for key in path:
+        if not isinstance(value, dict):
+            return default
+        value = value.get(key, default)
+    return default if value is None else value
+
+
+def set_path(record, path, value):
+    for key in path[:-1]:
+        record = record.setdefault(key, {})
+    record[path[-1]] = value
+
+
+def normalize_phone(phone):
+    return NON_DIGIT_RE.sub("", phone)[:PHONE_DIGITS]
+
+
+def is_valid_email(email):
+    return EMAIL_RE.match(email) is not None
+
+
+def missing_required_fields(record):
+    missing = []
+    for label, path in REQUIRED_FIELDS:
+        value = get_path(record, path)
+        if not isinstance(value, str) or not value.strip():
+            missing.append(label)
+    return missing
+
+
+def validate_record(record):
+    if not isinstance(record, dict):
+        return ["Record is not a JSON object"]
+    errors = []
+    for section in SECTIONS:
+        if not isinstance(record.get(section), dict):
+            errors.append(f"Missing section: {section}")
+    missing = missing_required_fields(record)
+    if missing:
+        errors.append(f"Missing required fields: {', '.join(missing)}")
+    tests = record.get("diagnostic_tests")
+    if isinstance(tests, dict):
+        for name in TEST_LISTS:
+            entries = tests.get(name, [])
+            if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+                errors.append(f"diagnostic_tests.{name} must be a list of objects")
+    return errors
@@ -0,0 +1,432 @@
+import bisect
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+from record_archive import Segment, SegmentWriter
+from record_codec import RecordCodec
+from record_delta import apply_delta, diff_records, record_changes
+from record_schema import NON_DIGIT_RE
+
+SORT_KEYS = ("name", "dob", "policy", "phone")
+
+
+def normalize_name(name):
+    return " ".join(name.lower().split())
+
+
+def normalize_key(value):
+    return value.strip().lower()
+
+
+def record_keys(record):
+    personal = record.get("personal_info", {})
+    return {
+        "name": normalize_name(personal.get("name", "")),
+        "dob": personal.get("dob", "").strip(),
+        "policy": normalize_key(personal.get("insurance", {}).get("id", "")),
+        "display": " ".join(personal.get("name", "").split()),
+        "phone": NON_DIGIT_RE.sub("", personal.get("phone", "")),
+    }
+
+
+def write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+@contextmanager
+def locked_file(path):
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class RecordStore:
+    INDEX_FILE = "index.log"
+    LOCK_FILE = "index.lock"
+    DELTA_SUFFIX = ".delta.json"
+    COMPRESSED_SUFFIX = ".mrz"
+    SEGMENT_SUFFIX = ".seg"
+    SEGMENTS_DIR = "segments"
+
+    def __init__(self, records_dir="medical_records", rebase_every=10, compress=False):
+        self.records_dir = records_dir
+        self.rebase_every = rebase_every
+        self.compress = compress
+        self.codec = RecordCodec(os.path.join(records_dir, "dictionaries"))
+        os.makedirs(self.records_dir, exist_ok=True)
+        self.index_path = os.path.join(self.records_dir, self.INDEX_FILE)
+        self.lock_path = os.path.join(self.records_dir, self.LOCK_FILE)
+        # _write_lock serializes this process's writers for the whole save;
+        # _lock guards the in-memory index and is held only briefly, so
+        # readers on the UI thread never wait on a writer's fsyncs.
+        self._write_lock = threading.Lock()
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._segments = {}
+        self._reload()
+
+    def close(self):
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments = {}
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _reload(self):
+        with self._lock:
+            self._index_offset = 0
+            self._torn_tail = False
+            self._record_count = 0
+            self._versions = {}
+            self._keys = {}
+            self._by_name = {}
+            self._by_dob = {}
+            self._by_policy = {}
+            self._sorted = {}
+            self.refresh()
+
+    def refresh(self):
+        # Applies entries appended by other processes since the last read.
+        # A trailing line without a newline is either being written or was
+        # torn by a crash; it is left for the next refresh.
+        with self._lock:
+            try:
+                f = open(self.index_path, "rb")
+            except FileNotFoundError:
+                return
+            with f:
+                f.seek(self._index_offset)
+                data = f.read()
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn line from an interrupted save; the record file
+                    # it points to may not exist either.
+                    continue
+                self._apply(entry)
+            self._index_offset += end
+            self._torn_tail = end < len(data)
+
+    def _append_index(self, entries):
+        lines = "".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries)
+        # Held across the append so a concurrent refresh cannot read these
+        # lines before the offset moves past them.
+        with self._lock:
+            if self._torn_tail:
+                # Terminate a line torn by a crash so it cannot swallow ours.
+                lines = "\n" + lines
+            with open(self.index_path, "ab") as f:
+                f.write(lines.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+                self._index_offset = f.tell()
+            self._torn_tail = False
+
+    def _apply(self, entry):
+        patient_id = entry["id"]
+        if "archive" in entry:
+            versions = self._versions[patient_id]
+            for version in entry["versions"]:
+                versions[version - 1] = entry["archive"]
+            return
+        versions = self._versions.setdefault(patient_id, [])
+        versions.append(entry["path"])
+        self._record_count += 1
+
+        old_keys = self._keys.get(patient_id)
+        if old_keys:
+            self._unindex(self._by_name, old_keys["name"], patient_id)
+            self._unindex(self._by_dob, old_keys["dob"], patient_id)
+            self._unindex(self._by_policy, old_keys["policy"], patient_id)
+
+        keys = {key: entry.get(key, "") for key in ("name", "dob", "policy", "display", "phone")}
+        self._keys[patient_id] = keys
+        for order_by, entries in self._sorted.items():
+            if old_keys:
+                position = bisect.bisect_left(entries, (old_keys[order_by], patient_id))
+                del entries[position]
+            bisect.insort(entries, (keys[order_by], patient_id))
+        self._index(self._by_name, keys["name"], patient_id)
+        self._index(self._by_dob, keys["dob"], patient_id)
+        self._index(self._by_policy, keys["policy"], patient_id)
+
+    @staticmethod
+    def _index(index, key, patient_id):
+        if key:
+            index.setdefault(key, set()).add(patient_id)
+
+    @staticmethod
+    def _unindex(index, key, patient_id):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(patient_id)
+            if not ids:
+                del index[key]
+
+    def resolve_patient(self, record):
+        keys = record_keys(record)
+        if keys["policy"] and keys["dob"]:
+            matches = self._by_policy.get(keys["policy"], set()) & self._by_dob.get(keys["dob"], set())
+            if len(matches) == 1:
+                return next(iter(matches))
+        if keys["name"] and keys["dob"]:
+            matches = self._by_name.get(keys["name"], set()) & self._by_dob.get(keys["dob"], set())
+            if keys["policy"]:
+                # Same name and birth date but a different policy is a
+                # different person; only adopt charts that lack a policy.
+                matches = {patient_id for patient_id in matches if not self._keys[patient_id]["policy"]}
+            if len(matches) == 1:
+                return next(iter(matches))
+        return None
+
+    def save(self, record, patient_id=None):
+        return self.save_many([(record, patient_id)])[0]
+
+    def save_many(self, items):
+        with self._write_lock, locked_file(self.lock_path):
+            self.refresh()
+            saved_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            entries = []
+            results = []
+            try:
+                for item in items:
+                    record, patient_id = item if isinstance(item, tuple) else (item, None)
+                    with self._lock:
+                        patient_id = patient_id or record.get("patient_id") or self.resolve_patient(record) or uuid.uuid4().hex
+                        versions = list(self._versions.get(patient_id, ()))
+                    version = len(versions) + 1
+                    stored = dict(record, patient_id=patient_id, version=version)
+                    relative_path, data = self._encode(patient_id, versions, stored)
+                    write_atomic(os.path.join(self.records_dir, relative_path), data)
+
+                    entry = dict(record_keys(record), id=patient_id, v=version, path=relative_path, saved=saved_at)
+                    # Applied right away so later records in the batch resolve
+                    # against it; the index log is appended once at the end.
+                    with self._lock:
+                        self._apply(entry)
+                    entries.append(entry)
+                    results.append((patient_id, version, stored))
+                self._append_index(entries)
+            except BaseException:
+                self._reload()
+                raise
+        for patient_id, version, stored in results:
+            for callback in self._listeners:
+                callback(patient_id, version, stored)
+        return [(patient_id, version) for patient_id, version, _ in results]
+
+    def _encode(self, patient_id, versions, stored):
+        directory = os.path.join(patient_id[:2], patient_id)
+        version = stored["version"]
+        chain = self._chain_start(versions, len(versions))
+        if versions and version - chain < self.rebase_every:
+            delta = diff_records(self._read(patient_id, versions, len(versions)), stored)
+            delta["parent"] = version - 1
+            data = json.dumps(delta, separators=(",", ":")).encode("utf-8")
+            if len(data) * 2 < len(json.dumps(stored)):
+                return os.path.join(directory, f"v{version}{self.DELTA_SUFFIX}"), data
+        if self.compress:
+            return os.path.join(directory, f"v{version}{self.COMPRESSED_SUFFIX}"), self.codec.encode(stored)
+        return os.path.join(directory, f"v{version}.json"), json.dumps(stored, indent=4).encode("utf-8")
+
+    def _chain_start(self, versions, version):
+        while version > 1 and versions[version - 1].endswith(self.DELTA_SUFFIX):
+            version -= 1
+        return version
+
+    def _segment(self, relative_path):
+        with self._lock:
+            segment = self._segments.get(relative_path)
+            if segment is None:
+                segment = Segment(os.path.join(self.records_dir, relative_path))
+                self._segments[relative_path] = segment
+            return segment
+
+    def _load_file(self, patient_id, version, relative_path):
+        if relative_path.endswith(self.SEGMENT_SUFFIX):
+            return self._segment(relative_path).get(patient_id, version)
+        if relative_path.endswith(self.COMPRESSED_SUFFIX):
+            with open(os.path.join(self.records_dir, relative_path), "rb") as f:
+                return self.codec.decode(f.read())
+        with open(os.path.join(self.records_dir, relative_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _read(self, patient_id, versions, version):
+        start = self._chain_start(versions, version)
+        record = self._load_file(patient_id, start, versions[start - 1])
+        for number, path in enumerate(versions[start:version], start + 1):
+            record = apply_delta(record, self._load_file(patient_id, number, path))
+        return record
+
+    def _lookup(self, patient_id, version):
+        with self._lock:
+            versions = self._versions.get(patient_id)
+            if not versions:
+                raise KeyError(patient_id)
+            if version is None:
+                version = len(versions)
+            if not 1 <= version <= len(versions):
+                raise KeyError((patient_id, version))
+            return versions[:version], version
+
+    def get(self, patient_id, version=None):
+        versions, version = self._lookup(patient_id, version)
+        try:
+            return self._read(patient_id, versions, version)
+        except FileNotFoundError:
+            # Another process archived these files since the index was read.
+            self.refresh()
+            versions, version = self._lookup(patient_id, version)
+            return self._read(patient_id, versions, version)
+
+    def archive(self, keep=1):
+        # Packs every version but the newest `keep` of each patient into a
+        # new segment. The per-version files are removed only after the
+        # segment and the index entries pointing at it are on disk.
+        with self._write_lock, locked_file(self.lock_path):
+            self.refresh()
+            selected = {}
+            with self._lock:
+                for patient_id, versions in self._versions.items():
+                    numbers = [number for number, path in enumerate(versions[:max(len(versions) - keep, 0)], 1)
+                               if not path.endswith(self.SEGMENT_SUFFIX)]
+                    if numbers:
+                        selected[patient_id] = (numbers, list(versions))
+            if not selected:
+                return 0
+            segments_dir = os.path.join(self.records_dir, self.SEGMENTS_DIR)
+            os.makedirs(segments_dir, exist_ok=True)
+            existing = [int(name[:-len(self.SEGMENT_SUFFIX)]) for name in os.listdir(segments_dir)
+                        if name.endswith(self.SEGMENT_SUFFIX) and name[:-len(self.SEGMENT_SUFFIX)].isdigit()]
+            relative_path = os.path.join(self.SEGMENTS_DIR, f"{max(existing, default=0) + 1:06d}{self.SEGMENT_SUFFIX}")
+            with SegmentWriter(os.path.join(self.records_dir, relative_path)) as writer:
+                for patient_id, (numbers, versions) in selected.items():
+                    for number in numbers:
+                        writer.add(patient_id, number, self._read(patient_id, versions, number))
+            replaced = [versions[number - 1] for numbers, versions in selected.values() for number in numbers]
+            entries = [{"archive": relative_path, "id": patient_id, "versions": numbers}
+                       for patient_id, (numbers, _) in selected.items()]
+            with self._lock:
+                self._append_index(entries)
+                for entry in entries:
+                    self._apply(entry)
+            for path in replaced:
+                try:
+                    os.remove(os.path.join(self.records_dir, path))
+                except FileNotFoundError:
+                    pass
+            return writer.count
+
+    def diff(self, patient_id, old_version, new_version=None):
+        return record_changes(self.get(patient_id, old_version), self.get(patient_id, new_version))
+
+    def versions(self, patient_id):
+        with self._lock:
+            return list(range(1, len(self._versions.get(patient_id, ())) + 1))
+
+    def latest_version(self, patient_id):
+        with self._lock:
+            return len(self._versions.get(patient_id, ()))
+
+    def record_count(self):
+        with self._lock:
+            return self._record_count
+
+    def latest_versions(self):
+        with self._lock:
+            return {patient_id: len(versions) for patient_id, versions in self._versions.items()}
+
+    def keys(self, patient_id):
+        with self._lock:
+            return dict(self._keys[patient_id])
+
+    def find_by_name(self, name):
+        with self._lock:
+            return sorted(self._by_name.get(normalize_name(name), ()))
+
+    def find_by_dob(self, dob):
+        with self._lock:
+            return sorted(self._by_dob.get(dob.strip(), ()))
+
+    def find_by_policy(self, policy_number):
+        with self._lock:
+            return sorted(self._by_policy.get(normalize_key(policy_number), ()))
+
+    def patient_ids(self):
+        with self._lock:
+            return list(self._versions)
+
+    def iter_keys(self):
+        with self._lock:
+            items = [(patient_id, dict(keys)) for patient_id, keys in self._keys.items()]
+        return iter(items)
+
+    def page(self, order_by="name", offset=0, limit=50, descending=False):
+        if order_by not in SORT_KEYS:
+            raise KeyError(order_by)
+        with self._lock:
+            entries = self._sorted.get(order_by)
+            if entries is None:
+                entries = sorted((keys[order_by], patient_id) for patient_id, keys in self._keys.items())
+                self._sorted[order_by] = entries
+            if descending:
+                end = max(len(entries) - offset, 0)
+                selected = entries[max(end - limit, 0):end][::-1]
+            else:
+                selected = entries[offset:offset + limit]
+            return [(patient_id, dict(self._keys[patient_id])) for _, patient_id in selected]
+
+    def iter_latest(self):
+        for patient_id in self.patient_ids():
+            yield self.get(patient_id)
+
+    def __contains__(self, patient_id):
+        return patient_id in self._versions
+
+    def __len__(self):
+        return len(self._versions)
+
+
+def open_store(records_dir="medical_records", backend="files", compress=False):
+    if backend == "files":
+        return RecordStore(records_dir, compress=compress)
+    if compress:
+        raise ValueError("Compressed storage is only supported by the files backend")
+    if backend == "sqlite":
+        from sqlite_store import SQLiteRecordStore
+        return SQLiteRecordStore(records_dir)
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,69 @@
+import queue
+import threading
+
+
+class SaveQueueFull(Exception):
+    pass
+
+
+class RecordWriter:
+    def __init__(self, store, maxsize=16):
+        self.store = store
+        self._requests = queue.Queue(maxsize)
+        self._results = queue.Queue()
+        self._listeners = []
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="record-writer", daemon=True)
+        self._thread.start()
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def submit(self, record, patient_id=None):
+        # Never blocks the caller, which is usually the Tk thread.
+        with self._pending_lock:
+            try:
+                self._requests.put_nowait((record, patient_id))
+            except queue.Full:
+                raise SaveQueueFull("save queue full") from None
+            self._pending += 1
+
+    def pending(self):
+        # Counts a save until its result is ready for dispatch.
+        with self._pending_lock:
+            return self._pending
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            record, patient_id = request
+            try:
+                patient_id, version = self.store.save(record, patient_id)
+            except Exception as e:
+                self._results.put((record, None, None, e))
+            else:
+                self._results.put((record, patient_id, version, None))
+            with self._pending_lock:
+                self._pending -= 1
+
+    def dispatch(self):
+        completed = []
+        while True:
+            try:
+                record, patient_id, version, error = self._results.get_nowait()
+            except queue.Empty:
+                return completed
+            if error is None:
+                stored = dict(record, patient_id=patient_id, version=version)
+                for callback in self._listeners:
+                    callback(patient_id, version, stored)
+            completed.append((record, patient_id, version, error))
+
+    def close(self, timeout=None):
+        if self._thread.is_alive():
+            self._requests.put(None)
+            self._thread.join(timeout)
+        return self.dispatch()
@@ -1,17 +1,52 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext, filedialog
-import json
+from tkinter import ttk, messagebox, scrolledtext
 from datetime import datetime
-import os
 from tkcalendar import DateEntry
-import re
+import os
+import uuid
+from record_store import open_store
+from record_writer import RecordWriter, SaveQueueFull
+from draft_journal import DraftJournal
+from patient_list import PatientListWindow
+from record_cache import RecordCache
+from record_model import Biopsy, EcgResult, ImagingStudy, LabTest, OtherTest, TEST_MODELS
+from text_index import TextIndex
+from prefix_index import PrefixIndex
+from record_schema import ALCOHOL_STATUSES, DRUG_STATUSES, FORM_FIELDS, SMOKING_STATUSES, get_path, is_valid_email, missing_required_fields, normalize_phone, set_path
+from form_widgets import RangeGauge, TooltipManager, ValidationScheduler
+from vital_rules import band_for_label, band_labels, bmi, classify, in_limits, parse_reading
+from ui_profiler import UIProfiler
+
+FIELD_KINDS = {name: kind for _, name, kind in FORM_FIELDS}
 
 class SimpleMedicalRecord:
     def __init__(self, root):
         self.root = root
         self.root.title("Medical Records System")
+        
+        self.profile_path = os.environ.get('MEDICAL_RECORDS_PROFILE')
+        self.profiler = None
+        if self.profile_path:
+            self.profiler = UIProfiler(self.root)
+            self.profiler.instrument(self)
+            self.profiler.install()
+            self.root.bind_all('<F12>', self.profiler.show_window)
         self.root.geometry("900x700")
         
+        self.records_dir = "medical_records"
+        self.store = open_store(self.records_dir, os.environ.get('MEDICAL_RECORDS_BACKEND', 'files'))
+        self.text_index = TextIndex(os.path.join(self.records_dir, "text_index"))
+        self.prefix_index = PrefixIndex()
+        self.prefix_index.load(self.store)
+        self.writer = RecordWriter(self.store)
+        self.writer.add_listener(self.text_index.update_record)
+        self.writer.add_listener(self.prefix_index.update_record)
+        self.save_poll = None
+        self.patient_list = None
+        self.record_cache = RecordCache()
+        self.current_patient_id = None
+        self.root.protocol('WM_DELETE_WINDOW', self.on_close)
+        
         style = ttk.Style()
         style.configure('Title.TLabel', font=('Helvetica', 20, 'bold'))
         style.configure('Section.TLabelframe.Label', font=('Helvetica', 12, 'bold'))
@@ -23,32 +58,258 @@ class SimpleMedicalRecord:
         main_frame = ttk.Frame(root)
         main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
         
-        canvas = tk.Canvas(main_frame, bg='#f0f0f0')
-        scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=canvas.yview)
-        self.scrollable_frame = ttk.Frame(canvas)
+        self.create_variables()
+        self.validator = ValidationScheduler(self.root)
+        self.tooltips = TooltipManager(self.root)
+        self.draft = DraftJournal(os.path.join(self.records_dir, "draft.journal"))
+        self.outbox = DraftJournal(os.path.join(self.records_dir, "outbox.journal"))
+        self.outbox_records = {}
+        self.outbox_backlog = []
+        self.watched_text = set()
+        self.field_values = {}
+        self.dirty_fields = set()
+        self.draft_fields = set()
+        self.watch_draft_fields()
+        
+        title_frame = ttk.Frame(main_frame)
+        title_frame.pack(fill='x', pady=10)
+        ttk.Label(title_frame, text="Medical Record Form", style='Title.TLabel').pack()
+        
+        search_frame = ttk.Frame(main_frame)
+        search_frame.pack(fill='x', pady=5)
+        ttk.Label(search_frame, text="Find Patient:").pack(anchor='w')
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=40)
+        search_entry.pack(fill='x', pady=2)
+        search_entry.bind('<KeyRelease>', self.update_patient_suggestions)
+        search_entry.bind('<Escape>', self.hide_patient_suggestions)
+        self.create_tooltip(search_entry, "Type a name, phone or policy number to find a patient")
+        self.suggestion_list = tk.Listbox(search_frame, height=6, font=('Helvetica', 10))
+        self.suggestion_list.bind('<ButtonRelease-1>', self.on_suggestion_selected)
+        self.suggestion_list.bind('<Return>', self.on_suggestion_selected)
+        search_entry.bind('<Down>', lambda e: self.suggestion_list.focus_set() if self.suggestion_ids else None)
+        self.suggestion_ids = []
+        
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(side='bottom', pady=20)
+        
+        save_button = ttk.Button(button_frame, text="Save Record", command=self.save_record)
+        save_button.pack(side='left', padx=5)
+        self.create_tooltip(save_button, "Save the medical record")
+        
+        clear_button = ttk.Button(button_frame, text="Clear Form", command=self.clear_form)
+        clear_button.pack(side='left', padx=5)
+        self.create_tooltip(clear_button, "Clear all fields and start over")
+        
+        browse_button = ttk.Button(button_frame, text="Browse Patients", command=self.open_patient_list)
+        browse_button.pack(side='left', padx=5)
+        self.create_tooltip(browse_button, "List all saved patients")
+        
+        ttk.Label(button_frame, textvariable=self.status_var, font=('Helvetica', 9, 'italic')).pack(side='left', padx=10)
+        
+        self.notebook = ttk.Notebook(main_frame)
+        self.notebook.pack(fill=tk.BOTH, expand=True)
+        self.pending_text = {}
+        self.built_pages = set()
+        self.page_builders = {}
+        for title, builder in [("Personal", self.build_personal_page),
+                               ("Medical", self.build_medical_page),
+                               ("Vitals", self.build_vitals_page),
+                               ("Physical Exam", self.build_physical_exam_page),
+                               ("Diagnostics", self.build_diagnostics_page),
+                               ("Notes", self.build_notes_page)]:
+            page = ttk.Frame(self.notebook)
+            self.notebook.add(page, text=title)
+            self.page_builders[str(page)] = (title, builder)
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+        self.build_page(self.notebook.select())
+        self.restore_draft()
+        self.resubmit_outbox()
+        self.root.after(3000, self.flush_draft)
+    
+    def create_variables(self):
+        self.search_var = tk.StringVar()
+        self.status_var = tk.StringVar()
+        self.name_var = tk.StringVar()
+        self.gender_var = tk.StringVar(value="")
+        self.phone_var = tk.StringVar()
+        self.email_var = tk.StringVar()
+        self.emergency_name_var = tk.StringVar()
+        self.emergency_phone_var = tk.StringVar()
+        self.emergency_relation_var = tk.StringVar()
+        self.insurance_provider_var = tk.StringVar()
+        self.policy_number_var = tk.StringVar()
+        self.smoking_var = tk.StringVar(value="")
+        self.alcohol_var = tk.StringVar(value="")
+        self.drug_var = tk.StringVar(value="")
+        self.occupation_var = tk.StringVar()
+        self.bp_systolic_var = tk.StringVar()
+        self.bp_diastolic_var = tk.StringVar()
+        self.heart_rate_var = tk.StringVar()
+        self.hr_status_var = tk.StringVar(value="")
+        self.respiratory_rate_var = tk.StringVar()
+        self.temperature_var = tk.StringVar()
+        self.height_var = tk.StringVar()
+        self.weight_var = tk.StringVar()
+        self.bmi_var = tk.StringVar()
+        self.bmi_category_var = tk.StringVar()
+        self.lab_test_var = tk.StringVar()
+        self.imaging_type_var = tk.StringVar()
+        self.body_part_var = tk.StringVar()
+        self.biopsy_type_var = tk.StringVar()
+        self.biopsy_site_var = tk.StringVar()
+        self.ecg_type_var = tk.StringVar()
+        self.other_test_type_var = tk.StringVar()
+        
+        self.lab_tests = []
+        self.imaging_studies = []
+        self.biopsies = []
+        self.ecg_results = []
+        self.other_tests = []
+    
+    def on_tab_changed(self, event=None):
+        self.build_page(self.notebook.select())
+    
+    def build_page(self, page_name):
+        title, builder = self.page_builders[str(page_name)]
+        if title in self.built_pages:
+            return
+        self.built_pages.add(title)
+        page = self.notebook.nametowidget(page_name)
+        
+        canvas = tk.Canvas(page, bg='#f0f0f0', highlightthickness=0)
+        scrollbar = ttk.Scrollbar(page, orient="vertical", command=canvas.yview)
+        content = ttk.Frame(canvas)
         
-        self.scrollable_frame.bind(
+        content.bind(
             "<Configure>",
             lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
         )
         
-        canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
+        window = canvas.create_window((0, 0), window=content, anchor="nw")
+        canvas.bind("<Configure>", lambda e: canvas.itemconfigure(window, width=e.width))
         canvas.configure(yscrollcommand=scrollbar.set)
         
         scrollbar.pack(side="right", fill="y")
         canvas.pack(side="left", fill="both", expand=True)
         
-        title_frame = ttk.Frame(self.scrollable_frame)
-        title_frame.pack(fill='x', pady=10)
-        ttk.Label(title_frame, text="Medical Record Form", style='Title.TLabel').pack()
+        builder(content)
         
-        personal_frame = ttk.LabelFrame(self.scrollable_frame, text="Personal Information", style='Section.TLabelframe', padding=15)
+        for name in list(self.pending_text):
+            if getattr(self, name, None) is not None:
+                self.set_text(name, self.pending_text.pop(name))
+        self.watch_text_widgets()
+    
+    def watch_draft_fields(self):
+        for name, var in vars(self).items():
+            if isinstance(var, tk.StringVar) and name not in ('search_var', 'status_var'):
+                var.trace_add('write', lambda *args, name=name: self.mark_dirty(name))
+    
+    def mark_dirty(self, name):
+        self.dirty_fields.add(name)
+        self.draft_fields.add(name)
+    
+    def watch_text_widgets(self):
+        for name, widget in list(vars(self).items()):
+            if isinstance(widget, tk.Text) and name not in self.watched_text:
+                self.watched_text.add(name)
+                widget.bind('<<Modified>>', lambda e, name=name: self.on_text_modified(name), add='+')
+    
+    def on_text_modified(self, name):
+        widget = getattr(self, name)
+        if widget.edit_modified():
+            self.mark_dirty(name)
+            widget.edit_modified(False)
+    
+    def on_dob_changed(self, event=None):
+        self.mark_dirty('dob_calendar')
+    
+    def record_draft_fields(self):
+        for name in self.draft_fields:
+            self.draft.record(name, self.read_field(name, self.field_kind(name)))
+        self.draft_fields.clear()
+    
+    def flush_draft(self):
+        self.record_draft_fields()
+        self.draft.flush()
+        self.root.after(3000, self.flush_draft)
+    
+    def restore_draft(self):
+        state = self.draft.load()
+        for name, value in state.items():
+            if name == 'current_patient_id':
+                self.current_patient_id = value or None
+            elif name in FIELD_KINDS or name.endswith('_text'):
+                self.write_field(name, self.field_kind(name), value)
+            elif isinstance(getattr(self, name, None), tk.StringVar):
+                getattr(self, name).set(value)
+        if state:
+            self.status_var.set("Restored unsaved draft")
+    
+    def resubmit_outbox(self):
+        for token, entry in self.outbox.load().items():
+            if entry:
+                self.outbox_records[token] = (entry['record'], entry['patient_id'])
+                self.outbox_backlog.append((entry['record'], entry['patient_id']))
+        if self.outbox_records:
+            self.status_var.set(f"Retrying {len(self.outbox_records)} unsaved record(s)...")
+            self.save_poll = self.root.after(100, self.poll_saves)
+    
+    def field_kind(self, name):
+        return FIELD_KINDS.get(name, 'text' if name.endswith('_text') else 'var')
+    
+    def read_field(self, name, kind):
+        if kind == 'text':
+            return self.get_text(name)
+        if kind == 'date':
+            return self.dob_calendar.get_date().strftime("%Y-%m-%d")
+        if kind == 'list':
+            return [entry.to_dict() for entry in getattr(self, name)]
+        value = getattr(self, name).get().strip()
+        return value.strip('()') if kind == 'band' else value
+    
+    def write_field(self, name, kind, value):
+        if kind == 'text':
+            self.set_text(name, value)
+        elif kind == 'date':
+            try:
+                self.dob_calendar.set_date(datetime.strptime(value, "%Y-%m-%d"))
+            except (TypeError, ValueError):
+                self.dob_calendar.set_date(datetime.now())
+        elif kind == 'list':
+            setattr(self, name, [TEST_MODELS[name].from_dict(entry) for entry in value or []])
+        elif kind == 'band':
+            getattr(self, name).set(next((label for label in band_labels('bmi') if label.strip('()') == value), value))
+        else:
+            getattr(self, name).set(value)
+        self.field_values[name] = self.read_field(name, kind) if kind in ('date', 'list') else str(value).strip()
+        self.dirty_fields.discard(name)
+        self.draft_fields.add(name)
+    
+    def get_text(self, name):
+        widget = getattr(self, name, None)
+        if widget is None:
+            return self.pending_text.get(name, "")
+        return widget.get("1.0", tk.END).strip()
+    
+    def set_text(self, name, value):
+        widget = getattr(self, name, None)
+        if widget is None:
+            if value:
+                self.pending_text[name] = value
+            else:
+                self.pending_text.pop(name, None)
+            return
+        widget.delete("1.0", tk.END)
+        if value:
+            widget.insert("1.0", value)
+    
+    def build_personal_page(self, parent):
+        personal_frame = ttk.LabelFrame(parent, text="Personal Information", style='Section.TLabelframe', padding=15)
         personal_frame.pack(fill='x', pady=5)
         
         name_frame = ttk.Frame(personal_frame)
         name_frame.pack(fill='x', pady=5)
         ttk.Label(name_frame, text="Full Name *:").pack(anchor='w')
-        self.name_var = tk.StringVar()
         name_entry = ttk.Entry(name_frame, textvariable=self.name_var, width=40)
         name_entry.pack(fill='x', pady=2)
         self.create_tooltip(name_entry, "Enter patient's full legal name")
@@ -61,11 +322,11 @@ class SimpleMedicalRecord:
                                     maxdate=datetime.now())
         self.dob_calendar.pack(fill='x', pady=2)
         self.create_tooltip(self.dob_calendar, "Select patient's date of birth")
+        self.dob_calendar.bind('<<DateEntrySelected>>', self.on_dob_changed)
         
         gender_frame = ttk.Frame(personal_frame)
         gender_frame.pack(fill='x', pady=5)
         ttk.Label(gender_frame, text="Gender *:").pack(anchor='w')
-        self.gender_var = tk.StringVar(value="")
         for gender in ["Male", "Female", "Other"]:
             ttk.Radiobutton(gender_frame, text=gender, variable=self.gender_var, value=gender).pack(side='left', padx=10)
         
@@ -75,20 +336,18 @@ class SimpleMedicalRecord:
         phone_frame = ttk.Frame(contact_frame)
         phone_frame.pack(fill='x', pady=5)
         ttk.Label(phone_frame, text="Phone:").pack(anchor='w')
-        self.phone_var = tk.StringVar()
         phone_entry = ttk.Entry(phone_frame, textvariable=self.phone_var, width=20)
         phone_entry.pack(fill='x', pady=2)
-        phone_entry.bind('<KeyRelease>', self.validate_phone)
+        phone_entry.bind('<KeyRelease>', lambda e: self.validator.schedule('phone', self.validate_phone))
         self.create_tooltip(phone_entry, "Enter phone number (digits only)")
         
         email_frame = ttk.Frame(contact_frame)
         email_frame.pack(fill='x', pady=5)
         ttk.Label(email_frame, text="Email:").pack(anchor='w')
-        self.email_var = tk.StringVar()
-        email_entry = ttk.Entry(email_frame, textvariable=self.email_var, width=40)
-        email_entry.pack(fill='x', pady=2)
-        email_entry.bind('<KeyRelease>', self.validate_email)
-        self.create_tooltip(email_entry, "Enter valid email address")
+        self.email_entry = ttk.Entry(email_frame, textvariable=self.email_var, width=40)
+        self.email_entry.pack(fill='x', pady=2)
+        self.email_entry.bind('<KeyRelease>', lambda e: self.validator.schedule('email', self.validate_email))
+        self.create_tooltip(self.email_entry, "Enter valid email address")
         
         emergency_frame = ttk.LabelFrame(personal_frame, text="Emergency Contact", style='Subsection.TLabelframe', padding=10)
         emergency_frame.pack(fill='x', pady=5)
@@ -96,7 +355,6 @@ class SimpleMedicalRecord:
         emergency_name_frame = ttk.Frame(emergency_frame)
         emergency_name_frame.pack(fill='x', pady=5)
         ttk.Label(emergency_name_frame, text="Emergency Contact Name *:").pack(anchor='w')
-        self.emergency_name_var = tk.StringVar()
         emergency_name_entry = ttk.Entry(emergency_name_frame, textvariable=self.emergency_name_var, width=40)
         emergency_name_entry.pack(fill='x', pady=2)
         self.create_tooltip(emergency_name_entry, "Enter full name of emergency contact")
@@ -104,16 +362,14 @@ class SimpleMedicalRecord:
         emergency_phone_frame = ttk.Frame(emergency_frame)
         emergency_phone_frame.pack(fill='x', pady=5)
         ttk.Label(emergency_phone_frame, text="Emergency Contact Phone *:").pack(anchor='w')
-        self.emergency_phone_var = tk.StringVar()
         emergency_phone_entry = ttk.Entry(emergency_phone_frame, textvariable=self.emergency_phone_var, width=20)
         emergency_phone_entry.pack(fill='x', pady=2)
-        emergency_phone_entry.bind('<KeyRelease>', self.validate_emergency_phone)
+        emergency_phone_entry.bind('<KeyRelease>', lambda e: self.validator.schedule('emergency_phone', self.validate_emergency_phone))
         self.create_tooltip(emergency_phone_entry, "Enter emergency contact's phone number (digits only)")
         
         emergency_relation_frame = ttk.Frame(emergency_frame)
         emergency_relation_frame.pack(fill='x', pady=5)
         ttk.Label(emergency_relation_frame, text="Relationship *:").pack(anchor='w')
-        self.emergency_relation_var = tk.StringVar()
         emergency_relation_entry = ttk.Entry(emergency_relation_frame, textvariable=self.emergency_relation_var, width=40)
         emergency_relation_entry.pack(fill='x', pady=2)
         self.create_tooltip(emergency_relation_entry, "Enter relationship to patient (e.g., Spouse, Parent, Sibling)")
@@ -124,7 +380,6 @@ class SimpleMedicalRecord:
         insurance_provider_frame = ttk.Frame(insurance_frame)
         insurance_provider_frame.pack(fill='x', pady=5)
         ttk.Label(insurance_provider_frame, text="Insurance Provider *:").pack(anchor='w')
-        self.insurance_provider_var = tk.StringVar()
         insurance_provider_entry = ttk.Entry(insurance_provider_frame, textvariable=self.insurance_provider_var, width=40)
         insurance_provider_entry.pack(fill='x', pady=2)
         self.create_tooltip(insurance_provider_entry, "Enter name of insurance provider")
@@ -132,7 +387,6 @@ class SimpleMedicalRecord:
         policy_number_frame = ttk.Frame(insurance_frame)
         policy_number_frame.pack(fill='x', pady=5)
         ttk.Label(policy_number_frame, text="Policy Number *:").pack(anchor='w')
-        self.policy_number_var = tk.StringVar()
         policy_number_entry = ttk.Entry(policy_number_frame, textvariable=self.policy_number_var, width=40)
         policy_number_entry.pack(fill='x', pady=2)
         self.create_tooltip(policy_number_entry, "Enter insurance policy number")
@@ -143,8 +397,9 @@ class SimpleMedicalRecord:
         self.coverage_text = scrolledtext.ScrolledText(coverage_frame, height=3, width=50, font=('Helvetica', 10))
         self.coverage_text.pack(fill='x', pady=2)
         self.create_tooltip(self.coverage_text, "Enter details about insurance coverage, limitations, or special conditions")
-        
-        medical_frame = ttk.LabelFrame(self.scrollable_frame, text="Medical Information", style='Section.TLabelframe', padding=15)
+    
+    def build_medical_page(self, parent):
+        medical_frame = ttk.LabelFrame(parent, text="Medical Information", style='Section.TLabelframe', padding=15)
         medical_frame.pack(fill='x', pady=5)
         
         past_medical_frame = ttk.LabelFrame(medical_frame, text="Past Medical History", style='Subsection.TLabelframe', padding=10)
@@ -179,28 +434,24 @@ class SimpleMedicalRecord:
         smoking_frame = ttk.Frame(social_history_frame)
         smoking_frame.pack(fill='x', pady=5)
         ttk.Label(smoking_frame, text="Smoking Status:").pack(side='left')
-        self.smoking_var = tk.StringVar(value="")
-        for status in ["Never", "Former", "Current"]:
+        for status in SMOKING_STATUSES:
             ttk.Radiobutton(smoking_frame, text=status, variable=self.smoking_var, value=status).pack(side='left', padx=10)
         
         alcohol_frame = ttk.Frame(social_history_frame)
         alcohol_frame.pack(fill='x', pady=5)
         ttk.Label(alcohol_frame, text="Alcohol Consumption:").pack(side='left')
-        self.alcohol_var = tk.StringVar(value="")
-        for status in ["None", "Occasional", "Regular"]:
+        for status in ALCOHOL_STATUSES:
             ttk.Radiobutton(alcohol_frame, text=status, variable=self.alcohol_var, value=status).pack(side='left', padx=10)
         
         drug_frame = ttk.Frame(social_history_frame)
         drug_frame.pack(fill='x', pady=5)
         ttk.Label(drug_frame, text="Drug Use:").pack(side='left')
-        self.drug_var = tk.StringVar(value="")
-        for status in ["None", "Past", "Current"]:
+        for status in DRUG_STATUSES:
             ttk.Radiobutton(drug_frame, text=status, variable=self.drug_var, value=status).pack(side='left', padx=10)
         
         occupation_frame = ttk.Frame(social_history_frame)
         occupation_frame.pack(fill='x', pady=5)
         ttk.Label(occupation_frame, text="Occupation:").pack(anchor='w')
-        self.occupation_var = tk.StringVar()
         occupation_entry = ttk.Entry(occupation_frame, textvariable=self.occupation_var, width=40)
         occupation_entry.pack(fill='x', pady=2)
         self.create_tooltip(occupation_entry, "Enter current or past occupation")
@@ -233,8 +484,9 @@ class SimpleMedicalRecord:
         self.medications_text = scrolledtext.ScrolledText(medications_frame, height=4, width=50, font=('Helvetica', 10))
         self.medications_text.pack(fill='x', pady=2)
         self.create_tooltip(self.medications_text, "List all current medications with dosages and frequencies")
-        
-        vitals_frame = ttk.LabelFrame(self.scrollable_frame, text="Vital Signs", style='Section.TLabelframe', padding=15)
+    
+    def build_vitals_page(self, parent):
+        vitals_frame = ttk.LabelFrame(parent, text="Vital Signs", style='Section.TLabelframe', padding=15)
         vitals_frame.pack(fill='x', pady=5)
         
         bp_frame = ttk.LabelFrame(vitals_frame, text="Blood Pressure", style='Subsection.TLabelframe', padding=10)
@@ -243,28 +495,26 @@ class SimpleMedicalRecord:
         systolic_frame = ttk.Frame(bp_frame)
         systolic_frame.pack(fill='x', pady=5)
         ttk.Label(systolic_frame, text="Systolic:").pack(side='left')
-        self.bp_systolic_var = tk.StringVar()
         systolic_entry = ttk.Entry(systolic_frame, textvariable=self.bp_systolic_var, width=5)
         systolic_entry.pack(side='left', padx=5)
-        systolic_entry.bind('<KeyRelease>', lambda e: self.validate_number(self.bp_systolic_var, 70, 200))
+        systolic_entry.bind('<KeyRelease>', lambda e: self.validator.schedule('systolic', self.validate_vital, self.bp_systolic_var, 'systolic'))
         
         systolic_dropdown = ttk.Combobox(systolic_frame, textvariable=self.bp_systolic_var, width=5, values=['90', '100', '110', '120', '130', '140', '150', '160', '170', '180'])
         systolic_dropdown.pack(side='left', padx=5)
-        systolic_dropdown.bind('<<ComboboxSelected>>', lambda e: self.validate_number(self.bp_systolic_var, 70, 200))
+        systolic_dropdown.bind('<<ComboboxSelected>>', lambda e: self.validate_vital(self.bp_systolic_var, 'systolic'))
         
         ttk.Label(systolic_frame, text="mmHg").pack(side='left', padx=5)
         
         diastolic_frame = ttk.Frame(bp_frame)
         diastolic_frame.pack(fill='x', pady=5)
         ttk.Label(diastolic_frame, text="Diastolic:").pack(side='left')
-        self.bp_diastolic_var = tk.StringVar()
         diastolic_entry = ttk.Entry(diastolic_frame, textvariable=self.bp_diastolic_var, width=5)
         diastolic_entry.pack(side='left', padx=5)
-        diastolic_entry.bind('<KeyRelease>', lambda e: self.validate_number(self.bp_diastolic_var, 40, 130))
+        diastolic_entry.bind('<KeyRelease>', lambda e: self.validator.schedule('diastolic', self.validate_vital, self.bp_diastolic_var, 'diastolic'))
         
         diastolic_dropdown = ttk.Combobox(diastolic_frame, textvariable=self.bp_diastolic_var, width=5, values=['50', '60', '70', '80', '90', '100', '110', '120'])
         diastolic_dropdown.pack(side='left', padx=5)
-        diastolic_dropdown.bind('<<ComboboxSelected>>', lambda e: self.validate_number(self.bp_diastolic_var, 40, 130))
+        diastolic_dropdown.bind('<<ComboboxSelected>>', lambda e: self.validate_vital(self.bp_diastolic_var, 'diastolic'))
         
         ttk.Label(diastolic_frame, text="mmHg").pack(side='left', padx=5)
         
@@ -278,10 +528,9 @@ class SimpleMedicalRecord:
         hr_left_frame.pack(side='left', fill='x', expand=True)
         
         ttk.Label(hr_left_frame, text="Heart Rate:").pack(side='left')
-        self.heart_rate_var = tk.StringVar()
         hr_entry = ttk.Entry(hr_left_frame, textvariable=self.heart_rate_var, width=5)
         hr_entry.pack(side='left', padx=5)
-        hr_entry.bind('<KeyRelease>', lambda e: self.validate_heart_rate())
+        hr_entry.bind('<KeyRelease>', lambda e: self.validator.schedule('heart_rate', self.validate_heart_rate))
         
         hr_dropdown = ttk.Combobox(hr_left_frame, textvariable=self.heart_rate_var, width=5, 
                                  values=['60', '65', '70', '75', '80', '85', '90', '95', '100', '105', '110', '115', '120'])
@@ -293,7 +542,6 @@ class SimpleMedicalRecord:
         hr_right_frame = ttk.Frame(hr_input_frame)
         hr_right_frame.pack(side='right', fill='x', expand=True)
         
-        self.hr_status_var = tk.StringVar(value="")
         self.hr_status_label = ttk.Label(hr_right_frame, textvariable=self.hr_status_var)
         self.hr_status_label.pack(side='right')
         
@@ -311,7 +559,7 @@ class SimpleMedicalRecord:
         self.hr_canvas = tk.Canvas(range_vis_frame, height=20, bg='white')
         self.hr_canvas.pack(fill='x', padx=5)
         
-        self.draw_heart_rate_range()
+        self.hr_gauge = RangeGauge(self.hr_canvas, 40, 200, [(60, 100, 'lightgreen')])
         
         ttk.Label(hr_frame, text="Normal range: 60-100 bpm", font=('Helvetica', 9, 'italic')).pack(pady=2)
         
@@ -321,14 +569,13 @@ class SimpleMedicalRecord:
         rr_input_frame = ttk.Frame(rr_frame)
         rr_input_frame.pack(fill='x', pady=5)
         ttk.Label(rr_input_frame, text="Respiratory Rate:").pack(side='left')
-        self.respiratory_rate_var = tk.StringVar()
         rr_entry = ttk.Entry(rr_input_frame, textvariable=self.respiratory_rate_var, width=5)
         rr_entry.pack(side='left', padx=5)
-        rr_entry.bind('<KeyRelease>', lambda e: self.validate_number(self.respiratory_rate_var, 8, 40))
+        rr_entry.bind('<KeyRelease>', lambda e: self.validator.schedule('respiratory_rate', self.validate_vital, self.respiratory_rate_var, 'respiratory_rate'))
         
         rr_dropdown = ttk.Combobox(rr_input_frame, textvariable=self.respiratory_rate_var, width=5, values=['12', '14', '16', '18', '20', '22', '24'])
         rr_dropdown.pack(side='left', padx=5)
-        rr_dropdown.bind('<<ComboboxSelected>>', lambda e: self.validate_number(self.respiratory_rate_var, 8, 40))
+        rr_dropdown.bind('<<ComboboxSelected>>', lambda e: self.validate_vital(self.respiratory_rate_var, 'respiratory_rate'))
         
         ttk.Label(rr_input_frame, text="breaths/min").pack(side='left', padx=5)
         
@@ -338,14 +585,13 @@ class SimpleMedicalRecord:
         temp_input_frame = ttk.Frame(temp_frame)
         temp_input_frame.pack(fill='x', pady=5)
         ttk.Label(temp_input_frame, text="Temperature:").pack(side='left')
-        self.temperature_var = tk.StringVar()
         temp_entry = ttk.Entry(temp_input_frame, textvariable=self.temperature_var, width=5)
         temp_entry.pack(side='left', padx=5)
-        temp_entry.bind('<KeyRelease>', lambda e: self.validate_number(self.temperature_var, 35, 42))
+        temp_entry.bind('<KeyRelease>', lambda e: self.validator.schedule('temperature', self.validate_vital, self.temperature_var, 'temperature'))
         
         temp_dropdown = ttk.Combobox(temp_input_frame, textvariable=self.temperature_var, width=5, values=['36.5', '37.0', '37.5', '38.0', '38.5', '39.0'])
         temp_dropdown.pack(side='left', padx=5)
-        temp_dropdown.bind('<<ComboboxSelected>>', lambda e: self.validate_number(self.temperature_var, 35, 42))
+        temp_dropdown.bind('<<ComboboxSelected>>', lambda e: self.validate_vital(self.temperature_var, 'temperature'))
         
         ttk.Label(temp_input_frame, text="°C").pack(side='left', padx=5)
         
@@ -355,10 +601,9 @@ class SimpleMedicalRecord:
         height_frame = ttk.Frame(measurements_frame)
         height_frame.pack(fill='x', pady=5)
         ttk.Label(height_frame, text="Height:").pack(side='left')
-        self.height_var = tk.StringVar()
         height_entry = ttk.Entry(height_frame, textvariable=self.height_var, width=5)
         height_entry.pack(side='left', padx=5)
-        height_entry.bind('<KeyRelease>', lambda e: self.calculate_bmi())
+        height_entry.bind('<KeyRelease>', lambda e: self.validator.schedule('bmi', self.calculate_bmi))
         
         height_dropdown = ttk.Combobox(height_frame, textvariable=self.height_var, width=5, 
                                      values=['150', '155', '160', '165', '170', '175', '180', '185', '190'])
@@ -370,10 +615,9 @@ class SimpleMedicalRecord:
         weight_frame = ttk.Frame(measurements_frame)
         weight_frame.pack(fill='x', pady=5)
         ttk.Label(weight_frame, text="Weight:").pack(side='left')
-        self.weight_var = tk.StringVar()
         weight_entry = ttk.Entry(weight_frame, textvariable=self.weight_var, width=5)
         weight_entry.pack(side='left', padx=5)
-        weight_entry.bind('<KeyRelease>', lambda e: self.calculate_bmi())
+        weight_entry.bind('<KeyRelease>', lambda e: self.validator.schedule('bmi', self.calculate_bmi))
         
         weight_dropdown = ttk.Combobox(weight_frame, textvariable=self.weight_var, width=5, 
                                      values=['50', '55', '60', '65', '70', '75', '80', '85', '90'])
@@ -389,15 +633,12 @@ class SimpleMedicalRecord:
         bmi_value_frame.pack(fill='x', pady=2)
         
         ttk.Label(bmi_value_frame, text="BMI:").pack(side='left')
-        self.bmi_var = tk.StringVar()
         self.bmi_label = ttk.Label(bmi_value_frame, textvariable=self.bmi_var)
         self.bmi_label.pack(side='left', padx=5)
         
         ttk.Label(bmi_value_frame, text="Category:").pack(side='left', padx=(20, 5))
-        self.bmi_category_var = tk.StringVar()
         self.bmi_category_combo = ttk.Combobox(bmi_value_frame, textvariable=self.bmi_category_var, 
-                                              values=['Underweight (<18.5)', 'Normal (18.5-24.9)', 
-                                                     'Overweight (25-29.9)', 'Obese (≥30)'],
+                                              values=band_labels('bmi'),
                                               state='readonly', width=20)
         self.bmi_category_combo.pack(side='left', padx=5)
         self.bmi_category_combo.bind('<<ComboboxSelected>>', self.update_bmi_from_category)
@@ -413,16 +654,17 @@ class SimpleMedicalRecord:
         self.bmi_canvas = tk.Canvas(bmi_range_frame, height=20, bg='white')
         self.bmi_canvas.pack(fill='x', padx=5)
         
-        self.draw_bmi_range()
+        self.bmi_gauge = RangeGauge(self.bmi_canvas, 0, 40, [
+            (0, 18.5, 'lightblue'),
+            (18.5, 25, 'lightgreen'),
+            (25, 30, '#FFA07A'),
+            (30, 40, 'lightpink')
+        ])
         
-        notes_frame = ttk.LabelFrame(self.scrollable_frame, text="Additional Notes", style='Section.TLabelframe', padding=15)
-        notes_frame.pack(fill='x', pady=5)
-        
-        self.notes_text = scrolledtext.ScrolledText(notes_frame, height=4, width=50, font=('Helvetica', 10))
-        self.notes_text.pack(fill='x', pady=2)
-        self.create_tooltip(self.notes_text, "Enter any additional notes or observations")
-        
-        physical_exam_frame = ttk.LabelFrame(self.scrollable_frame, text="Physical Examination", style='Section.TLabelframe', padding=15)
+        self.refresh_vital_indicators()
+    
+    def build_physical_exam_page(self, parent):
+        physical_exam_frame = ttk.LabelFrame(parent, text="Physical Examination", style='Section.TLabelframe', padding=15)
         physical_exam_frame.pack(fill='x', pady=5)
         
         general_frame = ttk.LabelFrame(physical_exam_frame, text="General Appearance", style='Subsection.TLabelframe', padding=10)
@@ -506,8 +748,9 @@ class SimpleMedicalRecord:
         self.neuro_text = scrolledtext.ScrolledText(neuro_frame, height=3, width=50, font=('Helvetica', 10))
         self.neuro_text.pack(fill='x', pady=2)
         self.create_tooltip(self.neuro_text, "Document neurological exam findings, including mental status, cranial nerves, and motor/sensory function")
-        
-        diagnostic_frame = ttk.LabelFrame(self.scrollable_frame, text="Diagnostic Tests and Results", style='Section.TLabelframe', padding=15)
+    
+    def build_diagnostics_page(self, parent):
+        diagnostic_frame = ttk.LabelFrame(parent, text="Diagnostic Tests and Results", style='Section.TLabelframe', padding=15)
         diagnostic_frame.pack(fill='x', pady=5)
         
         lab_frame = ttk.LabelFrame(diagnostic_frame, text="Laboratory Tests", style='Subsection.TLabelframe', padding=10)
@@ -516,7 +759,6 @@ class SimpleMedicalRecord:
         lab_test_frame = ttk.Frame(lab_frame)
         lab_test_frame.pack(fill='x', pady=5)
         ttk.Label(lab_test_frame, text="Select Test:").pack(side='left')
-        self.lab_test_var = tk.StringVar()
         lab_test_combo = ttk.Combobox(lab_test_frame, textvariable=self.lab_test_var, 
                                     values=['Complete Blood Count (CBC)', 'Basic Metabolic Panel (BMP)', 
                                            'Comprehensive Metabolic Panel (CMP)', 'Lipid Panel',
@@ -549,7 +791,6 @@ class SimpleMedicalRecord:
         imaging_type_frame = ttk.Frame(imaging_frame)
         imaging_type_frame.pack(fill='x', pady=5)
         ttk.Label(imaging_type_frame, text="Type:").pack(side='left')
-        self.imaging_type_var = tk.StringVar()
         imaging_type_combo = ttk.Combobox(imaging_type_frame, textvariable=self.imaging_type_var,
                                         values=['X-ray', 'MRI', 'CT Scan', 'Ultrasound', 'Other'],
                                         state='readonly', width=20)
@@ -558,7 +799,6 @@ class SimpleMedicalRecord:
         body_part_frame = ttk.Frame(imaging_frame)
         body_part_frame.pack(fill='x', pady=5)
         ttk.Label(body_part_frame, text="Body Part/Area:").pack(side='left')
-        self.body_part_var = tk.StringVar()
         body_part_entry = ttk.Entry(body_part_frame, textvariable=self.body_part_var, width=30)
         body_part_entry.pack(side='left', padx=5)
         
@@ -586,7 +826,6 @@ class SimpleMedicalRecord:
         biopsy_type_frame = ttk.Frame(biopsy_frame)
         biopsy_type_frame.pack(fill='x', pady=5)
         ttk.Label(biopsy_type_frame, text="Type:").pack(side='left')
-        self.biopsy_type_var = tk.StringVar()
         biopsy_type_combo = ttk.Combobox(biopsy_type_frame, textvariable=self.biopsy_type_var,
                                        values=['Needle Biopsy', 'Surgical Biopsy', 'Endoscopic Biopsy', 'Other'],
                                        state='readonly', width=20)
@@ -595,7 +834,6 @@ class SimpleMedicalRecord:
         biopsy_site_frame = ttk.Frame(biopsy_frame)
         biopsy_site_frame.pack(fill='x', pady=5)
         ttk.Label(biopsy_site_frame, text="Site:").pack(side='left')
-        self.biopsy_site_var = tk.StringVar()
         biopsy_site_entry = ttk.Entry(biopsy_site_frame, textvariable=self.biopsy_site_var, width=30)
         biopsy_site_entry.pack(side='left', padx=5)
         
@@ -630,7 +868,6 @@ class SimpleMedicalRecord:
         ecg_type_frame = ttk.Frame(ecg_frame)
         ecg_type_frame.pack(fill='x', pady=5)
         ttk.Label(ecg_type_frame, text="Type:").pack(side='left')
-        self.ecg_type_var = tk.StringVar()
         ecg_type_combo = ttk.Combobox(ecg_type_frame, textvariable=self.ecg_type_var,
                                     values=['Resting ECG', 'Stress Test ECG', 'Holter Monitor', 'Event Monitor'],
                                     state='readonly', width=20)
@@ -653,7 +890,6 @@ class SimpleMedicalRecord:
         other_test_type_frame = ttk.Frame(other_tests_frame)
         other_test_type_frame.pack(fill='x', pady=5)
         ttk.Label(other_test_type_frame, text="Test Type:").pack(side='left')
-        self.other_test_type_var = tk.StringVar()
         other_test_type_combo = ttk.Combobox(other_test_type_frame, textvariable=self.other_test_type_var,
                                            values=['Pulmonary Function Test', 'Sleep Study', 'Allergy Test',
                                                   'Genetic Test', 'Other'],
@@ -678,205 +914,164 @@ class SimpleMedicalRecord:
         other_test_buttons_frame.pack(fill='x', pady=5)
         ttk.Button(other_test_buttons_frame, text="Add Test", command=self.add_other_test).pack(side='left', padx=5)
         ttk.Button(other_test_buttons_frame, text="Remove Last", command=self.remove_last_other_test).pack(side='left', padx=5)
+    
+    def build_notes_page(self, parent):
+        notes_frame = ttk.LabelFrame(parent, text="Additional Notes", style='Section.TLabelframe', padding=15)
+        notes_frame.pack(fill='x', pady=5)
         
-        self.lab_tests = []
-        self.imaging_studies = []
-        self.biopsies = []
-        self.ecg_results = []
-        self.other_tests = []
-        
-        button_frame = ttk.Frame(self.scrollable_frame)
-        button_frame.pack(pady=20)
-        
-        save_button = ttk.Button(button_frame, text="Save Record", command=self.save_record)
-        save_button.pack(side='left', padx=5)
-        self.create_tooltip(save_button, "Save the medical record")
-        
-        clear_button = ttk.Button(button_frame, text="Clear Form", command=self.clear_form)
-        clear_button.pack(side='left', padx=5)
-        self.create_tooltip(clear_button, "Clear all fields and start over")
-        
-        self.records_dir = "medical_records"
-        if not os.path.exists(self.records_dir):
-            os.makedirs(self.records_dir)
+        self.notes_text = scrolledtext.ScrolledText(notes_frame, height=4, width=50, font=('Helvetica', 10))
+        self.notes_text.pack(fill='x', pady=2)
+        self.create_tooltip(self.notes_text, "Enter any additional notes or observations")
     
     def create_tooltip(self, widget, text):
-        def show_tooltip(event):
-            tooltip = tk.Toplevel()
-            tooltip.wm_overrideredirect(True)
-            tooltip.wm_geometry(f"+{event.x_root+10}+{event.y_root+10}")
-            
-            label = ttk.Label(tooltip, text=text, background="#ffffe0", relief='solid', borderwidth=1)
-            label.pack()
-            
-            def hide_tooltip():
-                tooltip.destroy()
-            
-            widget.tooltip = tooltip
-            widget.bind('<Leave>', lambda e: hide_tooltip())
-        
-        widget.bind('<Enter>', show_tooltip)
+        self.tooltips.register(widget, text)
+    
+    def update_patient_suggestions(self, event=None):
+        if event is not None and event.keysym in ('Escape', 'Up', 'Down', 'Return'):
+            return
+        matches = self.prefix_index.search(self.search_var.get(), limit=10)
+        self.suggestion_ids = [patient_id for patient_id, _ in matches]
+        self.suggestion_list.delete(0, tk.END)
+        for _, label in matches:
+            self.suggestion_list.insert(tk.END, label)
+        if matches:
+            self.suggestion_list.pack(fill='x', pady=2)
+        else:
+            self.suggestion_list.pack_forget()
+    
+    def hide_patient_suggestions(self, event=None):
+        self.suggestion_list.pack_forget()
+        self.suggestion_ids = []
+    
+    def on_suggestion_selected(self, event=None):
+        selection = self.suggestion_list.curselection()
+        if not selection or selection[0] >= len(self.suggestion_ids):
+            return
+        patient_id = self.suggestion_ids[selection[0]]
+        self.search_var.set("")
+        self.hide_patient_suggestions()
+        self.open_record(patient_id)
+    
+    def load_record(self, patient_id, version=None):
+        version = version or self.store.latest_version(patient_id)
+        record = self.record_cache.get((patient_id, version))
+        if record is None:
+            record = self.store.get(patient_id, version)
+            self.record_cache.put((patient_id, version), record)
+        return record
+    
+    def open_record(self, patient_id, version=None):
+        try:
+            record = self.load_record(patient_id, version)
+        except (KeyError, OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Failed to open record: {str(e)}")
+            return
+        self.clear_form()
+        self.fill_form(record, patient_id)
+        self.status_var.set(f"Opened record for {self.name_var.get()} (version {record.get('version', version)})")
+    
+    def fill_form(self, record, patient_id):
+        for path, name, kind in FORM_FIELDS:
+            self.write_field(name, kind, get_path(record, path, [] if kind == 'list' else ""))
+        self.show_heart_rate_status()
+        self.refresh_vital_indicators()
+        
+        self.current_patient_id = patient_id
+        self.draft.record('current_patient_id', patient_id)
+    
+    def form_is_blank(self):
+        return not any(self.read_field(name, kind) for path, name, kind in FORM_FIELDS if kind != 'date')
     
     def validate_phone(self, event=None):
         phone = self.phone_var.get()
-        if phone:
-            phone = re.sub(r'\D', '', phone)
-            if len(phone) > 10:
-                phone = phone[:10]
-            self.phone_var.set(phone)
+        normalized = normalize_phone(phone)
+        if normalized != phone:
+            self.phone_var.set(normalized)
     
     def validate_emergency_phone(self, event=None):
         phone = self.emergency_phone_var.get()
-        if phone:
-            phone = re.sub(r'\D', '', phone)
-            if len(phone) > 10:
-                phone = phone[:10]
-            self.emergency_phone_var.set(phone)
+        normalized = normalize_phone(phone)
+        if normalized != phone:
+            self.emergency_phone_var.set(normalized)
     
     def validate_email(self, event=None):
         email = self.email_var.get()
         if email:
-            pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-            if not re.match(pattern, email):
-                self.email_var.set(email)
+            if not is_valid_email(email):
                 self.create_tooltip(self.email_entry, "Please enter a valid email address (e.g., example@domain.com)")
             else:
                 self.create_tooltip(self.email_entry, "Valid email address")
     
-    def validate_number(self, var, min_val, max_val):
-        try:
-            value = float(var.get())
-            if value < min_val or value > max_val:
-                var.set("")
-        except ValueError:
+    def validate_vital(self, var, name):
+        value = parse_reading(var.get())
+        if value is None or not in_limits(name, value):
             if var.get() != "":
                 var.set("")
     
     def calculate_bmi(self):
-        try:
-            height = float(self.height_var.get())
-            weight = float(self.weight_var.get())
-            if height > 0 and weight > 0:
-                height_m = height / 100
-                bmi = weight / (height_m * height_m)
-                self.bmi_var.set(f"{bmi:.1f}")
-                
-                if bmi < 18.5:
-                    category = "Underweight (<18.5)"
-                    color = 'blue'
-                elif bmi < 25:
-                    category = "Normal (18.5-24.9)"
-                    color = 'green'
-                elif bmi < 30:
-                    category = "Overweight (25-29.9)"
-                    color = 'orange'
-                else:
-                    category = "Obese (≥30)"
-                    color = 'red'
-                
-                self.bmi_category_var.set(category)
-                self.bmi_category_label.configure(foreground=color)
-                
-                self.update_bmi_indicator(bmi)
-            else:
-                self.bmi_var.set("")
-                self.bmi_category_var.set("")
-        except ValueError:
+        height = parse_reading(self.height_var.get())
+        weight = parse_reading(self.weight_var.get())
+        if height and weight and height > 0 and weight > 0:
+            value = bmi(height, weight)
+            self.bmi_var.set(f"{value:.1f}")
+            
+            band = classify('bmi', value)
+            self.bmi_category_var.set(band.label)
+            self.bmi_label.configure(foreground=band.color)
+            
+            self.update_bmi_indicator(value)
+        else:
             self.bmi_var.set("")
             self.bmi_category_var.set("")
+            self.update_bmi_indicator(None)
     
     def validate_heart_rate(self):
-        try:
-            value = float(self.heart_rate_var.get())
-            if 40 <= value <= 200:
-                if value < 60:
-                    self.hr_status_var.set("Bradycardia")
-                    self.hr_status_label.configure(foreground='blue')
-                elif value > 100:
-                    self.hr_status_var.set("Tachycardia")
-                    self.hr_status_label.configure(foreground='red')
-                else:
-                    self.hr_status_var.set("Normal")
-                    self.hr_status_label.configure(foreground='green')
-                
-                self.update_heart_rate_indicator(value)
-            else:
-                self.heart_rate_var.set("")
-                self.hr_status_var.set("")
-        except ValueError:
-            if self.heart_rate_var.get() != "":
-                self.heart_rate_var.set("")
+        value = parse_reading(self.heart_rate_var.get())
+        if (value is None or not in_limits('heart_rate', value)) and self.heart_rate_var.get() != "":
+            self.heart_rate_var.set("")
+        self.show_heart_rate_status()
+    
+    def show_heart_rate_status(self):
+        # Stored records are shown as saved; only user edits are validated.
+        value = parse_reading(self.heart_rate_var.get())
+        if value is not None and in_limits('heart_rate', value):
+            band = classify('heart_rate', value)
+            self.hr_status_var.set(band.label)
+            if 'Vitals' in self.built_pages:
+                self.hr_status_label.configure(foreground=band.color)
+            
+            self.update_heart_rate_indicator(value)
+        else:
             self.hr_status_var.set("")
+            self.update_heart_rate_indicator(None)
     
-    def draw_heart_rate_range(self):
-        canvas = self.hr_canvas
-        width = canvas.winfo_width()
-        height = canvas.winfo_height()
-        
-        normal_start = (60 - 40) / 160 * width
-        normal_end = (100 - 40) / 160 * width
-        canvas.create_rectangle(normal_start, 0, normal_end, height, fill='lightgreen')
-        
-        canvas.create_line(0, height/2, width, height/2, fill='black')
+    def refresh_vital_indicators(self):
+        if 'Vitals' not in self.built_pages:
+            return
+        band = band_for_label('heart_rate', self.hr_status_var.get())
+        if band:
+            self.hr_status_label.configure(foreground=band.color)
+        band = band_for_label('bmi', self.bmi_category_var.get())
+        if band:
+            self.bmi_label.configure(foreground=band.color)
+        self.hr_gauge.set_value(parse_reading(self.heart_rate_var.get()))
+        self.bmi_gauge.set_value(parse_reading(self.bmi_var.get()))
     
     def update_heart_rate_indicator(self, value):
-        canvas = self.hr_canvas
-        width = canvas.winfo_width()
-        
-        canvas.delete('indicator')
-        
-        position = (value - 40) / 160 * width
-        
-        canvas.create_line(position, 0, position, canvas.winfo_height(), 
-                          fill='red', width=2, tags='indicator')
-    
-    def draw_bmi_range(self):
-        canvas = self.bmi_canvas
-        width = canvas.winfo_width()
-        height = canvas.winfo_height()
-        
-        ranges = [
-            (0, 18.5, 'lightblue'),    
-            (18.5, 25, 'lightgreen'),  
-            (25, 30, '#FFA07A'),       
-            (30, 40, 'lightpink')      
-        ]
-        
-        for start, end, color in ranges:
-            start_pos = (start / 40) * width
-            end_pos = (end / 40) * width
-            canvas.create_rectangle(start_pos, 0, end_pos, height, fill=color)
-        
-        canvas.create_line(0, height/2, width, height/2, fill='black')
+        if 'Vitals' in self.built_pages:
+            self.hr_gauge.set_value(value)
     
     def update_bmi_indicator(self, value):
-        canvas = self.bmi_canvas
-        width = canvas.winfo_width()
-        
-        canvas.delete('indicator')
-        
-        position = (value / 40) * width
-        
-        canvas.create_line(position, 0, position, canvas.winfo_height(), 
-                          fill='red', width=2, tags='indicator')
+        if 'Vitals' in self.built_pages:
+            self.bmi_gauge.set_value(value)
     
     def update_bmi_from_category(self, event=None):
-        category = self.bmi_category_var.get()
-        if category:
-            if category == 'Underweight (<18.5)':
-                self.bmi_var.set("18.0")
-                self.bmi_category_label.configure(foreground='blue')
-            elif category == 'Normal (18.5-24.9)':
-                self.bmi_var.set("22.0")
-                self.bmi_category_label.configure(foreground='green')
-            elif category == 'Overweight (25-29.9)':
-                self.bmi_var.set("27.0")
-                self.bmi_category_label.configure(foreground='orange')
-            elif category == 'Obese (≥30)':
-                self.bmi_var.set("32.0")
-                self.bmi_category_label.configure(foreground='red')
+        band = band_for_label('bmi', self.bmi_category_var.get())
+        if band:
+            self.bmi_var.set(f"{band.typical:.1f}")
+            self.bmi_label.configure(foreground=band.color)
             
-            self.update_bmi_indicator(float(self.bmi_var.get()))
+            self.update_bmi_indicator(band.typical)
     
     def on_lab_test_selected(self, event=None):
         test = self.lab_test_var.get()
@@ -887,71 +1082,81 @@ class SimpleMedicalRecord:
             custom_entry.focus()
     
     def add_lab_test(self):
-        test = {
-            'type': self.lab_test_var.get(),
-            'date': self.lab_date_calendar.get_date().strftime("%Y-%m-%d"),
-            'results': self.lab_results_text.get("1.0", tk.END).strip()
-        }
+        test = LabTest(
+            type=self.lab_test_var.get(),
+            date=self.lab_date_calendar.get_date().strftime("%Y-%m-%d"),
+            results=self.get_text('lab_results_text')
+        )
         self.lab_tests.append(test)
+        self.mark_dirty('lab_tests')
         self.clear_lab_test_fields()
     
     def remove_last_lab_test(self):
         if self.lab_tests:
             self.lab_tests.pop()
+            self.mark_dirty('lab_tests')
     
     def add_imaging_study(self):
-        study = {
-            'type': self.imaging_type_var.get(),
-            'body_part': self.body_part_var.get(),
-            'date': self.imaging_date_calendar.get_date().strftime("%Y-%m-%d"),
-            'findings': self.imaging_findings_text.get("1.0", tk.END).strip()
-        }
+        study = ImagingStudy(
+            type=self.imaging_type_var.get(),
+            body_part=self.body_part_var.get(),
+            date=self.imaging_date_calendar.get_date().strftime("%Y-%m-%d"),
+            findings=self.get_text('imaging_findings_text')
+        )
         self.imaging_studies.append(study)
+        self.mark_dirty('imaging_studies')
         self.clear_imaging_fields()
     
     def remove_last_imaging_study(self):
         if self.imaging_studies:
             self.imaging_studies.pop()
+            self.mark_dirty('imaging_studies')
     
     def add_biopsy(self):
-        biopsy = {
-            'type': self.biopsy_type_var.get(),
-            'site': self.biopsy_site_var.get(),
-            'date': self.biopsy_date_calendar.get_date().strftime("%Y-%m-%d"),
-            'results': self.biopsy_results_text.get("1.0", tk.END).strip()
-        }
+        biopsy = Biopsy(
+            type=self.biopsy_type_var.get(),
+            site=self.biopsy_site_var.get(),
+            date=self.biopsy_date_calendar.get_date().strftime("%Y-%m-%d"),
+            results=self.get_text('biopsy_results_text')
+        )
         self.biopsies.append(biopsy)
+        self.mark_dirty('biopsies')
         self.clear_biopsy_fields()
     
     def remove_last_biopsy(self):
         if self.biopsies:
             self.biopsies.pop()
+            self.mark_dirty('biopsies')
     
     def add_ecg(self):
-        ecg = {
-            'type': self.ecg_type_var.get(),
-            'date': self.ecg_date_calendar.get_date().strftime("%Y-%m-%d"),
-            'results': self.ecg_results_text.get("1.0", tk.END).strip()
-        }
+        ecg = EcgResult(
+            type=self.ecg_type_var.get(),
+            date=self.ecg_date_calendar.get_date().strftime("%Y-%m-%d"),
+            results=self.get_text('ecg_results_text')
+        )
         self.ecg_results.append(ecg)
+        self.mark_dirty('ecg_results')
         self.clear_ecg_fields()
     
     def remove_last_ecg(self):
         if self.ecg_results:
             self.ecg_results.pop()
+            self.mark_dirty('ecg_results')
     
     def add_other_test(self):
-        test = {
-            'type': self.other_test_type_var.get(),
-            'date': self.other_test_date_calendar.get_date().strftime("%Y-%m-%d"),
-            'results': self.other_test_results_text.get("1.0", tk.END).strip()
-        }
+        test = OtherTest(
+            type=self.other_test_type_var.get(),
+            date=self.other_test_date_calendar.get_date().strftime("%Y-%m-%d"),
+            results=self.get_text('other_test_results_text')
+        )
         self.other_tests.append(test)
+        self.mark_dirty('other_tests')
         self.clear_other_test_fields()
     
     def remove_last_other_test(self):
         if self.other_tests:
             self.other_tests.pop()
+            self.mark_dirty('other_tests')
     
     def clear_lab_test_fields(self):
         self.lab_test_var.set("")
@@ -981,196 +1186,119 @@ class SimpleMedicalRecord:
         self.other_test_results_text.delete("1.0", tk.END)
     
     def save_record(self):
-        required_fields = {
-            "Full Name": self.name_var.get().strip(),
-            "Date of Birth": self.dob_calendar.get_date().strftime("%Y-%m-%d"),
-            "Gender": self.gender_var.get(),
-            "Phone": self.phone_var.get().strip(),
-            "Email": self.email_var.get().strip(),
-            "Emergency Contact Name": self.emergency_name_var.get().strip(),
-            "Emergency Contact Phone": self.emergency_phone_var.get().strip(),
-            "Emergency Contact Relationship": self.emergency_relation_var.get().strip(),
-            "Insurance Provider": self.insurance_provider_var.get().strip(),
-            "Insurance ID": self.policy_number_var.get().strip()
-        }
-        
-        missing_fields = [field for field, value in required_fields.items() if not value]
+        self.validator.flush()
+        
+        for name in self.dirty_fields & FIELD_KINDS.keys():
+            self.field_values[name] = self.read_field(name, FIELD_KINDS[name])
+        self.dirty_fields.clear()
+        
+        record = {}
+        for path, name, kind in FORM_FIELDS:
+            if kind in ('date', 'list'):
+                value = self.read_field(name, kind)
+            else:
+                value = self.field_values.get(name, "")
+            set_path(record, path, value)
+        record["date_created"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        missing_fields = missing_required_fields(record)
         if missing_fields:
             messagebox.showerror("Error", f"Please fill in the following required fields:\n{', '.join(missing_fields)}")
             return
         
-        record = {
-            "personal_info": {
-                "name": self.name_var.get().strip(),
-                "dob": self.dob_calendar.get_date().strftime("%Y-%m-%d"),
-                "gender": self.gender_var.get(),
-                "phone": self.phone_var.get().strip(),
-                "email": self.email_var.get().strip(),
-                "emergency_contact": {
-                    "name": self.emergency_name_var.get().strip(),
-                    "phone": self.emergency_phone_var.get().strip(),
-                    "relationship": self.emergency_relation_var.get().strip()
-                },
-                "insurance": {
-                    "provider": self.insurance_provider_var.get().strip(),
-                    "id": self.policy_number_var.get().strip(),
-                    "group_number": self.coverage_text.get("1.0", tk.END).strip()
-                }
-            },
-            "medical_info": {
-                "past_medical": {
-                    "chronic_conditions": self.chronic_conditions_text.get("1.0", tk.END).strip(),
-                    "surgeries": self.surgeries_text.get("1.0", tk.END).strip(),
-                    "hospitalizations": self.hospitalizations_text.get("1.0", tk.END).strip()
-                },
-                "family_history": self.family_history_text.get("1.0", tk.END).strip(),
-                "social_history": {
-                    "smoking": self.smoking_var.get(),
-                    "alcohol": self.alcohol_var.get(),
-                    "drug_use": self.drug_var.get(),
-                    "occupation": self.occupation_var.get(),
-                    "lifestyle": self.lifestyle_text.get("1.0", tk.END).strip()
-                },
-                "allergies": self.allergies_text.get("1.0", tk.END).strip(),
-                "immunizations": self.immunization_text.get("1.0", tk.END).strip(),
-                "medications": self.medications_text.get("1.0", tk.END).strip()
-            },
-            "vital_signs": {
-                "blood_pressure": {
-                    "systolic": self.bp_systolic_var.get(),
-                    "diastolic": self.bp_diastolic_var.get()
-                },
-                "heart_rate": self.heart_rate_var.get(),
-                "respiratory_rate": self.respiratory_rate_var.get(),
-                "temperature": self.temperature_var.get(),
-                "height": self.height_var.get(),
-                "weight": self.weight_var.get(),
-                "bmi": self.bmi_var.get(),
-                "bmi_category": self.bmi_category_var.get().strip('()')
-            },
-            "physical_examination": {
-                "general_appearance": self.general_appearance_text.get("1.0", tk.END).strip(),
-                "heent": {
-                    "head": self.head_text.get("1.0", tk.END).strip(),
-                    "eyes": self.eyes_text.get("1.0", tk.END).strip(),
-                    "ears": self.ears_text.get("1.0", tk.END).strip(),
-                    "nose": self.nose_text.get("1.0", tk.END).strip(),
-                    "throat": self.throat_text.get("1.0", tk.END).strip()
-                },
-                "cardiovascular": self.cv_text.get("1.0", tk.END).strip(),
-                "respiratory": self.resp_text.get("1.0", tk.END).strip(),
-                "abdomen": self.abdomen_text.get("1.0", tk.END).strip(),
-                "musculoskeletal": self.msk_text.get("1.0", tk.END).strip(),
-                "neurological": self.neuro_text.get("1.0", tk.END).strip()
-            },
-            "diagnostic_tests": {
-                "lab_tests": self.lab_tests,
-                "imaging_studies": self.imaging_studies,
-                "biopsies": self.biopsies,
-                "ecg_results": self.ecg_results,
-                "other_tests": self.other_tests
-            },
-            "notes": self.notes_text.get("1.0", tk.END).strip(),
-            "date_created": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        
-        filename = f"{self.name_var.get().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        
-        file_path = filedialog.asksaveasfilename(
-            defaultextension=".json",
-            initialfile=filename,
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
-            title="Save Medical Record"
-        )
-        
-        if file_path:
+        token = uuid.uuid4().hex
+        self.outbox.record(token, {'record': record, 'patient_id': self.current_patient_id})
+        self.outbox.flush()
+        self.outbox_records[token] = (record, self.current_patient_id)
+        try:
+            self.writer.submit(record, self.current_patient_id)
+        except SaveQueueFull:
+            del self.outbox_records[token]
+            self.outbox.record(token, "")
+            self.outbox.flush()
+            messagebox.showerror("Error", "The save queue is full, so the record was not saved.\n\nPlease wait for the pending saves to finish and try again.")
+            return
+        self.status_var.set(f"Saving record for {record['personal_info']['name']}...")
+        self.clear_form()
+        if self.save_poll is None:
+            self.save_poll = self.root.after(100, self.poll_saves)
+    
+    def submit_outbox_backlog(self):
+        while self.outbox_backlog:
             try:
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                
-                with open(file_path, 'w') as f:
-                    json.dump(record, f, indent=4)
-                
-                messagebox.showinfo("Success", "Medical record saved successfully!")
-                self.clear_form()
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to save record: {str(e)}")
-        else:
-            messagebox.showinfo("Cancelled", "Save operation cancelled.")
+                self.writer.submit(*self.outbox_backlog[0])
+            except SaveQueueFull:
+                return
+            self.outbox_backlog.pop(0)
+    
+    def poll_saves(self):
+        self.submit_outbox_backlog()
+        busy = self.writer.pending() or self.outbox_backlog
+        for record, patient_id, version, error in self.writer.dispatch():
+            name = record['personal_info']['name']
+            if error is not None:
+                self.status_var.set("")
+                if self.settle_save(record, restore=self.form_is_blank()):
+                    messagebox.showerror("Error", f"Failed to save record for {name}: {str(error)}\n\nThe record has been restored to the form.")
+                else:
+                    messagebox.showerror("Error", f"Failed to save record for {name}: {str(error)}\n\nThe record was kept and will be saved again on the next start.")
+            else:
+                self.settle_save(record)
+                self.status_var.set(f"Saved record for {name} (version {version})")
+                if self.patient_list is not None and self.patient_list.exists():
+                    self.patient_list.refresh()
+        self.save_poll = self.root.after(100, self.poll_saves) if busy else None
+    
+    def settle_save(self, record, restore=None):
+        token = next(token for token, (pending, _) in self.outbox_records.items() if pending is record)
+        if restore is False:
+            return False
+        _, patient_id = self.outbox_records.pop(token)
+        self.outbox.record(token, "")
+        self.outbox.flush()
+        if restore:
+            self.fill_form(record, patient_id)
+        return True
+    
+    def open_patient_list(self):
+        if self.patient_list is not None and self.patient_list.exists():
+            self.patient_list.lift()
+            return
+        self.patient_list = PatientListWindow(self.root, self.store, on_open=self.open_record)
+    
+    def on_close(self):
+        for record, patient_id, version, error in self.writer.close():
+            if error is not None:
+                messagebox.showerror("Error", f"Failed to save record for {record['personal_info']['name']}: {str(error)}\n\nThe record was kept and will be saved again on the next start.")
+            else:
+                self.settle_save(record)
+        self.store.close()
+        self.record_draft_fields()
+        self.draft.flush()
+        if self.profiler is not None:
+            self.profiler.dump(self.profile_path)
+        self.root.destroy()
     
     def clear_form(self):
-        self.name_var.set("")
-        self.dob_calendar.set_date(datetime.now())
-        self.gender_var.set("")
-        self.phone_var.set("")
-        self.email_var.set("")
-        self.emergency_name_var.set("")
-        self.emergency_phone_var.set("")
-        self.emergency_relation_var.set("")
-        self.insurance_provider_var.set("")
-        self.policy_number_var.set("")
-        self.bp_systolic_var.set("")
-        self.bp_diastolic_var.set("")
-        self.heart_rate_var.set("")
-        self.respiratory_rate_var.set("")
-        self.temperature_var.set("")
-        self.height_var.set("")
-        self.weight_var.set("")
-        self.bmi_var.set("")
-        self.bmi_category_var.set("")
-        self.bmi_category_combo.set("")
-        
-        self.chronic_conditions_text.delete("1.0", tk.END)
-        self.surgeries_text.delete("1.0", tk.END)
-        self.hospitalizations_text.delete("1.0", tk.END)
-        self.family_history_text.delete("1.0", tk.END)
-        self.smoking_var.set("")
-        self.alcohol_var.set("")
-        self.drug_var.set("")
-        self.occupation_var.set("")
-        self.lifestyle_text.delete("1.0", tk.END)
-        self.immunization_text.delete("1.0", tk.END)
-        self.allergies_text.delete("1.0", tk.END)
-        self.medications_text.delete("1.0", tk.END)
-        self.coverage_text.delete("1.0", tk.END)
-        self.notes_text.delete("1.0", tk.END)
-        
-        self.heart_rate_var.set("")
+        self.validator.cancel()
+        for path, name, kind in FORM_FIELDS:
+            self.write_field(name, kind, [] if kind == 'list' else "")
         self.hr_status_var.set("")
-        self.draw_heart_rate_range()  
-        
-        self.height_var.set("")
-        self.weight_var.set("")
-        self.bmi_var.set("")
-        self.bmi_category_var.set("")
-        self.bmi_category_combo.set("")
-        self.draw_bmi_range()  
-        
-        
-        self.general_appearance_text.delete("1.0", tk.END)
-        self.head_text.delete("1.0", tk.END)
-        self.eyes_text.delete("1.0", tk.END)
-        self.ears_text.delete("1.0", tk.END)
-        self.nose_text.delete("1.0", tk.END)
-        self.throat_text.delete("1.0", tk.END)
-        self.cv_text.delete("1.0", tk.END)
-        self.resp_text.delete("1.0", tk.END)
-        self.abdomen_text.delete("1.0", tk.END)
-        self.msk_text.delete("1.0", tk.END)
-        self.neuro_text.delete("1.0", tk.END)
-        
-        
-        self.lab_tests = []
-        self.imaging_studies = []
-        self.biopsies = []
-        self.ecg_results = []
-        self.other_tests = []
-        
-        
-        self.clear_lab_test_fields()
-        self.clear_imaging_fields()
-        self.clear_biopsy_fields()
-        self.clear_ecg_fields()
-        self.clear_other_test_fields()
+        if 'Vitals' in self.built_pages:
+            self.bmi_category_combo.set("")
+            self.hr_gauge.clear()
+            self.bmi_gauge.clear()
+        
+        if 'Diagnostics' in self.built_pages:
+            self.clear_lab_test_fields()
+            self.clear_imaging_fields()
+            self.clear_biopsy_fields()
+            self.clear_ecg_fields()
+            self.clear_other_test_fields()
+        
+        self.current_patient_id = None
+        self.draft_fields.clear()
+        self.draft.clear()
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,431 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+from record_delta import record_changes
+from record_schema import TEST_LISTS, get_path
+from record_store import normalize_key, normalize_name, record_keys
+
+PERSONAL_COLUMNS = [
+    ("name", ("personal_info", "name")),
+    ("dob", ("personal_info", "dob")),
+    ("gender", ("personal_info", "gender")),
+    ("phone", ("personal_info", "phone")),
+    ("email", ("personal_info", "email")),
+    ("emergency_name", ("personal_info", "emergency_contact", "name")),
+    ("emergency_phone", ("personal_info", "emergency_contact", "phone")),
+    ("emergency_relationship", ("personal_info", "emergency_contact", "relationship")),
+    ("insurance_provider", ("personal_info", "insurance", "provider")),
+    ("insurance_id", ("personal_info", "insurance", "id")),
+    ("insurance_group_number", ("personal_info", "insurance", "group_number")),
+]
+
+MEDICAL_COLUMNS = [
+    ("chronic_conditions", ("medical_info", "past_medical", "chronic_conditions")),
+    ("surgeries", ("medical_info", "past_medical", "surgeries")),
+    ("hospitalizations", ("medical_info", "past_medical", "hospitalizations")),
+    ("family_history", ("medical_info", "family_history")),
+    ("smoking", ("medical_info", "social_history", "smoking")),
+    ("alcohol", ("medical_info", "social_history", "alcohol")),
+    ("drug_use", ("medical_info", "social_history", "drug_use")),
+    ("occupation", ("medical_info", "social_history", "occupation")),
+    ("lifestyle", ("medical_info", "social_history", "lifestyle")),
+    ("allergies", ("medical_info", "allergies")),
+    ("immunizations", ("medical_info", "immunizations")),
+    ("medications", ("medical_info", "medications")),
+]
+
+VITAL_COLUMNS = [
+    ("systolic", ("vital_signs", "blood_pressure", "systolic")),
+    ("diastolic", ("vital_signs", "blood_pressure", "diastolic")),
+    ("heart_rate", ("vital_signs", "heart_rate")),
+    ("respiratory_rate", ("vital_signs", "respiratory_rate")),
+    ("temperature", ("vital_signs", "temperature")),
+    ("height", ("vital_signs", "height")),
+    ("weight", ("vital_signs", "weight")),
+    ("bmi", ("vital_signs", "bmi")),
+    ("bmi_category", ("vital_signs", "bmi_category")),
+]
+
+EXAM_COLUMNS = [
+    ("general_appearance", ("physical_examination", "general_appearance")),
+    ("head", ("physical_examination", "heent", "head")),
+    ("eyes", ("physical_examination", "heent", "eyes")),
+    ("ears", ("physical_examination", "heent", "ears")),
+    ("nose", ("physical_examination", "heent", "nose")),
+    ("throat", ("physical_examination", "heent", "throat")),
+    ("cardiovascular", ("physical_examination", "cardiovascular")),
+    ("respiratory", ("physical_examination", "respiratory")),
+    ("abdomen", ("physical_examination", "abdomen")),
+    ("musculoskeletal", ("physical_examination", "musculoskeletal")),
+    ("neurological", ("physical_examination", "neurological")),
+]
+
+SECTION_TABLES = [
+    ("personal_info", PERSONAL_COLUMNS),
+    ("medical_info", MEDICAL_COLUMNS),
+    ("vital_signs", VITAL_COLUMNS),
+    ("physical_examination", EXAM_COLUMNS),
+]
+
+KEY_FIELDS = ("name", "dob", "policy", "display", "phone")
+SORT_COLUMNS = {"name": "name_key", "dob": "dob", "policy": "policy_key", "phone": "phone_key"}
+
+CHILD_TABLES = [(table, list(columns)) for table, columns in TEST_LISTS.items()]
+
+
+def _column_value(value):
+    # Nested values that the form never produces are kept as JSON text; the
+    # record itself is always returned from the document column.
+    return value if isinstance(value, (str, int, float)) else json.dumps(value, separators=(",", ":"))
+
+
+def _plant(record, path, value):
+    for key in path[:-1]:
+        record = record.setdefault(key, {})
+    record[path[-1]] = value
+
+
+def _schema():
+    statements = [
+        """CREATE TABLE IF NOT EXISTS patients (
+            patient_id TEXT PRIMARY KEY,
+            latest_version INTEGER NOT NULL,
+            name_key TEXT NOT NULL,
+            dob TEXT NOT NULL,
+            policy_key TEXT NOT NULL,
+            display_name TEXT NOT NULL,
+            phone_key TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS patients_name ON patients (name_key)",
+        "CREATE INDEX IF NOT EXISTS patients_dob ON patients (dob)",
+        "CREATE INDEX IF NOT EXISTS patients_policy ON patients (policy_key)",
+        "CREATE INDEX IF NOT EXISTS patients_phone ON patients (phone_key)",
+        """CREATE TABLE IF NOT EXISTS records (
+            record_id INTEGER PRIMARY KEY,
+            patient_id TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            date_created TEXT NOT NULL,
+            saved_at TEXT NOT NULL,
+            notes TEXT NOT NULL,
+            document TEXT,
+            UNIQUE (patient_id, version)
+        )""",
+    ]
+    for table, columns in SECTION_TABLES:
+        column_sql = ", ".join(f"{column} TEXT NOT NULL" for column, _ in columns)
+        statements.append(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            f"record_id INTEGER PRIMARY KEY REFERENCES records (record_id) ON DELETE CASCADE, {column_sql})"
+        )
+    for table, columns in CHILD_TABLES:
+        column_sql = ", ".join(f"{column} TEXT NOT NULL" for column in columns)
+        statements.append(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            f"record_id INTEGER NOT NULL REFERENCES records (record_id) ON DELETE CASCADE, "
+            f"seq INTEGER NOT NULL, {column_sql}, PRIMARY KEY (record_id, seq))"
+        )
+    return statements
+
+
+def _insert_sql(table, columns):
+    placeholders = ", ".join("?" for _ in range(len(columns) + 1))
+    return f"INSERT INTO {table} (record_id, {', '.join(columns)}) VALUES ({placeholders})"
+
+
+INSERT_RECORD = (
+    "INSERT INTO records (record_id, patient_id, version, date_created, saved_at, notes, document) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+UPSERT_PATIENT = (
+    "INSERT INTO patients (patient_id, latest_version, name_key, dob, policy_key, display_name, phone_key) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (patient_id) DO UPDATE SET latest_version = excluded.latest_version, "
+    "name_key = excluded.name_key, dob = excluded.dob, policy_key = excluded.policy_key, "
+    "display_name = excluded.display_name, phone_key = excluded.phone_key"
+)
+INSERT_SECTIONS = [
+    (table, columns, _insert_sql(table, [column for column, _ in columns])) for table, columns in SECTION_TABLES
+]
+INSERT_CHILDREN = [
+    (table, columns, f"INSERT INTO {table} (record_id, seq, {', '.join(columns)}) "
+                     f"VALUES ({', '.join('?' for _ in range(len(columns) + 2))})")
+    for table, columns in CHILD_TABLES
+]
+
+
+class SQLiteRecordStore:
+    DB_FILE = "records.db"
+
+    def __init__(self, records_dir="medical_records", path=None):
+        self.records_dir = records_dir
+        os.makedirs(self.records_dir, exist_ok=True)
+        self.path = path or os.path.join(self.records_dir, self.DB_FILE)
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                                     timeout=30, cached_statements=256)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        with self._transaction():
+            for statement in _schema():
+                self._conn.execute(statement)
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(records)")]
+            if "document" not in columns:
+                # Databases created before full documents were kept; their
+                # records are rebuilt from the section tables.
+                self._conn.execute("ALTER TABLE records ADD COLUMN document TEXT")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _transaction(self):
+        return _Transaction(self._conn, self._lock)
+
+    def resolve_patient(self, record):
+        with self._lock:
+            return self._resolve(record_keys(record))
+
+    def _resolve(self, keys):
+        if keys["policy"] and keys["dob"]:
+            rows = self._conn.execute(
+                "SELECT patient_id FROM patients WHERE policy_key = ? AND dob = ? LIMIT 2",
+                (keys["policy"], keys["dob"])).fetchall()
+            if len(rows) == 1:
+                return rows[0][0]
+        if keys["name"] and keys["dob"]:
+            rows = self._conn.execute(
+                "SELECT patient_id FROM patients WHERE name_key = ? AND dob = ? AND (? = '' OR policy_key = '') LIMIT 2",
+                (keys["name"], keys["dob"], keys["policy"])).fetchall()
+            if len(rows) == 1:
+                return rows[0][0]
+        return None
+
+    def save(self, record, patient_id=None):
+        return self.save_many([(record, patient_id)])[0]
+
+    def save_many(self, items):
+        items = [item if isinstance(item, tuple) else (item, None) for item in items]
+        saved_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        record_rows = []
+        patient_rows = {}
+        section_rows = {table: [] for table, _ in SECTION_TABLES}
+        child_rows = {table: [] for table, _ in CHILD_TABLES}
+        results = []
+
+        with self._transaction():
+            next_id = self._conn.execute("SELECT COALESCE(MAX(record_id), 0) FROM records").fetchone()[0] + 1
+            latest = {}
+            pending = {}
+            for record, patient_id in items:
+                keys = record_keys(record)
+                patient_id = patient_id or record.get("patient_id")
+                if not patient_id:
+                    patient_id = self._resolve_pending(keys, pending) or self._resolve_stored(keys, patient_rows)
+                    patient_id = patient_id or uuid.uuid4().hex
+                if patient_id not in latest:
+                    row = self._conn.execute(
+                        "SELECT latest_version FROM patients WHERE patient_id = ?", (patient_id,)).fetchone()
+                    latest[patient_id] = row[0] if row else 0
+                latest[patient_id] += 1
+                version = latest[patient_id]
+                if keys["policy"] and keys["dob"]:
+                    pending[("policy", keys["policy"], keys["dob"])] = patient_id
+                if keys["name"] and keys["dob"]:
+                    pending[("name", keys["name"], keys["dob"])] = (patient_id, keys["policy"])
+
+                record_id = next_id
+                next_id += 1
+                document = json.dumps(dict(record, patient_id=patient_id, version=version), separators=(",", ":"))
+                record_rows.append((record_id, patient_id, version,
+                                    _column_value(get_path(record, ("date_created",)) or saved_at),
+                                    saved_at, _column_value(get_path(record, ("notes",))), document))
+                patient_rows[patient_id] = (patient_id, version, keys["name"], keys["dob"], keys["policy"],
+                                            keys["display"], keys["phone"])
+                for table, columns, _ in INSERT_SECTIONS:
+                    section_rows[table].append(
+                        (record_id,) + tuple(_column_value(get_path(record, path)) for _, path in columns))
+                tests = record.get("diagnostic_tests")
+                for table, columns, _ in INSERT_CHILDREN:
+                    entries = tests.get(table) if isinstance(tests, dict) else None
+                    for seq, entry in enumerate(entries if isinstance(entries, list) else []):
+                        child_rows[table].append(
+                            (record_id, seq) + tuple(_column_value(get_path(entry, (column,))) for column in columns))
+                results.append((patient_id, version, record))
+
+            self._conn.executemany(INSERT_RECORD, record_rows)
+            self._conn.executemany(UPSERT_PATIENT, patient_rows.values())
+            for table, _, sql in INSERT_SECTIONS:
+                self._conn.executemany(sql, section_rows[table])
+            for table, _, sql in INSERT_CHILDREN:
+                if child_rows[table]:
+                    self._conn.executemany(sql, child_rows[table])
+        for patient_id, version, record in results:
+            for callback in self._listeners:
+                callback(patient_id, version, dict(record, patient_id=patient_id, version=version))
+        return [(patient_id, version) for patient_id, version, _ in results]
+
+    def _resolve_stored(self, keys, patient_rows):
+        patient_id = self._resolve(keys)
+        # Earlier records in this batch may have given the match a policy
+        # that the patients table does not show yet.
+        policy = patient_rows[patient_id][4] if patient_id in patient_rows else ""
+        if keys["policy"] and policy and policy != keys["policy"]:
+            return None
+        return patient_id
+
+    @staticmethod
+    def _resolve_pending(keys, pending):
+        if keys["policy"] and keys["dob"] and ("policy", keys["policy"], keys["dob"]) in pending:
+            return pending[("policy", keys["policy"], keys["dob"])]
+        if keys["name"] and keys["dob"]:
+            match = pending.get(("name", keys["name"], keys["dob"]))
+            if match and not (keys["policy"] and match[1]):
+                return match[0]
+        return None
+
+    def get(self, patient_id, version=None):
+        with self._lock:
+            if version is None:
+                row = self._conn.execute(
+                    "SELECT r.record_id, r.version, r.date_created, r.notes, r.document FROM records r "
+                    "JOIN patients p ON p.patient_id = r.patient_id AND p.latest_version = r.version "
+                    "WHERE r.patient_id = ?", (patient_id,)).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT record_id, version, date_created, notes, document FROM records "
+                    "WHERE patient_id = ? AND version = ?", (patient_id, version)).fetchone()
+            if row is None:
+                raise KeyError(patient_id if version is None else (patient_id, version))
+            record_id, version, date_created, notes, document = row
+            if document is not None:
+                return json.loads(document)
+
+            record = {}
+            for table, columns in SECTION_TABLES:
+                names = ", ".join(column for column, _ in columns)
+                values = self._conn.execute(
+                    f"SELECT {names} FROM {table} WHERE record_id = ?", (record_id,)).fetchone()
+                for (_, path), value in zip(columns, values or ("",) * len(columns)):
+                    _plant(record, path, value)
+            tests = record.setdefault("diagnostic_tests", {})
+            for table, columns in CHILD_TABLES:
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(columns)} FROM {table} WHERE record_id = ? ORDER BY seq", (record_id,))
+                tests[table] = [dict(zip(columns, values)) for values in rows]
+        record["notes"] = notes
+        record["date_created"] = date_created
+        record["patient_id"] = patient_id
+        record["version"] = version
+        return record
+
+    def diff(self, patient_id, old_version, new_version=None):
+        return record_changes(self.get(patient_id, old_version), self.get(patient_id, new_version))
+
+    def versions(self, patient_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT version FROM records WHERE patient_id = ? ORDER BY version", (patient_id,))
+            return [version for (version,) in rows]
+
+    def latest_version(self, patient_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT latest_version FROM patients WHERE patient_id = ?", (patient_id,)).fetchone()
+            return row[0] if row else 0
+
+    def record_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(latest_version), 0) FROM patients").fetchone()[0]
+
+    def latest_versions(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT patient_id, latest_version FROM patients"))
+
+    def keys(self, patient_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name_key, dob, policy_key, display_name, phone_key FROM patients WHERE patient_id = ?",
+                (patient_id,)).fetchone()
+        if row is None:
+            raise KeyError(patient_id)
+        return dict(zip(KEY_FIELDS, row))
+
+    def _find(self, column, value):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT patient_id FROM patients WHERE {column} = ? ORDER BY patient_id", (value,))
+            return [patient_id for (patient_id,) in rows]
+
+    def find_by_name(self, name):
+        return self._find("name_key", normalize_name(name))
+
+    def find_by_dob(self, dob):
+        return self._find("dob", dob.strip())
+
+    def find_by_policy(self, policy_number):
+        return self._find("policy_key", normalize_key(policy_number))
+
+    def patient_ids(self):
+        with self._lock:
+            return [patient_id for (patient_id,) in self._conn.execute("SELECT patient_id FROM patients")]
+
+    def iter_keys(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT patient_id, name_key, dob, policy_key, display_name, phone_key FROM patients").fetchall()
+        return ((row[0], dict(zip(KEY_FIELDS, row[1:]))) for row in rows)
+
+    def page(self, order_by="name", offset=0, limit=50, descending=False):
+        column = SORT_COLUMNS[order_by]
+        direction = "DESC" if descending else "ASC"
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT patient_id, name_key, dob, policy_key, display_name, phone_key FROM patients "
+                f"ORDER BY {column} {direction}, rowid {direction} LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+        return [(row[0], dict(zip(KEY_FIELDS, row[1:]))) for row in rows]
+
+    def iter_latest(self):
+        for patient_id in self.patient_ids():
+            yield self.get(patient_id)
+
+    def __contains__(self, patient_id):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM patients WHERE patient_id = ?", (patient_id,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+
+
+class _Transaction:
+    def __init__(self, conn, lock):
+        self._conn = conn
+        self._lock = lock
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self._lock.release()
+            raise
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self._lock.release()
+        return False
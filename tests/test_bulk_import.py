@@ -0,0 +1,50 @@
+import json
+import os
+
+import pytest
+
+from bulk_import import CHECKPOINT_FILE, PENDING_MARK, append_checkpoint, discover, read_checkpoint, run_import
+from generate_records import generate_record
+from record_store import RecordStore
+
+
+@pytest.fixture
+def source(tmp_path):
+    root = tmp_path / "source"
+    root.mkdir()
+    for index in range(12):
+        with open(root / f"patient{index}_20240101_{index:06d}.json", "w", encoding="utf-8") as f:
+            json.dump(generate_record(13, index, 0), f)
+    return str(root)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RecordStore(str(tmp_path / "records"))
+
+
+def test_rerun_skips_checkpointed_files(store, source):
+    summary = run_import(store, source, workers=1, batch_size=5, progress=False)
+    assert summary["imported"] == 12
+    count = store.record_count()
+    summary = run_import(store, source, workers=1, batch_size=5, progress=False)
+    assert summary["imported"] == 0
+    assert summary["skipped"] == 12
+    assert store.record_count() == count
+
+
+def test_resume_after_crash_between_save_and_checkpoint(store, source):
+    paths = discover(source)
+    checkpoint_path = os.path.join(store.records_dir, CHECKPOINT_FILE)
+    # The first four were saved but only marked pending; the next two were
+    # marked pending and never reached the store.
+    append_checkpoint(checkpoint_path, [PENDING_MARK + path for path in paths[:6]])
+    for path in paths[:4]:
+        with open(path, "r", encoding="utf-8") as f:
+            store.save(json.load(f))
+    count = store.record_count()
+    summary = run_import(store, source, workers=1, batch_size=5, progress=False)
+    assert summary["imported"] == 8
+    assert summary["skipped"] == 4
+    assert store.record_count() == count + 8
+    assert read_checkpoint(checkpoint_path) == (set(paths), set())
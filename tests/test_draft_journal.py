@@ -0,0 +1,74 @@
+import tkinter as tk
+
+import pytest
+
+from draft_journal import DraftJournal
+from record_model import LabTest
+from simple_medical_records import SimpleMedicalRecord
+
+
+def test_recovers_flushed_fields_and_skips_torn_line(tmp_path):
+    path = str(tmp_path / "draft.journal")
+    journal = DraftJournal(path)
+    journal.record("name_var", "Ada")
+    journal.flush()
+    journal.record("notes_text", "chest pain")
+    journal.flush()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"phone_var": "555')
+    assert DraftJournal(path).load() == {"name_var": "Ada", "notes_text": "chest pain"}
+
+
+def test_compaction_keeps_latest_nonblank_values(tmp_path):
+    path = str(tmp_path / "draft.journal")
+    journal = DraftJournal(path, compact_every=3)
+    for value in ("A", "Ad", "Ada", ""):
+        journal.record("name_var", value)
+        journal.flush()
+    journal.record("phone_var", "555")
+    journal.flush()
+    assert DraftJournal(path).load() == {"phone_var": "555"}
+
+
+class FakeWriter:
+    def close(self):
+        return []
+
+
+class FakeStore:
+    def close(self):
+        pass
+
+
+class FakeRoot:
+    def destroy(self):
+        pass
+
+
+@pytest.fixture
+def app(tmp_path):
+    interpreter = tk.Tcl()
+    app = SimpleMedicalRecord.__new__(SimpleMedicalRecord)
+    app.root = FakeRoot()
+    app.writer = FakeWriter()
+    app.store = FakeStore()
+    app.profiler = None
+    app.draft = DraftJournal(str(tmp_path / "draft.journal"))
+    app.draft_fields = set()
+    app.dirty_fields = set()
+    app.name_var = tk.StringVar(interpreter)
+    return app
+
+
+def test_close_keeps_edits_since_last_flush(app):
+    app.name_var.set("Ada Lovelace")
+    app.mark_dirty("name_var")
+    app.on_close()
+    assert DraftJournal(app.draft.path).load() == {"name_var": "Ada Lovelace"}
+
+
+def test_removing_a_test_is_journaled(app):
+    app.lab_tests = [LabTest(type="CBC", date="2024-01-02", results="normal")]
+    app.remove_last_lab_test()
+    app.on_close()
+    assert DraftJournal(app.draft.path).load() == {"lab_tests": []}
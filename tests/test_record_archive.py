@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from generate_records import generate_record
+from record_archive import Segment, write_segment
+from record_store import RecordStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RecordStore(str(tmp_path / "store"))
+    for index in range(30):
+        record = generate_record(5, index, 0)
+        patient_id, _ = store.save(record)
+        for version in range(index % 4):
+            store.save(dict(record, notes=f"Follow-up {version}"), patient_id)
+    return store
+
+
+def test_segment_matches_store(store, tmp_path):
+    path = str(tmp_path / "records.seg")
+    count = write_segment(store, path)
+    assert count == sum(len(store.versions(patient_id)) for patient_id in store.patient_ids())
+    with Segment(path) as segment:
+        assert len(segment) == count
+        assert sorted(segment.patient_ids()) == sorted(store.patient_ids())
+        for patient_id in store.patient_ids():
+            assert segment.versions(patient_id) == store.versions(patient_id)
+            for version in store.versions(patient_id):
+                assert segment.get(patient_id, version) == store.get(patient_id, version)
+            assert segment.get(patient_id) == store.get(patient_id)
+
+
+def test_segment_latest_only(store, tmp_path):
+    path = str(tmp_path / "latest.seg")
+    write_segment(store, path, all_versions=False)
+    with Segment(path) as segment:
+        for patient_id in store.patient_ids():
+            assert segment.versions(patient_id) == [store.latest_version(patient_id)]
+
+
+def test_segment_missing_entries(store, tmp_path):
+    path = str(tmp_path / "records.seg")
+    write_segment(store, path)
+    patient_id = store.patient_ids()[0]
+    with Segment(path) as segment:
+        assert "missing" not in segment
+        with pytest.raises(KeyError):
+            segment.get("missing")
+        with pytest.raises(KeyError):
+            segment.get(patient_id, store.latest_version(patient_id) + 1)
+
+
+def test_segment_rejects_other_files(tmp_path):
+    path = str(tmp_path / "not-a-segment")
+    with open(path, "wb") as f:
+        f.write(b"NOTASEG!" + bytes(56))
+    with pytest.raises(ValueError):
+        Segment(path)
+
+
+def test_store_reads_archived_versions_from_segment(store):
+    expected = {(patient_id, version): store.get(patient_id, version)
+                for patient_id in store.patient_ids() for version in store.versions(patient_id)}
+    other = RecordStore(store.records_dir)
+    count = store.archive(keep=1)
+    assert count == len(expected) - len(store.patient_ids())
+    assert store.archive(keep=1) == 0
+    files = [name for _, _, names in os.walk(store.records_dir) for name in names if name.startswith("v")]
+    assert len(files) == len(store.patient_ids())
+    for reader in (store, other, RecordStore(store.records_dir)):
+        for (patient_id, version), record in expected.items():
+            assert reader.get(patient_id, version) == record
+    patient_id = store.patient_ids()[3]
+    other.save(dict(expected[(patient_id, 1)], notes="After archiving"), patient_id)
+    assert RecordStore(store.records_dir).get(patient_id)["notes"] == "After archiving"
+    other.close()
+    store.close()
@@ -0,0 +1,53 @@
+import copy
+import os
+
+from generate_records import generate_record
+from record_delta import apply_delta, diff_records
+from record_store import RecordStore
+
+
+def edit(record, version):
+    record = copy.deepcopy(record)
+    record["notes"] = f"Visit {version}"
+    record["vital_signs"]["heart_rate"] = str(60 + version)
+    if version % 3 == 0:
+        record["vital_signs"].pop("bmi_category", None)
+        record["physical_examination"].pop("heent", None)
+    else:
+        record["vital_signs"]["bmi_category"] = "Normal (18.5-24.9)"
+        record["physical_examination"]["heent"] = {"head": f"Normocephalic {version}"}
+    if version % 5 == 0:
+        record["diagnostic_tests"]["lab_tests"] = [{"type": "CBC", "date": "2024-01-01", "results": f"WBC {version}"}]
+    return record
+
+
+def test_diff_round_trip_with_nested_unset():
+    old = {"a": {"b": 1, "c": {"d": 2}}, "e": [1, 2], "f": "x"}
+    new = {"a": {"b": 1}, "e": [1, 2, 3], "g": "y"}
+    delta = diff_records(old, new)
+    assert apply_delta(old, delta) == new
+    assert ["f"] in delta["unset"] and ["a", "c"] in delta["unset"]
+
+
+def test_chain_reconstruction_across_rebase(tmp_path):
+    store = RecordStore(str(tmp_path), rebase_every=4)
+    base = generate_record(11, 0, 0)
+    expected = {}
+    patient_id = None
+    for version in range(1, 26):
+        record = edit(base, version)
+        patient_id, saved = store.save(record, patient_id)
+        assert saved == version
+        expected[version] = record
+
+    patient_dir = os.path.join(str(tmp_path), patient_id[:2], patient_id)
+    names = set(os.listdir(patient_dir))
+    assert any(name.endswith(RecordStore.DELTA_SUFFIX) for name in names)
+    assert {"v1.json", "v5.json"} <= names
+
+    for reopened in (store, RecordStore(str(tmp_path), rebase_every=4)):
+        for version, record in expected.items():
+            stored = reopened.get(patient_id, version)
+            assert stored.pop("patient_id") == patient_id
+            assert stored.pop("version") == version
+            assert stored == record
@@ -0,0 +1,40 @@
+import pytest
+
+from generate_records import generate_record
+from record_model import MedicalRecord
+
+
+def test_generated_records_round_trip():
+    for index in range(50):
+        record = generate_record(7, index, 0)
+        assert MedicalRecord.from_dict(record).to_dict() == record
+
+
+@pytest.mark.parametrize("text", ["37.50", "0120", "1e2", "120.", " 120", "120", 120, 37.5, None, "", "n/a"])
+def test_vitals_keep_stored_text(text):
+    record = {"vital_signs": {"temperature": text, "blood_pressure": {"systolic": text}}}
+    assert MedicalRecord.from_dict(record).to_dict() == record
+
+
+def test_vitals_parse_to_numbers():
+    vitals = MedicalRecord.from_dict({"vital_signs": {"temperature": "37.50", "heart_rate": "0120"}}).vital_signs
+    assert vitals.temperature == 37.5
+    assert vitals.heart_rate == 120
+
+
+def test_edited_vital_is_dumped_from_new_value():
+    model = MedicalRecord.from_dict({"vital_signs": {"temperature": "37.50"}})
+    model.vital_signs.temperature = 38
+    assert model.to_dict() == {"vital_signs": {"temperature": "38"}}
+
+
+def test_partial_record_keeps_its_shape():
+    record = {"personal_info": {"name": "Ada Lovelace"}, "notes": "", "triage": "green"}
+    model = MedicalRecord.from_dict(record)
+    assert model.to_dict() == record
+    model.medical_info.allergies = "penicillin"
+    assert model.to_dict() == dict(record, medical_info={"allergies": "penicillin"})
+
+
+def test_new_record_has_every_section():
+    assert set(MedicalRecord().to_dict()) == MedicalRecord.KEYS
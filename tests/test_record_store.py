@@ -0,0 +1,52 @@
+import multiprocessing
+
+from generate_records import generate_record
+from record_store import RecordStore
+
+
+def save_versions(records_dir, patient_id, label, count):
+    store = RecordStore(records_dir)
+    base = generate_record(5, 0, 0)
+    for number in range(count):
+        store.save(dict(base, notes=f"{label} {number}"), patient_id)
+
+
+def test_concurrent_processes_do_not_lose_versions(tmp_path):
+    records_dir = str(tmp_path)
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=save_versions, args=(records_dir, "p1", label, 20)) for label in "ab"]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+    store = RecordStore(records_dir)
+    assert store.versions("p1") == list(range(1, 41))
+    notes = [store.get("p1", version)["notes"] for version in store.versions("p1")]
+    assert sorted(notes) == sorted(f"{label} {number}" for label in "ab" for number in range(20))
+    assert [store.get("p1", version)["version"] for version in store.versions("p1")] == list(range(1, 41))
+
+
+def test_refresh_sees_other_writers(tmp_path):
+    first = RecordStore(str(tmp_path))
+    second = RecordStore(str(tmp_path))
+    patient_id, _ = first.save(generate_record(5, 1, 0))
+    second.save(dict(generate_record(5, 1, 0), notes="second"), patient_id)
+    assert first.latest_version(patient_id) == 1
+    first.refresh()
+    assert first.get(patient_id)["notes"] == "second"
+    assert first.save(generate_record(5, 1, 0), patient_id) == (patient_id, 3)
+
+
+def test_torn_index_tail_is_skipped_and_terminated(tmp_path):
+    store = RecordStore(str(tmp_path))
+    patient_id, _ = store.save(generate_record(5, 2, 0))
+    with open(store.index_path, "ab") as f:
+        f.write(b'{"id":"torn","v":1,"pa')
+    reopened = RecordStore(str(tmp_path))
+    assert reopened.patient_ids() == [patient_id]
+    assert reopened.save(generate_record(5, 2, 0), patient_id) == (patient_id, 2)
+    final = RecordStore(str(tmp_path))
+    assert final.patient_ids() == [patient_id]
+    assert final.versions(patient_id) == [1, 2]
+    assert final.record_count() == 2
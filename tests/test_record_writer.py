@@ -0,0 +1,34 @@
+import threading
+
+import pytest
+
+from record_writer import RecordWriter, SaveQueueFull
+
+
+class BlockedStore:
+    def __init__(self):
+        self.release = threading.Event()
+        self.saved = []
+
+    def save(self, record, patient_id=None):
+        self.release.wait()
+        self.saved.append(record)
+        return patient_id or "p1", len(self.saved)
+
+
+def test_full_queue_rejects_instead_of_blocking():
+    store = BlockedStore()
+    writer = RecordWriter(store, maxsize=2)
+    writer.submit({"notes": "a"})
+    while writer._requests.qsize():
+        pass
+    # The writer thread is stuck saving "a"; two more fill the queue.
+    writer.submit({"notes": "b"})
+    writer.submit({"notes": "c"})
+    with pytest.raises(SaveQueueFull):
+        writer.submit({"notes": "d"})
+    assert writer.pending() == 3
+    store.release.set()
+    completed = writer.close()
+    assert [record["notes"] for record, _, _, _ in completed] == ["a", "b", "c"]
+    assert writer.pending() == 0
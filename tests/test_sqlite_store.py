@@ -0,0 +1,57 @@
+import pytest
+
+from generate_records import generate_record
+from record_store import RecordStore
+from sqlite_store import SQLiteRecordStore
+
+
+def person(name, dob, policy=""):
+    return {"personal_info": {"name": name, "dob": dob, "insurance": {"provider": "Aetna", "id": policy}},
+            "notes": f"{name} {policy}"}
+
+
+IDENTITY_CASES = [
+    person("Ada Lovelace", "1815-12-10"),
+    person("ada  lovelace", "1815-12-10", "POL-1"),
+    person("Ada Byron", "1815-12-10", "pol-1"),
+    person("Ada Lovelace", "1815-12-10", "POL-2"),
+    person("Ada Lovelace", "1816-01-01"),
+]
+
+
+def groups(results):
+    first_seen = {}
+    return [first_seen.setdefault(patient_id, len(first_seen)) for patient_id, _ in results]
+
+
+@pytest.mark.parametrize("batch", [True, False])
+def test_identity_resolution_matches_file_store(tmp_path, batch):
+    expected = [0, 0, 0, 1, 2]
+    for backend, path in ((RecordStore, "files"), (SQLiteRecordStore, "sqlite")):
+        store = backend(str(tmp_path / path / str(batch)))
+        if batch:
+            results = store.save_many([(record, None) for record in IDENTITY_CASES])
+        else:
+            results = [store.save(record) for record in IDENTITY_CASES]
+        assert groups(results) == expected, backend.__name__
+        store.close()
+
+
+def test_full_record_round_trips(tmp_path):
+    store = SQLiteRecordStore(str(tmp_path))
+    record = generate_record(11, 0, 0)
+    record["triage"] = {"level": 2, "tags": ["fall"]}
+    record["vital_signs"]["heart_rate"] = 72
+    record["medical_info"]["allergies"] = ["penicillin", "latex"]
+    patient_id, version = store.save(record)
+    assert store.get(patient_id) == dict(record, patient_id=patient_id, version=version)
+    store.close()
+
+
+def test_records_without_document_are_rebuilt_from_columns(tmp_path):
+    store = SQLiteRecordStore(str(tmp_path))
+    record = generate_record(11, 1, 0)
+    patient_id, version = store.save(record)
+    store._conn.execute("UPDATE records SET document = NULL")
+    assert store.get(patient_id) == dict(record, patient_id=patient_id, version=version)
+    store.close()
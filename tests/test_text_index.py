@@ -0,0 +1,75 @@
+
+import pytest
+
+from text_index import InvertedIndex, QueryError, TextIndex
+
+
+@pytest.fixture
+def index():
+    index = InvertedIndex()
+    index.add("a", ["Chest pain on exertion", "hypertension"])
+    index.add("b", ["pain in chest", "diabetes"])
+    index.add("c", ["Hypertension and diabetes"])
+    return index
+
+
+def test_boolean_and_phrase_queries(index):
+    assert index.search("chest pain") == ["a", "b"]
+    assert index.search('"chest pain"') == ["a"]
+    assert index.search("hypertension OR diabetes") == ["a", "b", "c"]
+    assert index.search("diabetes NOT chest") == ["c"]
+    assert index.search("NOT diabetes") == ["a"]
+    assert index.search("(chest OR hypertension) AND diabetes") == ["b", "c"]
+    assert index.search("") == []
+
+
+def test_phrase_does_not_cross_fields(index):
+    assert index.search('"exertion hypertension"') == []
+
+
+@pytest.mark.parametrize("query", ["(chest", "chest)", "AND", "chest AND", "chest OR", "NOT", "()"])
+def test_malformed_queries_raise(index, query):
+    with pytest.raises(QueryError):
+        index.search(query)
+
+
+@pytest.mark.parametrize("compact", [True, False])
+def test_reload_from_snapshot_or_journal(tmp_path, compact):
+    text_index = TextIndex(str(tmp_path))
+    text_index.add("a", ["chest pain"])
+    text_index.add("b", ["back pain"])
+    text_index.remove("a")
+    if compact:
+        text_index.compact()
+        with open(text_index.journal_path, "rb") as f:
+            assert len(f.read().splitlines()) == 1
+    assert TextIndex(str(tmp_path)).search("pain") == ["b"]
+
+
+def test_compaction_keeps_entries_from_other_processes(tmp_path):
+    first = TextIndex(str(tmp_path))
+    first.add("p1", ["chest pain"])
+    assert first.search("pain") == ["p1"]
+    second = TextIndex(str(tmp_path))
+    second.add("p2", ["hives"])
+    first.compact()
+    assert TextIndex(str(tmp_path)).search("hives") == ["p2"]
+    second.add("p3", ["hives again"])
+    second.compact()
+    assert TextIndex(str(tmp_path)).search("hives") == ["p2", "p3"]
+    assert TextIndex(str(tmp_path)).search("pain") == ["p1"]
+
+
+def test_journal_left_by_interrupted_compaction_is_not_replayed(tmp_path):
+    text_index = TextIndex(str(tmp_path))
+    text_index.add("a", ["chest pain"])
+    with open(text_index.journal_path, "rb") as f:
+        stale_journal = f.read()
+    text_index.remove("a")
+    text_index.compact()
+    with open(text_index.journal_path, "wb") as f:
+        f.write(stale_journal)
+    reloaded = TextIndex(str(tmp_path))
+    assert reloaded.search("pain") == []
+    reloaded.add("b", ["back pain"])
+    assert TextIndex(str(tmp_path)).search("pain") == ["b"]
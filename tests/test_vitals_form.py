@@ -0,0 +1,32 @@
+import tkinter as tk
+
+import pytest
+
+from simple_medical_records import SimpleMedicalRecord
+
+
+@pytest.fixture
+def app():
+    interpreter = tk.Tcl()
+    app = SimpleMedicalRecord.__new__(SimpleMedicalRecord)
+    app.built_pages = set()
+    app.heart_rate_var = tk.StringVar(interpreter)
+    app.hr_status_var = tk.StringVar(interpreter)
+    return app
+
+
+def test_stored_out_of_limits_heart_rate_is_kept(app):
+    app.heart_rate_var.set("400")
+    app.show_heart_rate_status()
+    assert app.heart_rate_var.get() == "400"
+    assert app.hr_status_var.get() == ""
+
+
+def test_edited_out_of_limits_heart_rate_is_cleared(app):
+    app.heart_rate_var.set("400")
+    app.validate_heart_rate()
+    assert app.heart_rate_var.get() == ""
+    app.heart_rate_var.set("72")
+    app.validate_heart_rate()
+    assert app.heart_rate_var.get() == "72"
+    assert app.hr_status_var.get()
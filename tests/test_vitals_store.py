@@ -0,0 +1,49 @@
+import os
+from operator import itemgetter
+
+import numpy as np
+import pytest
+
+from generate_records import generate_record
+from record_store import RecordStore
+from vitals_store import VitalsStore
+
+
+def test_sync_appends_only_new_versions(tmp_path):
+    store = RecordStore(str(tmp_path / "store"))
+    patient_ids = [store.save(generate_record(3, index, 0))[0] for index in range(5)]
+    vitals = VitalsStore().build(store)
+    store.save(generate_record(3, 10, 0), patient_ids[1])
+    store.save(generate_record(3, 11, 0))
+    assert vitals.sync(store) == 2
+    assert vitals.sync(store) == 0
+    rebuilt = VitalsStore().build(store)
+    key = itemgetter("patient_id", "version")
+    assert sorted(vitals.rows(range(len(vitals))), key=key) == sorted(rebuilt.rows(range(len(rebuilt))), key=key)
+
+
+def test_interrupted_save_keeps_previous_generation(tmp_path):
+    store = RecordStore(str(tmp_path / "store"))
+    for index in range(5):
+        store.save(generate_record(3, index, 0))
+    directory = str(tmp_path / "vitals")
+    vitals = VitalsStore().build(store)
+    vitals.save(directory)
+    # A later save that died after writing one column of generation 2.
+    np.save(os.path.join(directory, "systolic.2.npy"), np.zeros(3, dtype=np.int16))
+    loaded = VitalsStore(directory)
+    assert len(loaded) == 5
+    assert loaded.rows(range(5)) == vitals.rows(range(5))
+    loaded.save()
+    assert sorted(name for name in os.listdir(directory) if name.startswith("systolic.")) == \
+        ["systolic.2.npy", "systolic.missing.2.npy"]
+
+
+def test_mismatched_columns_are_rejected(tmp_path):
+    store = RecordStore(str(tmp_path / "store"))
+    store.save(generate_record(3, 0, 0))
+    directory = str(tmp_path / "vitals")
+    VitalsStore().build(store).save(directory)
+    np.save(os.path.join(directory, "heart_rate.1.npy"), np.zeros(4, dtype=np.int16))
+    with pytest.raises(ValueError):
+        VitalsStore(directory)
@@ -0,0 +1,387 @@
+import json
+import os
+import re
+import threading
+
+from record_store import locked_file, write_atomic
+
+TEXT_FIELDS = [
+    ("insurance_coverage", ("personal_info", "insurance", "group_number")),
+    ("chronic_conditions", ("medical_info", "past_medical", "chronic_conditions")),
+    ("surgeries", ("medical_info", "past_medical", "surgeries")),
+    ("hospitalizations", ("medical_info", "past_medical", "hospitalizations")),
+    ("family_history", ("medical_info", "family_history")),
+    ("lifestyle", ("medical_info", "social_history", "lifestyle")),
+    ("allergies", ("medical_info", "allergies")),
+    ("immunizations", ("medical_info", "immunizations")),
+    ("medications", ("medical_info", "medications")),
+    ("general_appearance", ("physical_examination", "general_appearance")),
+    ("head", ("physical_examination", "heent", "head")),
+    ("eyes", ("physical_examination", "heent", "eyes")),
+    ("ears", ("physical_examination", "heent", "ears")),
+    ("nose", ("physical_examination", "heent", "nose")),
+    ("throat", ("physical_examination", "heent", "throat")),
+    ("cardiovascular", ("physical_examination", "cardiovascular")),
+    ("respiratory", ("physical_examination", "respiratory")),
+    ("abdomen", ("physical_examination", "abdomen")),
+    ("musculoskeletal", ("physical_examination", "musculoskeletal")),
+    ("neurological", ("physical_examination", "neurological")),
+    ("notes", ("notes",)),
+]
+
+TEST_TEXT_FIELDS = [
+    ("lab_tests", ("type", "results")),
+    ("imaging_studies", ("type", "body_part", "findings")),
+    ("biopsies", ("type", "site", "results")),
+    ("ecg_results", ("type", "results")),
+    ("other_tests", ("type", "results")),
+]
+
+# Positions of consecutive fields are separated by this gap so that a phrase
+# can never match across the end of one field and the start of the next.
+FIELD_GAP = 1000
+
+TOKEN_RE = re.compile(r"\w+")
+QUERY_RE = re.compile(r'"([^"]*)"|(\()|(\))|([^\s()"]+)')
+OPERATORS = {"AND", "OR", "NOT"}
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.casefold())
+
+
+def record_texts(record):
+    texts = []
+    for _, path in TEXT_FIELDS:
+        value = record
+        for key in path:
+            value = value.get(key, "") if isinstance(value, dict) else ""
+        if value:
+            texts.append(value)
+    tests = record.get("diagnostic_tests", {}) or {}
+    for name, keys in TEST_TEXT_FIELDS:
+        for entry in tests.get(name, []) or []:
+            for key in keys:
+                if entry.get(key):
+                    texts.append(entry[key])
+    return texts
+
+
+class QueryError(ValueError):
+    pass
+
+
+class InvertedIndex:
+    def __init__(self):
+        self.postings = {}
+        self.doc_terms = {}
+
+    def add(self, doc_id, texts):
+        self.remove(doc_id)
+        doc_positions = {}
+        offset = 0
+        for text in texts:
+            position = offset
+            for position, term in enumerate(tokenize(text), offset):
+                doc_positions.setdefault(term, []).append(position)
+            offset = position + FIELD_GAP
+        for term, positions in doc_positions.items():
+            self.postings.setdefault(term, {})[doc_id] = positions
+        self.doc_terms[doc_id] = tuple(doc_positions)
+
+    def load_postings(self, postings):
+        doc_terms = {}
+        for term, docs in postings.items():
+            for doc_id in docs:
+                doc_terms.setdefault(doc_id, []).append(term)
+        self.postings = postings
+        self.doc_terms = {doc_id: tuple(terms) for doc_id, terms in doc_terms.items()}
+
+    def remove(self, doc_id):
+        for term in self.doc_terms.pop(doc_id, ()):
+            docs = self.postings[term]
+            del docs[doc_id]
+            if not docs:
+                del self.postings[term]
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def term_docs(self, term):
+        return self.postings.get(term, {}).keys()
+
+    def phrase_docs(self, terms):
+        if not terms:
+            return set()
+        if len(terms) == 1:
+            return set(self.term_docs(terms[0]))
+        postings = [self.postings.get(term) for term in terms]
+        if not all(postings):
+            return set()
+        candidates = set(min(postings, key=len))
+        for docs in postings:
+            candidates.intersection_update(docs.keys())
+            if not candidates:
+                return candidates
+        matches = set()
+        for doc_id in candidates:
+            later = [set(docs[doc_id]) for docs in postings[1:]]
+            for start in postings[0][doc_id]:
+                if all(start + i in positions for i, positions in enumerate(later, 1)):
+                    matches.add(doc_id)
+                    break
+        return matches
+
+    def search(self, query):
+        parser = _QueryParser(self, query)
+        result = parser.parse()
+        return sorted(result)
+
+
+class _QueryParser:
+    def __init__(self, index, query):
+        self.index = index
+        self.tokens = []
+        for phrase, lparen, rparen, word in QUERY_RE.findall(query):
+            if lparen or rparen:
+                self.tokens.append((lparen or rparen, None))
+            elif word in OPERATORS:
+                self.tokens.append((word, None))
+            elif word:
+                self.tokens.append(("TERM", tokenize(word)))
+            else:
+                self.tokens.append(("TERM", tokenize(phrase)))
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            return set()
+        result = self.parse_or()
+        if self.peek() is not None:
+            raise QueryError(f"Unexpected '{self.peek()}' in query")
+        return result
+
+    def parse_or(self):
+        result = self.parse_and()
+        while self.peek() == "OR":
+            self.take()
+            result = result | self.parse_and()
+        return result
+
+    def parse_and(self):
+        result = self.parse_not()
+        while self.peek() in ("AND", "NOT", "TERM", "("):
+            if self.peek() == "AND":
+                self.take()
+            right = self.parse_not()
+            result = result & right if len(result) <= len(right) else right & result
+        return result
+
+    def parse_not(self):
+        if self.peek() == "NOT":
+            self.take()
+            return set(self.index.doc_terms) - self.parse_not()
+        return self.parse_atom()
+
+    def parse_atom(self):
+        kind = self.peek()
+        if kind == "(":
+            self.take()
+            result = self.parse_or()
+            if self.peek() != ")":
+                raise QueryError("Missing ')' in query")
+            self.take()
+            return result
+        if kind == "TERM":
+            return self.index.phrase_docs(self.take()[1])
+        raise QueryError("Incomplete query" if kind is None else f"Unexpected '{kind}' in query")
+
+
+class TextIndex:
+    # The snapshot and the journal each start with a {"generation": n} line.
+    # A journal whose generation differs from the snapshot's was left behind
+    # by a compaction that crashed after replacing the snapshot, so all of its
+    # entries are already folded in. Loads, appends and compactions hold the
+    # lock file, so they never see a snapshot and journal mid-swap.
+    SNAPSHOT_FILE = "text_index.json"
+    JOURNAL_FILE = "text_index.log"
+    LOCK_FILE = "text_index.lock"
+
+    def __init__(self, directory, compact_ratio=0.1, min_compact_bytes=256 * 1024):
+        self.directory = directory
+        self.compact_ratio = compact_ratio
+        self.min_compact_bytes = min_compact_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.snapshot_path = os.path.join(directory, self.SNAPSHOT_FILE)
+        self.journal_path = os.path.join(directory, self.JOURNAL_FILE)
+        self.lock_path = os.path.join(directory, self.LOCK_FILE)
+        self._lock = threading.RLock()
+        self._index = None
+        self._generation = 0
+        self._journal_offset = 0
+
+    @property
+    def index(self):
+        with self._lock:
+            if self._index is None:
+                with locked_file(self.lock_path):
+                    self._index = self._load()
+            return self._index
+
+    @staticmethod
+    def _file_size(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _read_header(f):
+        # Journals written before generations were tracked have no header
+        # and count as generation 0.
+        line = f.readline()
+        try:
+            header = json.loads(line)
+        except ValueError:
+            header = None
+        if isinstance(header, dict) and "generation" in header:
+            return header["generation"], len(line)
+        f.seek(0)
+        return 0, 0
+
+    def _file_generation(self, path):
+        try:
+            with open(path, "rb") as f:
+                return self._read_header(f)[0]
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        index = InvertedIndex()
+        self._generation = 0
+        try:
+            f = open(self.snapshot_path, "rb")
+        except FileNotFoundError:
+            pass
+        else:
+            with f:
+                self._generation = self._read_header(f)[0]
+                index.load_postings(json.loads(f.read()))
+        self._journal_offset = 0
+        self._replay(index)
+        return index
+
+    def _replay(self, index):
+        # Applies journal entries past the last replayed offset; returns
+        # False if the journal belongs to another generation.
+        try:
+            f = open(self.journal_path, "rb")
+        except FileNotFoundError:
+            return True
+        with f:
+            generation, header_length = self._read_header(f)
+            if generation != self._generation:
+                return False
+            start = max(self._journal_offset, header_length)
+            f.seek(start)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("remove"):
+                index.remove(entry["doc"])
+            else:
+                index.add(entry["doc"], entry["texts"])
+        self._journal_offset = start + end
+        return True
+
+    def _write_journal(self, generation):
+        write_atomic(self.journal_path, (json.dumps({"generation": generation}) + "\n").encode("utf-8"))
+
+    def _append(self, entry):
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+        with locked_file(self.lock_path):
+            generation = self._file_generation(self.snapshot_path) or 0
+            if self._file_generation(self.journal_path) != generation:
+                self._write_journal(generation)
+            with open(self.journal_path, "a+b") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell():
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        # Terminate a line torn by a crash so it cannot swallow ours.
+                        line = b"\n" + line
+                f.write(line)
+
+    def add(self, doc_id, texts):
+        with self._lock:
+            self._append({"doc": doc_id, "texts": texts})
+            if self._index is not None:
+                self._index.add(doc_id, texts)
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._append({"doc": doc_id, "remove": True})
+            if self._index is not None:
+                self._index.remove(doc_id)
+
+    def update_record(self, patient_id, version, record):
+        self.add(patient_id, record_texts(record))
+
+    def search(self, query):
+        with self._lock:
+            return self.index.search(query)
+
+    def __len__(self):
+        return len(self.index)
+
+    def needs_compaction(self):
+        journal_bytes = self._file_size(self.journal_path)
+        return journal_bytes > max(self.min_compact_bytes, self._file_size(self.snapshot_path) * self.compact_ratio)
+
+    def compact(self):
+        with self._lock, locked_file(self.lock_path):
+            if self._index is None or not self._replay(self._index):
+                # Another process compacted since this one loaded; everything
+                # added here is in its snapshot or the new journal.
+                self._index = self._load()
+            self._write_snapshot(self._index)
+
+    def compact_if_needed(self):
+        if self.needs_compaction():
+            self.compact()
+            return True
+        return False
+
+    def _write_snapshot(self, index):
+        generation = max(self._generation, self._file_generation(self.snapshot_path) or 0) + 1
+        header = json.dumps({"generation": generation}) + "\n"
+        data = header + json.dumps(index.postings, separators=(",", ":"))
+        write_atomic(self.snapshot_path, data.encode("utf-8"))
+        self._write_journal(generation)
+        self._generation = generation
+        self._journal_offset = 0
+
+    def rebuild(self, store):
+        index = InvertedIndex()
+        for patient_id in store.patient_ids():
+            index.add(patient_id, record_texts(store.get(patient_id)))
+        with self._lock, locked_file(self.lock_path):
+            # Saves journaled while the store was being read are newer than
+            # what it returned for those patients.
+            self._generation = self._file_generation(self.snapshot_path) or 0
+            self._journal_offset = 0
+            self._replay(index)
+            self._index = index
+            self._write_snapshot(index)
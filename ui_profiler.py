@@ -0,0 +1,212 @@
+import fnmatch
+import functools
+import json
+import time
+import tkinter as tk
+
+DEFAULT_PATTERNS = ("validate_*", "calculate_bmi", "update_*", "save_record", "open_record", "clear_form",
+                    "add_*", "remove_last_*", "on_*", "build_page", "poll_saves", "flush_draft")
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+
+def bucket_index(value):
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS
+
+
+def bucket_value(index):
+    if index < SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return (index % SUB_BUCKETS + SUB_BUCKETS) << shift
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        index = bucket_index(int(seconds * 1e6))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent):
+        if not self.count:
+            return 0.0
+        rank = max(1, round(percent / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return bucket_value(index) / 1e6
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p90_ms": self.percentile(90) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max * 1000,
+            "buckets_us": {str(bucket_value(index)): count for index, count in sorted(self.counts.items())},
+        }
+
+
+def callback_name(func, args):
+    if getattr(func, "__qualname__", "").endswith("after.<locals>.callit"):
+        for cell in func.__closure__ or ():
+            if callable(cell.cell_contents):
+                func = cell.cell_contents
+                break
+    name = getattr(func, "__qualname__", None) or type(func).__qualname__
+    if name.endswith("<lambda>"):
+        name = f"{name}:{func.__code__.co_firstlineno}"
+    if args and isinstance(args[0], tk.Event):
+        name = f"{name} [{args[0].type}]"
+    return name
+
+
+class UIProfiler:
+    def __init__(self, root, stall_threshold=0.2, heartbeat_interval=0.05):
+        self.root = root
+        self.stall_threshold = stall_threshold
+        self.heartbeat_interval = heartbeat_interval
+        self.callbacks = {}
+        self.methods = {}
+        self.lag = LatencyHistogram()
+        self.stalls = []
+        self.slowest = None
+        self._original_call = None
+        self._heartbeat = None
+        self._expected = None
+
+    def install(self):
+        if self._original_call is not None:
+            return
+        self._original_call = tk.CallWrapper.__call__
+        profiler = self
+
+        def timed_call(wrapper, *args):
+            # Mirrors CallWrapper.__call__ so the Event is only built once.
+            start = time.perf_counter()
+            name = None
+            try:
+                if wrapper.subst:
+                    args = wrapper.subst(*args)
+                name = callback_name(wrapper.func, args)
+                return wrapper.func(*args)
+            except SystemExit:
+                raise
+            except BaseException:
+                wrapper.widget._report_exception()
+            finally:
+                if name is not None:
+                    profiler.record(profiler.callbacks, name, time.perf_counter() - start)
+
+        tk.CallWrapper.__call__ = timed_call
+        self._expected = time.perf_counter() + self.heartbeat_interval
+        self._heartbeat = self.root.after(int(self.heartbeat_interval * 1000), self._beat)
+
+    def uninstall(self):
+        if self._original_call is not None:
+            tk.CallWrapper.__call__ = self._original_call
+            self._original_call = None
+        if self._heartbeat is not None:
+            self.root.after_cancel(self._heartbeat)
+            self._heartbeat = None
+
+    def instrument(self, obj, patterns=DEFAULT_PATTERNS):
+        for name in dir(type(obj)):
+            if not any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns):
+                continue
+            method = getattr(obj, name)
+            if callable(method):
+                setattr(obj, name, self._wrap(method, f"{type(obj).__name__}.{name}"))
+
+    def _wrap(self, method, name):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record(self.methods, name, time.perf_counter() - start)
+        return wrapper
+
+    def record(self, histograms, name, seconds):
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = LatencyHistogram()
+        histogram.record(seconds)
+        if histograms is self.callbacks and (self.slowest is None or seconds > self.slowest[1]):
+            self.slowest = (name, seconds)
+
+    def _beat(self):
+        now = time.perf_counter()
+        late = max(0.0, now - self._expected)
+        self.lag.record(late)
+        if late >= self.stall_threshold:
+            self.stalls.append({
+                "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "stall_ms": late * 1000,
+                "slowest_callback": self.slowest[0] if self.slowest else None,
+                "slowest_ms": self.slowest[1] * 1000 if self.slowest else None,
+            })
+        self.slowest = None
+        self._expected = now + self.heartbeat_interval
+        self._heartbeat = self.root.after(int(self.heartbeat_interval * 1000), self._beat)
+
+    def snapshot(self):
+        return {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "callbacks": {name: histogram.to_dict() for name, histogram in self.callbacks.items()
+                          if name != "UIProfiler._beat"},
+            "methods": {name: histogram.to_dict() for name, histogram in self.methods.items()},
+            "event_loop_lag": self.lag.to_dict(),
+            "stalls": list(self.stalls),
+        }
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def report(self, limit=40):
+        snapshot = self.snapshot()
+        lines = [f"{'handler':<60} {'count':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}"]
+        for section in ("methods", "callbacks"):
+            rows = sorted(snapshot[section].items(), key=lambda item: item[1]["p99_ms"], reverse=True)[:limit]
+            lines.append(f"-- {section}")
+            for name, stats in rows:
+                lines.append(f"{name[:60]:<60} {stats['count']:>7} {stats['p50_ms']:>8.2f} "
+                             f"{stats['p99_ms']:>8.2f} {stats['max_ms']:>8.2f}")
+        lag = snapshot["event_loop_lag"]
+        lines.append(f"-- event loop lag p99 {lag['p99_ms']:.1f} ms, max {lag['max_ms']:.1f} ms, "
+                     f"{len(self.stalls)} stalls over {self.stall_threshold * 1000:.0f} ms")
+        for stall in self.stalls[-10:]:
+            lines.append(f"{stall['at']} {stall['stall_ms']:.0f} ms, slowest: {stall['slowest_callback']}")
+        return "\n".join(lines)
+
+    def show_window(self, event=None):
+        from tkinter import scrolledtext, ttk
+        window = tk.Toplevel(self.root)
+        window.title("UI latency")
+        text = scrolledtext.ScrolledText(window, width=100, height=30, font=('Courier', 9))
+        text.pack(fill=tk.BOTH, expand=True)
+
+        def refresh():
+            text.delete("1.0", tk.END)
+            text.insert("1.0", self.report())
+
+        ttk.Button(window, text="Refresh", command=refresh).pack(side='left', padx=5, pady=5)
+        refresh()
@@ -0,0 +1,102 @@
+import math
+import operator
+from collections import namedtuple
+
+Band = namedtuple("Band", "label color op bound typical")
+VitalRule = namedtuple("VitalRule", "limits bands normal")
+
+HEART_RATE_BANDS = [
+    Band("Bradycardia", "blue", "<", 60, None),
+    Band("Normal", "green", "<=", 100, None),
+    Band("Tachycardia", "red", None, None, None),
+]
+
+BMI_BANDS = [
+    Band("Underweight (<18.5)", "blue", "<", 18.5, 18.0),
+    Band("Normal (18.5-24.9)", "green", "<", 25, 22.0),
+    Band("Overweight (25-29.9)", "orange", "<", 30, 27.0),
+    Band("Obese (≥30)", "red", None, None, 32.0),
+]
+
+VITAL_RULES = {
+    "systolic": VitalRule((70, 200), None, None),
+    "diastolic": VitalRule((40, 130), None, None),
+    "heart_rate": VitalRule((40, 200), HEART_RATE_BANDS, "Normal"),
+    "respiratory_rate": VitalRule((8, 40), None, None),
+    "temperature": VitalRule((35, 42), None, None),
+    "bmi": VitalRule(None, BMI_BANDS, "Normal (18.5-24.9)"),
+}
+
+OPERATORS = {"<": operator.lt, "<=": operator.le}
+
+
+def parse_reading(text):
+    try:
+        value = float(text)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+def in_limits(name, value):
+    limits = VITAL_RULES[name].limits
+    return limits is None or limits[0] <= value <= limits[1]
+
+
+def classify(name, value):
+    for band in VITAL_RULES[name].bands or ():
+        if band.op is None or OPERATORS[band.op](value, band.bound):
+            return band
+    return None
+
+
+def band_for_label(name, label):
+    for band in VITAL_RULES[name].bands or ():
+        if band.label == label:
+            return band
+    return None
+
+
+def bmi(height_cm, weight_kg):
+    height_m = height_cm / 100
+    return weight_kg / (height_m * height_m)
+
+
+def out_of_limits_array(name, values):
+    import numpy as np
+    values = np.asarray(values, dtype=np.float64)
+    limits = VITAL_RULES[name].limits
+    if limits is None:
+        return np.zeros(values.shape, dtype=np.bool_)
+    return ~np.isnan(values) & ((values < limits[0]) | (values > limits[1]))
+
+
+def classify_array(name, values):
+    import numpy as np
+    values = np.asarray(values, dtype=np.float64)
+    bands = VITAL_RULES[name].bands
+    with np.errstate(invalid="ignore"):
+        conditions = [OPERATORS[band.op](values, band.bound) for band in bands if band.op is not None]
+    codes = np.select(conditions, range(len(conditions)), default=len(bands) - 1).astype(np.int8)
+    codes[np.isnan(values) | out_of_limits_array(name, values)] = -1
+    return codes
+
+
+def band_labels(name):
+    return [band.label for band in VITAL_RULES[name].bands]
+
+
+def flag_abnormal(columns):
+    import numpy as np
+    flags = {}
+    for name, values in columns.items():
+        rule = VITAL_RULES.get(name)
+        if rule is None:
+            continue
+        values = np.asarray(values, dtype=np.float64)
+        flags[name] = out_of_limits_array(name, values)
+        if rule.bands:
+            normal = band_labels(name).index(rule.normal)
+            codes = classify_array(name, values)
+            flags[name] |= (codes != normal) & (codes != -1)
+    return flags
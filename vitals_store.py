@@ -0,0 +1,295 @@
+import json
+import operator
+import os
+from datetime import datetime
+
+import numpy as np
+
+from record_schema import get_path
+from record_store import locked_file
+
+VITAL_COLUMNS = [
+    ("systolic", ("vital_signs", "blood_pressure", "systolic"), np.int16),
+    ("diastolic", ("vital_signs", "blood_pressure", "diastolic"), np.int16),
+    ("heart_rate", ("vital_signs", "heart_rate"), np.int16),
+    ("respiratory_rate", ("vital_signs", "respiratory_rate"), np.int16),
+    ("temperature", ("vital_signs", "temperature"), np.float32),
+    ("height", ("vital_signs", "height"), np.float32),
+    ("weight", ("vital_signs", "weight"), np.float32),
+    ("bmi", ("vital_signs", "bmi"), np.float32),
+]
+
+KEY_COLUMNS = [
+    ("patient", np.int32),
+    ("version", np.int32),
+    ("encounter", "datetime64[s]"),
+    ("dob", "datetime64[D]"),
+]
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+AGE_BANDS = (0, 18, 30, 45, 65, 80)
+
+
+def parse_vital(text, dtype):
+    try:
+        value = float(text)
+    except (TypeError, ValueError):
+        return None
+    if value != value:
+        return None
+    if dtype is np.int16:
+        value = round(value)
+        if not -32768 <= value <= 32767:
+            return None
+    return value
+
+
+def parse_timestamp(text):
+    for pattern in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return np.datetime64(datetime.strptime(text, pattern), "s")
+        except (TypeError, ValueError):
+            continue
+    return np.datetime64("NaT", "s")
+
+
+def parse_date(text):
+    try:
+        return np.datetime64(text, "D")
+    except (TypeError, ValueError):
+        return np.datetime64("NaT", "D")
+
+
+def age_band_labels(bands):
+    labels = [f"{low}-{high - 1}" for low, high in zip(bands, bands[1:])]
+    labels.append(f"{bands[-1]}+")
+    return labels
+
+
+class VitalsStore:
+    PATIENTS_FILE = "patients.json"
+    LOCK_FILE = "vitals.lock"
+
+    def __init__(self, directory=None, capacity=1024):
+        self.directory = directory
+        self.size = 0
+        self.patient_ids = []
+        self._patient_codes = {}
+        self.columns = {}
+        self.missing = {}
+        self._allocate(capacity)
+        if directory and os.path.exists(os.path.join(directory, self.PATIENTS_FILE)):
+            self._load()
+
+    def _allocate(self, capacity):
+        for name, dtype in KEY_COLUMNS:
+            self.columns[name] = self._grow(self.columns.get(name), capacity, dtype)
+        for name, _, dtype in VITAL_COLUMNS:
+            self.columns[name] = self._grow(self.columns.get(name), capacity, dtype)
+            self.missing[name] = self._grow(self.missing.get(name), capacity, np.bool_, fill=True)
+
+    def _grow(self, array, capacity, dtype, fill=None):
+        grown = np.empty(capacity, dtype=dtype)
+        if fill is not None:
+            grown.fill(fill)
+        if array is not None:
+            grown[:self.size] = array[:self.size]
+        return grown
+
+    @property
+    def capacity(self):
+        return len(self.columns["patient"])
+
+    def __len__(self):
+        return self.size
+
+    def patient_code(self, patient_id):
+        code = self._patient_codes.get(patient_id)
+        if code is None:
+            code = len(self.patient_ids)
+            self._patient_codes[patient_id] = code
+            self.patient_ids.append(patient_id)
+        return code
+
+    def append(self, patient_id, version, record):
+        if self.size == self.capacity:
+            self._allocate(self.capacity * 2)
+        row = self.size
+        self.columns["patient"][row] = self.patient_code(patient_id)
+        self.columns["version"][row] = version
+        self.columns["encounter"][row] = parse_timestamp(get_path(record, ("date_created",)))
+        self.columns["dob"][row] = parse_date(get_path(record, ("personal_info", "dob")))
+        for name, path, dtype in VITAL_COLUMNS:
+            value = parse_vital(get_path(record, path), dtype)
+            self.missing[name][row] = value is None
+            self.columns[name][row] = 0 if value is None else value
+        self.size += 1
+
+    def update_record(self, patient_id, version, record):
+        self.append(patient_id, version, record)
+
+    def build(self, store):
+        for patient_id in store.patient_ids():
+            for version in store.versions(patient_id):
+                self.append(patient_id, version, store.get(patient_id, version))
+        return self
+
+    def latest_versions(self):
+        latest = np.zeros(len(self.patient_ids), dtype=np.int32)
+        np.maximum.at(latest, self.column("patient"), self.column("version"))
+        return latest
+
+    def sync(self, store):
+        # Versions are numbered from 1 without gaps, so anything past the
+        # highest version held for a patient is new.
+        known = self.latest_versions()
+        added = 0
+        for patient_id, latest in store.latest_versions().items():
+            code = self._patient_codes.get(patient_id)
+            for version in range(1 if code is None else int(known[code]) + 1, latest + 1):
+                self.append(patient_id, version, store.get(patient_id, version))
+                added += 1
+        return added
+
+    def column(self, name):
+        return self.columns[name][:self.size]
+
+    def valid(self, name):
+        return ~self.missing[name][:self.size]
+
+    def where(self, conditions=(), since=None, until=None):
+        mask = np.ones(self.size, dtype=np.bool_)
+        for name, op, value in conditions:
+            mask &= self.valid(name)
+            mask &= OPERATORS[op](self.column(name), value)
+        encounter = self.column("encounter")
+        if since is not None:
+            mask &= encounter >= np.datetime64(since, "s")
+        if until is not None:
+            mask &= encounter < np.datetime64(until, "s")
+        return np.flatnonzero(mask)
+
+    def rows(self, indices):
+        indices = np.asarray(indices)
+        patients = self.column("patient")[indices]
+        result = []
+        for position, row in enumerate(indices):
+            entry = {
+                "patient_id": self.patient_ids[patients[position]],
+                "version": int(self.columns["version"][row]),
+                "encounter": str(self.columns["encounter"][row]),
+            }
+            for name, _, _ in VITAL_COLUMNS:
+                entry[name] = None if self.missing[name][row] else self.columns[name][row].item()
+            result.append(entry)
+        return result
+
+    def ages(self, as_of=None):
+        as_of = np.datetime64(as_of or datetime.now(), "D")
+        dob = self.column("dob")
+        days = (as_of - dob).astype(np.float64)
+        days[np.isnat(dob)] = np.nan
+        return days / 365.25
+
+    def summary(self, name, indices=None):
+        values = self.column(name)
+        valid = self.valid(name)
+        if indices is not None:
+            values = values[indices]
+            valid = valid[indices]
+        values = values[valid].astype(np.float64)
+        if not len(values):
+            return {"count": 0, "mean": None, "min": None, "max": None}
+        return {"count": int(len(values)), "mean": float(values.mean()),
+                "min": float(values.min()), "max": float(values.max())}
+
+    def flag_abnormal(self):
+        from vital_rules import VITAL_RULES, flag_abnormal
+        columns = {}
+        for name in VITAL_RULES:
+            values = self.column(name).astype(np.float64)
+            values[~self.valid(name)] = np.nan
+            columns[name] = values
+        return flag_abnormal(columns)
+
+    def mean_by_age_band(self, name, bands=AGE_BANDS, as_of=None):
+        ages = self.ages(as_of)
+        valid = self.valid(name) & ~np.isnan(ages)
+        band = np.digitize(ages[valid], bands) - 1
+        values = self.column(name)[valid].astype(np.float64)
+        in_range = band >= 0
+        band = band[in_range]
+        values = values[in_range]
+        counts = np.bincount(band, minlength=len(bands))
+        totals = np.bincount(band, weights=values, minlength=len(bands))
+        result = {}
+        for label, count, total in zip(age_band_labels(bands), counts, totals):
+            result[label] = {"count": int(count), "mean": float(total / count) if count else None}
+        return result
+
+    def _arrays(self):
+        for name in self.columns:
+            yield name, self.columns[name]
+        for name in self.missing:
+            yield f"{name}.missing", self.missing[name]
+
+    @staticmethod
+    def _column_path(directory, name, generation):
+        # Files saved before generations were tracked have no suffix.
+        return os.path.join(directory, f"{name}.{generation}.npy" if generation else f"{name}.npy")
+
+    def save(self, directory=None):
+        # Each save writes a new generation of column files; patients.json
+        # names the generation and is replaced last, so a crash part way
+        # through leaves the previous generation in use.
+        directory = directory or self.directory
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, self.PATIENTS_FILE)
+        with locked_file(os.path.join(directory, self.LOCK_FILE)):
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    generation = json.load(f).get("generation", 0) + 1
+            except (OSError, ValueError):
+                generation = 1
+            current = set()
+            for name, array in self._arrays():
+                path = self._column_path(directory, name, generation)
+                current.add(os.path.basename(path))
+                with open(path, "wb") as f:
+                    np.save(f, array[:self.size])
+                    f.flush()
+                    os.fsync(f.fileno())
+            temp_path = meta_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"size": self.size, "generation": generation, "patients": self.patient_ids}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, meta_path)
+            for file_name in os.listdir(directory):
+                if file_name.endswith(".npy") and file_name not in current:
+                    os.remove(os.path.join(directory, file_name))
+
+    def _load(self):
+        with locked_file(os.path.join(self.directory, self.LOCK_FILE)):
+            with open(os.path.join(self.directory, self.PATIENTS_FILE), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            size = meta["size"]
+            generation = meta.get("generation", 0)
+            arrays = {name: np.load(self._column_path(self.directory, name, generation)) for name, _ in self._arrays()}
+        if any(len(array) != size for array in arrays.values()):
+            raise ValueError(f"Vitals store in {self.directory} is inconsistent; run reindex to rebuild it")
+        self.patient_ids = meta["patients"]
+        self._patient_codes = {patient_id: code for code, patient_id in enumerate(self.patient_ids)}
+        self.size = 0
+        self._allocate(max(size, 1024))
+        for name, array in self._arrays():
+            array[:size] = arrays[name]
+        self.size = size